@@ -0,0 +1,50 @@
+# backend/app/aggregates.py
+"""
+Per-day activity totals computed inside MongoDB, so summary endpoints receive
+one small document instead of every raw log for the day. (Meal days keep
+running totals in their own document, see mealdays.py.)
+
+$sum skips missing and non-numeric values, which matches the old Python loops
+that only added `int`/`float` fields.
+"""
+from .db import activity
+
+NUTRIENTS = ["kcal", "carb_g", "protein_g", "fat_g", "fiber_g", "sugar_g", "sodium_mg"]
+
+def empty_totals() -> dict:
+    return {k: 0 for k in NUTRIENTS}
+
+# activity type as the routes normalise it: (type or "walk").lower()
+_ACT_TYPE = {"$cond": [{"$eq": [{"$ifNull": ["$type", ""]}, ""]}, "walk", {"$toLower": "$type"}]}
+
+
+def activity_day_pipeline(user_id: str, dateISO: str) -> list[dict]:
+    return [
+        {"$match": {"userId": user_id, "dateISO": dateISO}},
+        {"$group": {
+            "_id": _ACT_TYPE,
+            "count": {"$sum": 1},
+            "minutes": {"$sum": "$minutes"},
+            "steps": {"$sum": "$steps"},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+
+
+async def activity_day_by_type(user_id: str, dateISO: str) -> dict[str, dict]:
+    """{type: {"count", "minutes", "steps"}} for one day."""
+    return {
+        row["_id"]: {"count": row["count"], "minutes": row["minutes"], "steps": row["steps"]}
+        async for row in activity.aggregate(activity_day_pipeline(user_id, dateISO))
+    }
+
+
+async def activity_day_minutes(user_id: str, dateISO: str) -> float:
+    """Active minutes for the coach; older docs may carry `durationMin` instead."""
+    pipeline = [
+        {"$match": {"userId": user_id, "dateISO": dateISO}},
+        {"$group": {"_id": None, "minutes": {"$sum": {"$cond": ["$minutes", "$minutes", "$durationMin"]}}}},
+    ]
+    async for row in activity.aggregate(pipeline):
+        return row["minutes"]
+    return 0
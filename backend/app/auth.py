@@ -1,9 +1,14 @@
 from passlib.context import CryptContext
 import jwt
+import asyncio, time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from .config import JWT_SECRET, JWT_ALG
+from .config import (JWT_SECRET, JWT_ALG, JWT_PROFILE_CLAIMS, BCRYPT_ROUNDS,
+                     HASH_WORKERS, HASH_MAX_QUEUE, HASH_QUEUE_TIMEOUT)
+from . import metrics
 
-pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# hashes made with other rounds still verify; verify_and_update flags them for re-hash
+pwd = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 def hash_password(raw: str) -> str:
     return pwd.hash(raw)
@@ -11,12 +16,82 @@ def hash_password(raw: str) -> str:
 def verify_password(raw: str, hashed: str) -> bool:
     return pwd.verify(raw, hashed)
 
+
+class HashPoolBusy(Exception):
+    """The hashing pool is saturated; the caller should answer 503."""
+
+
+class HashPool:
+    """
+    Runs bcrypt in worker threads (it releases the GIL) so a burst of logins
+    can't stall the event loop. At most `workers` hashes run at once, up to
+    `max_queue` more wait for `timeout` seconds, anything beyond is rejected.
+    """
+    def __init__(self, workers: int, max_queue: int, timeout: float):
+        self.workers, self.max_queue, self.timeout = workers, max_queue, timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash") if workers > 0 else None
+        self._slots = asyncio.Semaphore(max(workers, 1))
+        self.pending = 0
+        self.completed = self.rejected = self.timed_out = 0
+        self.wait_total = self.wait_max = 0.0
+
+    async def run(self, fn, *args):
+        if self._executor is None:
+            self.completed += 1
+            return fn(*args)
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HashPoolBusy()
+        self.pending += 1
+        t0 = time.perf_counter()
+        try:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise HashPoolBusy()
+            waited = time.perf_counter() - t0
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+            finally:
+                self._slots.release()
+                self.completed += 1
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "max_queue": self.max_queue, "pending": self.pending,
+                "completed": self.completed, "rejected": self.rejected, "timed_out": self.timed_out,
+                "wait_avg_ms": round(1000 * self.wait_total / self.completed, 3) if self.completed else 0.0,
+                "wait_max_ms": round(1000 * self.wait_max, 3)}
+
+
+hash_pool = HashPool(HASH_WORKERS, HASH_MAX_QUEUE, HASH_QUEUE_TIMEOUT)
+metrics.register("hash_pool", hash_pool.stats)
+
+async def hash_password_async(raw: str) -> str:
+    return await hash_pool.run(pwd.hash, raw)
+
+async def verify_password_async(raw: str, hashed: str) -> tuple[bool, str | None]:
+    """(ok, new_hash): new_hash is set when the stored hash uses outdated parameters."""
+    return await hash_pool.run(pwd.verify_and_update, raw, hashed)
+
+
 def create_access_token(payload: dict, minutes: int = 60*24*7) -> str:
     to_encode = payload.copy()
     exp = datetime.utcnow() + timedelta(minutes=minutes)
     to_encode.update({"exp": exp})
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALG)
 
+def user_token(user: dict) -> str:
+    claims = {"id": user["id"], "email": user["email"], "name": user["name"]}
+    if JWT_PROFILE_CLAIMS:
+        # lets read-only routes skip the user lookup (deps.get_token_user)
+        claims["profile"] = {k: user.get(k) for k in ("age", "sex", "heightCm", "weightKg")}
+    return create_access_token(claims)
+
 def decode_token(token: str) -> dict | None:
     try:
         return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
@@ -0,0 +1,37 @@
+# backend/app/bulk.py
+"""Helpers shared by the bulk ingest endpoints (per-entry validation and status)."""
+from pydantic import BaseModel, ValidationError
+from pymongo.errors import BulkWriteError
+
+
+def validate_entries(model: type[BaseModel], entries: list):
+    """-> ([(index, parsed)], results) where results[i] is pre-filled for invalid entries."""
+    ok, results = [], [None] * len(entries)
+    for i, raw in enumerate(entries):
+        try:
+            ok.append((i, model(**raw)))
+        except ValidationError as e:
+            err = e.errors()[0]
+            loc = ".".join(str(x) for x in err.get("loc", ()))
+            results[i] = {"index": i, "status": "invalid", "error": f"{loc}: {err.get('msg')}" if loc else err.get("msg")}
+        except TypeError:
+            results[i] = {"index": i, "status": "invalid", "error": "entry must be an object"}
+    return ok, results
+
+
+async def write_unordered(coll, ops: list) -> tuple[set[int], dict[int, object]]:
+    """bulk_write(ordered=False) -> (failed op indexes, {op index: upserted _id})."""
+    if not ops:
+        return set(), {}
+    try:
+        res = await coll.bulk_write(ops, ordered=False)
+        return set(), dict(res.upserted_ids or {})
+    except BulkWriteError as e:
+        d = e.details
+        failed = {w["index"] for w in d.get("writeErrors", [])}
+        return failed, {u["index"]: u["_id"] for u in d.get("upserted", [])}
+
+
+def summary(results: list[dict]) -> dict:
+    n_ok = sum(1 for r in results if r["status"] == "ok")
+    return {"ok": n_ok, "failed": len(results) - n_ok, "results": results}
@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()  # reads backend/.env if present
@@ -11,4 +12,67 @@ DIABETES_API_URL = os.getenv("DIABETES_API_URL", "http://127.0.0.1:8001")
 
 HEART_API_URL = os.getenv("HEART_API_URL", "http://127.0.0.1:8002")
 FDC_API_KEY = os.getenv("FDC_API_KEY", "")
-FDC_BASE    = "https://api.nal.usda.gov/fdc/v1"
\ No newline at end of file
+FDC_BASE    = os.getenv("FDC_BASE", "https://api.nal.usda.gov/fdc/v1")   # bench/loadtest.py points it at a stub
+# authenticated-user profile cache (per process); TTL 0 disables it
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_MAX = int(os.getenv("USER_CACHE_MAX", "10000"))
+# embed age/sex/height/weight in tokens so read-only routes can skip the user lookup
+JWT_PROFILE_CLAIMS = os.getenv("JWT_PROFILE_CLAIMS", "0") == "1"
+
+# password hashing: bcrypt cost and the worker pool that runs it off the event loop
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "4"))           # 0 = hash inline (benchmarks only)
+HASH_MAX_QUEUE = int(os.getenv("HASH_MAX_QUEUE", "64"))      # waiting beyond the workers, then 503
+HASH_QUEUE_TIMEOUT = float(os.getenv("HASH_QUEUE_TIMEOUT", "5"))
+
+# streaming exports: documents fetched per cursor round trip
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+# write-behind for /activity/log/upsert: off | sync (wait for the shared flush) | async (ack at once)
+ACTIVITY_BUFFER = os.getenv("ACTIVITY_BUFFER", "off")
+ACTIVITY_BUFFER_MS = float(os.getenv("ACTIVITY_BUFFER_MS", "1000"))   # flush window
+ACTIVITY_BUFFER_MAX = int(os.getenv("ACTIVITY_BUFFER_MAX", "500"))    # pending keys before an early flush
+
+# create missing indexes on startup (see indexes.py); 0 to skip
+ENSURE_INDEXES = os.getenv("ENSURE_INDEXES", "1") == "1"
+
+# MongoDB connection pool (pymongo defaults when unset) and command monitoring
+MONGO_MAX_POOL = int(os.getenv("MONGO_MAX_POOL", "100"))
+MONGO_MIN_POOL = int(os.getenv("MONGO_MIN_POOL", "0"))
+MONGO_MAX_IDLE_MS = int(os.getenv("MONGO_MAX_IDLE_MS", "0")) or None          # 0 = keep idle connections
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0")) or None  # 0 = wait forever
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "20000"))
+DB_MONITOR = os.getenv("DB_MONITOR", "1") == "1"            # per-route command stats under /metrics
+DB_TIMING_HEADER = os.getenv("DB_TIMING_HEADER", "0") == "1"  # X-DB-Time on every response (debug)
+DB_MONITOR_BYTES = os.getenv("DB_MONITOR_BYTES", "0") == "1"  # also count reply bytes (re-encodes every reply)
+
+# local FoodData Central index built by `python -m app.foodindex build ...`; used when the file exists
+FDC_LOCAL_INDEX = os.getenv("FDC_LOCAL_INDEX", str(Path(__file__).resolve().parents[1] / "data" / "fdc_index.jsonl.gz"))
+
+# FDC answers cache (foodcache.py): per-process LRU + TTL, optional SQLite file shared by workers
+FOOD_CACHE_TTL = float(os.getenv("FOOD_CACHE_TTL", str(60 * 60 * 24)))         # fresh for 24h
+FOOD_CACHE_STALE = float(os.getenv("FOOD_CACHE_STALE", str(60 * 60 * 24 * 7)))  # then served stale + refreshed
+FOOD_CACHE_NEG_TTL = float(os.getenv("FOOD_CACHE_NEG_TTL", "3600"))            # remembered 404s
+FOOD_CACHE_MAX = int(os.getenv("FOOD_CACHE_MAX", "5000"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "3600"))
+SEARCH_CACHE_MAX = int(os.getenv("SEARCH_CACHE_MAX", "2000"))
+FOOD_CACHE_DB = os.getenv("FOOD_CACHE_DB", "")                                 # e.g. /tmp/predictmedi-fdc.sqlite
+
+# FDC upstream scheduler (upstream.py): the key's hourly quota as seen by this process
+FDC_HOURLY_QUOTA = int(os.getenv("FDC_HOURLY_QUOTA", "1000"))                 # api.data.gov default per key
+FDC_SEARCH_RESERVE = float(os.getenv("FDC_SEARCH_RESERVE", "0.2"))           # budget share search can't touch
+FDC_RETRIES = int(os.getenv("FDC_RETRIES", "2"))                             # extra attempts on 429/5xx/network
+FDC_BACKOFF_MS = float(os.getenv("FDC_BACKOFF_MS", "200"))                   # base of the jittered backoff
+FDC_BACKOFF_MAX_MS = float(os.getenv("FDC_BACKOFF_MAX_MS", "4000"))
+
+# /nutrition/suggest (suggest.py): memo per query, and when to ask FDC for more
+SUGGEST_MEMO_S = float(os.getenv("SUGGEST_MEMO_S", "30"))
+SUGGEST_MIN_LOCAL = int(os.getenv("SUGGEST_MIN_LOCAL", "5"))       # fewer local matches -> background FDC search
+SUGGEST_DEBOUNCE_MS = float(os.getenv("SUGGEST_DEBOUNCE_MS", "300"))  # a longer query typed meanwhile replaces it
+
+# nightly coach precompute (precompute.py): off | inproc (a task in each API process; one wins the day's lease)
+# Run `python -m app.precompute` instead for a separate worker process.
+PRECOMPUTE = os.getenv("PRECOMPUTE", "off")
+PRECOMPUTE_HOUR = int(os.getenv("PRECOMPUTE_HOUR", "3"))                  # local hour the run starts
+PRECOMPUTE_ACTIVE_DAYS = int(os.getenv("PRECOMPUTE_ACTIVE_DAYS", "7"))    # users with a log this recently
+PRECOMPUTE_CONCURRENCY = int(os.getenv("PRECOMPUTE_CONCURRENCY", "8"))
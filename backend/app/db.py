@@ -1,16 +1,30 @@
 # backend/app/db.py
 from motor.motor_asyncio import AsyncIOMotorClient
-from .config import MONGO_URI
+from .config import (MONGO_URI, MONGO_MAX_POOL, MONGO_MIN_POOL, MONGO_MAX_IDLE_MS,
+                     MONGO_WAIT_QUEUE_TIMEOUT_MS, MONGO_CONNECT_TIMEOUT_MS, DB_MONITOR)
+from . import dbmon
 
-_client = AsyncIOMotorClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+_client = AsyncIOMotorClient(
+    MONGO_URI,
+    serverSelectionTimeoutMS=5000,
+    maxPoolSize=MONGO_MAX_POOL,
+    minPoolSize=MONGO_MIN_POOL,
+    maxIdleTimeMS=MONGO_MAX_IDLE_MS,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+    event_listeners=dbmon.listeners() if DB_MONITOR else [],
+)
 _db = _client["predictmedi"]  # or use DB_NAME if you added it earlier
 
 users    = _db["users"]
 activity = _db["activity_logs"]
 meals    = _db["meal_logs"]
+rollups  = _db["daily_rollups"]
+digests  = _db["coach_digests"]
+jobs     = _db["jobs"]
 
 async def init_db():
     await _client.server_info()  # fast fail if URI wrong
-    await users.create_index("email", unique=True)
-    await activity.create_index([("userId", 1), ("dateISO", -1)])
-    await meals.create_index([("userId", 1), ("dateISO", -1)])
+    # indexes are declared in indexes.py (also: python -m app.indexes --check)
+    from .indexes import ensure_indexes
+    return await ensure_indexes()
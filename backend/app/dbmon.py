@@ -0,0 +1,164 @@
+# backend/app/dbmon.py
+"""
+MongoDB command and pool monitoring, attributed to the route being served.
+
+The middleware in main.py opens a RequestDB for each request in a contextvar.
+Motor runs pymongo on executor threads with a copy of the caller's context,
+so the command listener below sees the same RequestDB and can charge every
+command's latency, returned documents and (with DB_MONITOR_BYTES=1, since it
+re-encodes every reply) reply bytes to it. When the
+request finishes, its totals are folded into per-route stats (GET /metrics,
+"db") and, with DB_TIMING_HEADER=1, listed in an X-DB-Time response header.
+"""
+import threading, time
+from contextvars import ContextVar
+from bson import encode
+from pymongo import monitoring
+
+from .config import DB_MONITOR_BYTES
+from . import metrics
+
+_lock = threading.Lock()
+
+
+class RequestDB:
+    """Commands run while serving one request."""
+    def __init__(self):
+        self.commands: list[tuple[str, float]] = []   # (command name, ms)
+        self.docs = self.bytes = self.errors = 0
+
+    @property
+    def ms(self) -> float:
+        return sum(ms for _, ms in self.commands)
+
+    def header(self) -> str:
+        """e.g. '3.412ms; cmds=3; find 1.100, find 0.902, aggregate 1.410'"""
+        parts = ", ".join(f"{name} {ms:.3f}" for name, ms in self.commands)
+        return f"{self.ms:.3f}ms; cmds={len(self.commands)}" + (f"; {parts}" if parts else "")
+
+
+current: ContextVar[RequestDB | None] = ContextVar("request_db", default=None)
+
+
+def _docs_in(reply: dict) -> int:
+    cur = reply.get("cursor")
+    if isinstance(cur, dict):
+        return len(cur.get("firstBatch") or cur.get("nextBatch") or [])
+    n = reply.get("n")
+    return n if isinstance(n, int) else 0
+
+
+class _Stats:
+    def __init__(self):
+        self.commands: dict[str, dict] = {}   # command name -> {count, ms, errors}
+        self.routes: dict[str, dict] = {}     # "GET /coach/motivate" -> totals
+        self.pool = {"checkouts": 0, "checkout_wait_ms_total": 0.0, "checkout_wait_ms_max": 0.0,
+                     "checkout_failed": 0, "connections_created": 0, "connections_closed": 0, "checked_out": 0}
+
+    def command(self, name: str, ms: float, error: bool = False):
+        with _lock:
+            c = self.commands.setdefault(name, {"count": 0, "ms": 0.0, "errors": 0})
+            c["count"] += 1
+            c["ms"] += ms
+            c["errors"] += int(error)
+
+    def request(self, route: str, req: RequestDB):
+        with _lock:
+            r = self.routes.setdefault(route, {"requests": 0, "commands": 0, "max_commands": 0,
+                                               "db_ms": 0.0, "db_ms_max": 0.0, "docs": 0, "bytes": 0, "errors": 0})
+            n, ms = len(req.commands), req.ms
+            r["requests"] += 1
+            r["commands"] += n
+            r["max_commands"] = max(r["max_commands"], n)
+            r["db_ms"] += ms
+            r["db_ms_max"] = max(r["db_ms_max"], ms)
+            r["docs"] += req.docs
+            r["bytes"] += req.bytes
+            r["errors"] += req.errors
+
+    def snapshot(self) -> dict:
+        with _lock:
+            pool = dict(self.pool)
+            total, checkouts = pool.pop("checkout_wait_ms_total"), pool["checkouts"]
+            pool["checkout_wait_ms_avg"] = round(total / checkouts, 3) if checkouts else 0.0
+            pool["checkout_wait_ms_max"] = round(pool["checkout_wait_ms_max"], 3)
+            routes = {}
+            for route, r in self.routes.items():
+                routes[route] = {**r, "db_ms": round(r["db_ms"], 3), "db_ms_max": round(r["db_ms_max"], 3),
+                                 "commands_per_request": round(r["commands"] / r["requests"], 3),
+                                 "db_ms_avg": round(r["db_ms"] / r["requests"], 3)}
+            commands = {k: {**v, "ms": round(v["ms"], 3)} for k, v in self.commands.items()}
+        return {"pool": pool, "commands": commands, "routes": routes}
+
+
+stats = _Stats()
+metrics.register("db", stats.snapshot)
+
+
+class CommandTimer(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        ms = event.duration_micros / 1000.0
+        stats.command(event.command_name, ms)
+        req = current.get()
+        if req is not None:
+            req.commands.append((event.command_name, ms))
+            req.docs += _docs_in(event.reply)
+            if DB_MONITOR_BYTES:
+                req.bytes += len(encode(event.reply))
+
+    def failed(self, event):
+        ms = event.duration_micros / 1000.0
+        stats.command(event.command_name, ms, error=True)
+        req = current.get()
+        if req is not None:
+            req.commands.append((event.command_name, ms))
+            req.errors += 1
+
+
+class PoolWaits(monitoring.ConnectionPoolListener):
+    """Checkout waits (pymongo>=4.7 reports them; older versions are timed here)."""
+    _started = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._started.t0 = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        wait = getattr(event, "duration", None)
+        if wait is None:
+            wait = time.perf_counter() - getattr(self._started, "t0", time.perf_counter())
+        ms = wait * 1000.0
+        with _lock:
+            p = stats.pool
+            p["checkouts"] += 1
+            p["checked_out"] += 1
+            p["checkout_wait_ms_total"] += ms
+            p["checkout_wait_ms_max"] = max(p["checkout_wait_ms_max"], ms)
+
+    def connection_check_out_failed(self, event):
+        with _lock:
+            stats.pool["checkout_failed"] += 1
+
+    def connection_checked_in(self, event):
+        with _lock:
+            stats.pool["checked_out"] -= 1
+
+    def connection_created(self, event):
+        with _lock:
+            stats.pool["connections_created"] += 1
+
+    def connection_closed(self, event):
+        with _lock:
+            stats.pool["connections_closed"] += 1
+
+    def connection_ready(self, event): pass
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+
+
+def listeners() -> list:
+    return [CommandTimer(), PoolWaits()]
@@ -2,22 +2,53 @@ from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from .auth import decode_token
 from .db import users
+from .usercache import user_cache, PROFILE_FIELDS
 from bson import ObjectId
+from bson.errors import InvalidId
 
 bearer = HTTPBearer(auto_error=False)
 
-async def get_current_user(creds: HTTPAuthorizationCredentials = Depends(bearer)):
+def _token_payload(creds: HTTPAuthorizationCredentials | None) -> dict:
     if not creds or not creds.scheme.lower() == "bearer":
         raise HTTPException(status_code=401, detail="Unauthorized")
     payload = decode_token(creds.credentials)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    uid = payload.get("id")
-    if not uid:
+    if not payload.get("id"):
         raise HTTPException(status_code=401, detail="Invalid token payload")
-    doc = await users.find_one({"_id": ObjectId(uid)})
+    return payload
+
+async def load_user(uid: str) -> dict:
+    doc = user_cache.get(uid)
+    if doc:
+        return doc
+    try:
+        doc = await users.find_one({"_id": ObjectId(uid)}, PROFILE_FIELDS)
+    except InvalidId:
+        doc = None
     if not doc:
         raise HTTPException(status_code=401, detail="User not found")
     # normalize
-    doc["id"] = str(doc["_id"])
+    doc["id"] = str(doc.pop("_id"))
+    user_cache.put(uid, doc)
     return doc
+
+async def get_current_user(creds: HTTPAuthorizationCredentials = Depends(bearer)):
+    payload = _token_payload(creds)
+    return await load_user(payload["id"])
+
+async def get_token_user(creds: HTTPAuthorizationCredentials = Depends(bearer)):
+    """
+    For read-only routes: trust the token's `profile` claim (see JWT_PROFILE_CLAIMS)
+    and skip the user lookup; tokens without it fall back to get_current_user.
+    A cached profile wins over the claim, since the claim is as old as the
+    token and PUT /users/me refreshes the cache.
+    """
+    payload = _token_payload(creds)
+    cached = user_cache.get(payload["id"])
+    if cached:
+        return cached
+    profile = payload.get("profile")
+    if not isinstance(profile, dict):
+        return await load_user(payload["id"])
+    return {"id": payload["id"], "name": payload.get("name"), "email": payload.get("email"), **profile}
@@ -0,0 +1,88 @@
+# backend/app/etag.py
+"""
+Conditional GETs for the per-day reads the home page polls (plan, meal and
+activity summaries, coach score, meal log).
+
+Each day's rollup carries a version counter `v`, incremented by the same
+update that changes it (rollups.rollup_update, rebuild) and by a profile
+change for today (scores.invalidate_day). A route's ETag hashes the route,
+user, day, that version, the profile fields it depends on and its query
+parameters, so answering If-None-Match costs one indexed read of `v` and
+skips the aggregation and the body:
+
+    etag = await day_tag("meals/summary", user, dateISO)
+    if (r := not_modified(request, etag)) is not None:
+        return r
+    tag(response, etag)
+
+Days with activity still in the write-behind buffer get no ETag (their
+version has not moved yet).
+"""
+import hashlib, json
+from fastapi import Request, Response
+
+from .db import rollups
+from .scores import PROFILE_FIELDS
+from .writebehind import activity_buffer
+from . import metrics
+
+CACHE_CONTROL = "private, no-cache"   # browsers keep the body but revalidate every time
+
+
+class _Stats:
+    def __init__(self):
+        self.tagged = self.not_modified = self.untagged = 0
+
+    def snapshot(self) -> dict:
+        return {"tagged": self.tagged, "not_modified": self.not_modified, "untagged": self.untagged}
+
+
+stats = _Stats()
+metrics.register("etag", stats.snapshot)
+
+
+def make(*parts) -> str:
+    raw = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return '"' + hashlib.sha1(raw.encode()).hexdigest()[:20] + '"'
+
+
+def profile_tag(route: str, user: dict, *params) -> str:
+    """For answers that depend only on the profile (the plan)."""
+    return make(route, user["id"], {k: user.get(k) for k in sorted(PROFILE_FIELDS)}, params)
+
+
+async def day_version(user_id: str, dateISO: str) -> int | None:
+    """The day's data version, or None while write-behind increments are pending."""
+    if activity_buffer.has_pending(user_id, dateISO):
+        return None
+    doc = await rollups.find_one({"userId": user_id, "dateISO": dateISO}, {"_id": 0, "v": 1})
+    return (doc or {}).get("v", 0)
+
+
+async def day_tag(route: str, user: dict, dateISO: str, *params) -> str | None:
+    v = await day_version(user["id"], dateISO)
+    if v is None:
+        stats.untagged += 1
+        return None
+    return make(route, user["id"], dateISO, v, {k: user.get(k) for k in sorted(PROFILE_FIELDS)}, params)
+
+
+def not_modified(request: Request, etag: str | None) -> Response | None:
+    """A 304 when If-None-Match carries `etag` (weak or strong), else None."""
+    if etag is None:
+        return None
+    header = request.headers.get("if-none-match")
+    if header:
+        tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+        if etag in tags or "*" in tags:
+            stats.not_modified += 1
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return None
+
+
+def tag(response: Response, etag: str | None):
+    if etag is None:
+        return
+    stats.tagged += 1
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
@@ -0,0 +1,108 @@
+# backend/app/fdc.py
+"""USDA FoodData Central helpers shared by the routes and the local index."""
+import asyncio
+import numpy as np
+
+from . import upstream
+
+# POST /foods accepts at most this many fdcIds per call
+BATCH_LIMIT = 20
+
+
+async def fetch_foods(ids: list[int], api_key: str, prio: int = upstream.DETAIL
+                      ) -> tuple[dict[int, dict], set[int], upstream.BudgetExhausted | None]:
+    """
+    FDC records for `ids` via POST /foods, BATCH_LIMIT ids per call, the calls
+    running concurrently through the upstream scheduler. Returns ({id: food},
+    ids whose call failed, the longest BudgetExhausted among those failures or
+    None); ids in neither set were not found upstream.
+    """
+    chunks = [ids[i:i + BATCH_LIMIT] for i in range(0, len(ids), BATCH_LIMIT)]
+
+    async def one(chunk):
+        r = await upstream.request("POST", "/foods", prio, params={"api_key": api_key}, json={"fdcIds": chunk})
+        r.raise_for_status()
+        return r.json() or []
+
+    found, failed, over_budget = {}, set(), None
+    for chunk, res in zip(chunks, await asyncio.gather(*(one(c) for c in chunks), return_exceptions=True)):
+        if isinstance(res, Exception):
+            failed.update(chunk)
+            if isinstance(res, upstream.BudgetExhausted) and (
+                    over_budget is None or res.retry_after > over_budget.retry_after):
+                over_budget = res
+            continue
+        for food in res:
+            if food.get("fdcId") is not None:
+                found[int(food["fdcId"])] = food
+    return found, failed, over_budget
+
+
+# FDC nutrient id -> field, one per aggregates.NUTRIENTS field; where a field has
+# several ids the first one present wins (energy: kcal row, then Atwater general/specific)
+NUTRIENT_IDS = {
+    "kcal":      (1008, 2047, 2048),
+    "carb_g":    (1005,),
+    "protein_g": (1003,),
+    "fat_g":     (1004,),
+    "fiber_g":   (1079,),
+    "sugar_g":   (2000, 1063),
+    "sodium_mg": (1093,),
+}
+# the same nutrients by their legacy number, for abridged records without ids
+_NUMBERS = {"208": 1008, "957": 2047, "958": 2048, "205": 1005, "203": 1003, "204": 1004,
+            "291": 1079, "269": 2000, "307": 1093}
+_SLOT = {nid: (slot, rank) for slot, ids in enumerate(NUTRIENT_IDS.values()) for rank, nid in enumerate(ids)}
+
+
+def amounts(food_json: dict) -> np.ndarray:
+    """Per-100 g amounts (FDC's basis for foodNutrients) in NUTRIENT_IDS order; NaN where absent."""
+    vec = np.full(len(NUTRIENT_IDS), np.nan)
+    best = [len(_SLOT)] * len(NUTRIENT_IDS)
+    for n in (food_json.get("foodNutrients") or []):
+        nut = n.get("nutrient") or {}
+        nid = nut.get("id", n.get("nutrientId"))
+        if nid not in _SLOT:
+            nid = _NUMBERS.get(str(nut.get("number", n.get("nutrientNumber")) or ""))
+        val = n.get("amount", n.get("value"))
+        if nid is None or val is None:
+            continue
+        slot, rank = _SLOT[nid]
+        if rank < best[slot]:
+            vec[slot], best[slot] = float(val), rank
+    return vec
+
+
+def pick_macros(food_json: dict):
+    return {k: None if np.isnan(v) else float(v) for k, v in zip(NUTRIENT_IDS, amounts(food_json))}
+
+
+def search_item(f: dict) -> dict:
+    """One /nutrition/search result."""
+    return {
+        "fdcId": f.get("fdcId"),
+        "description": f.get("description"),
+        "brandOwner": f.get("brandOwner"),
+        "dataType": f.get("dataType"),
+        "servingSize": f.get("servingSize"),
+        "servingSizeUnit": f.get("servingSizeUnit"),
+    }
+
+
+def food_detail(food: dict, macros: dict | None = None) -> dict:
+    """
+    /nutrition/food/{fdcId} body from an FDC food record. `macros` are per
+    100 g (FDC's basis); they are sent both as the long-standing
+    "macros_per_serving" the UI reads and as "per_100g", which says what
+    they are and is what nutrients.py scales.
+    """
+    grams = food.get("servingSize") or 100
+    unit  = food.get("servingSizeUnit") or "g"
+    per_100g = macros if macros is not None else pick_macros(food)
+    return {
+        "fdcId": food.get("fdcId"),
+        "description": food.get("description"),
+        "serving": {"amount": grams, "unit": unit},
+        "macros_per_serving": per_100g,
+        "per_100g": per_100g,
+    }
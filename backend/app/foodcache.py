@@ -0,0 +1,270 @@
+# backend/app/foodcache.py
+"""
+Caches for FoodData Central answers (food details and search pages).
+
+Each cache is a per-process LRU + TTL in front of an optional SQLite file
+(FOOD_CACHE_DB) that every worker on the host reads and writes, so one
+worker's lookup warms the others. Entries have three ages:
+
+  fresh   age <= ttl                 served as is
+  stale   ttl < age <= ttl + stale   served at once, refreshed in the background
+  expired older                      refetched by the request
+
+Lookups that came back 404 are remembered for neg_ttl and answered without
+calling upstream. Concurrent misses for one key share a single fetch. When a
+fetch fails (upstream down, FDC budget exhausted) an expired copy that is
+still held is served instead.
+
+SQLite calls run in worker threads (asyncio.to_thread), never on the event
+loop: reads are awaited, writes are started in the background (memory already
+has the value). Every PRUNE_EVERY writes a cache deletes its rows that are
+past ttl + stale (404s past neg_ttl), so the file does not grow without bound.
+"""
+import asyncio, json, sqlite3, threading, time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Awaitable, Callable
+
+from .config import (FOOD_CACHE_DB, FOOD_CACHE_TTL, FOOD_CACHE_STALE, FOOD_CACHE_NEG_TTL, FOOD_CACHE_MAX,
+                     SEARCH_CACHE_TTL, SEARCH_CACHE_MAX)
+from . import metrics
+
+
+# True inside background refreshes, so upstream.py can queue them last
+refreshing: ContextVar[bool] = ContextVar("food_cache_refreshing", default=False)
+
+PRUNE_EVERY = 500   # shared-tier writes between deletes of dead rows
+
+
+class NotFound(Exception):
+    """Upstream said 404 (possibly remembered from an earlier lookup)."""
+
+
+class SharedTier:
+    """Key-value rows in one SQLite file (WAL), shared by the workers on a host."""
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as c:
+            c.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, stored REAL, neg INTEGER, value TEXT)")
+            c.execute("CREATE INDEX IF NOT EXISTS cache_stored ON cache (stored)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        row = self._conn().execute("SELECT stored, neg, value FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        stored, neg, value = row
+        return stored, bool(neg), None if neg else json.loads(value)
+
+    def get_many(self, keys: list[str]) -> dict:
+        out = {}
+        for i in range(0, len(keys), 500):   # under SQLite's bound-parameter limit
+            chunk = keys[i:i + 500]
+            rows = self._conn().execute(
+                f"SELECT key, stored, neg, value FROM cache WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            for k, stored, neg, value in rows:
+                out[k] = stored, bool(neg), None if neg else json.loads(value)
+        return out
+
+    def put(self, key: str, stored: float, neg: bool, value):
+        # a slower thread (or worker) must not overwrite a newer row with an older one
+        self._conn().execute("INSERT INTO cache (key, stored, neg, value) VALUES (?, ?, ?, ?) "
+                             "ON CONFLICT (key) DO UPDATE SET stored = excluded.stored, neg = excluded.neg, "
+                             "value = excluded.value WHERE excluded.stored >= cache.stored",
+                             (key, stored, int(neg), None if neg else json.dumps(value)))
+
+    def prune(self, prefix: str, before: float, neg_before: float) -> int:
+        """Delete `prefix` rows stored before `before` (404 rows before `neg_before`)."""
+        cur = self._conn().execute("DELETE FROM cache WHERE key GLOB ? AND (stored < ? OR (neg = 1 AND stored < ?))",
+                                   (prefix + "*", before, neg_before))
+        return cur.rowcount
+
+
+class FoodCache:
+    def __init__(self, name: str, maxsize: int, ttl: float, stale: float, neg_ttl: float,
+                 shared: SharedTier | None = None):
+        self.name, self.maxsize, self.ttl, self.stale, self.neg_ttl = name, maxsize, ttl, stale, neg_ttl
+        self.shared = shared
+        self._data: OrderedDict[str, tuple[float, bool, object]] = OrderedDict()  # key -> (stored, neg, value)
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.hits = self.stale_hits = self.negative_hits = self.shared_hits = self.misses = 0
+        self.evictions = self.refreshes = self.refresh_errors = self.expired_served = 0
+        self.shared_errors = self.pruned = self._puts = 0
+        self._writes: set[asyncio.Task] = set()   # background shared-tier writes, referenced until done
+
+    # ---- tiers ----
+
+    def _remember(self, key: str, rec: tuple):
+        self._data[key] = rec
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def _shared_get(self, key: str):
+        try:
+            return await asyncio.to_thread(self.shared.get, f"{self.name}:{key}")
+        except sqlite3.Error:
+            self.shared_errors += 1
+            return None
+
+    async def _lookup(self, key: str):
+        rec = self._data.get(key)
+        if rec is not None:
+            self._data.move_to_end(key)
+            return rec
+        if self.shared is not None:
+            rec = await self._shared_get(key)
+            if rec is not None:
+                self.shared_hits += 1
+                self._remember(key, rec)
+                return rec
+        return None
+
+    async def warm(self, keys: list[str]):
+        """Pull the shared tier's rows for `keys` not held in memory, in one read, so held() sees them."""
+        keys = [k for k in dict.fromkeys(keys) if k not in self._data]
+        if self.shared is None or not keys:
+            return
+        try:
+            rows = await asyncio.to_thread(self.shared.get_many, [f"{self.name}:{k}" for k in keys])
+        except sqlite3.Error:
+            self.shared_errors += 1
+            return
+        for k in keys:
+            rec = rows.get(f"{self.name}:{k}")
+            if rec is not None and k not in self._data:
+                self.shared_hits += 1
+                self._remember(k, rec)
+
+    def put(self, key: str, value, neg: bool = False):
+        rec = (time.time(), neg, value)
+        self._remember(key, rec)
+        if self.shared is not None:
+            task = asyncio.get_running_loop().create_task(self._shared_put(key, rec))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    async def _shared_put(self, key: str, rec: tuple):
+        self._puts += 1
+        try:
+            await asyncio.to_thread(self.shared.put, f"{self.name}:{key}", *rec)
+            if self._puts % PRUNE_EVERY == 1:
+                now = time.time()
+                self.pruned += await asyncio.to_thread(self.shared.prune, f"{self.name}:",
+                                                       now - self.ttl - self.stale, now - self.neg_ttl)
+        except sqlite3.Error:
+            self.shared_errors += 1  # the shared tier is best effort; memory still has it
+
+    # ---- lookups ----
+
+    async def peek(self, key: str) -> tuple[str, object] | None:
+        """("fresh" | "stale" | "negative", value) without calling upstream; None if unknown or expired."""
+        rec = await self._lookup(key)
+        if rec is not None:
+            stored, neg, value = rec
+            age = time.time() - stored
+            if neg and age <= self.neg_ttl:
+                self.negative_hits += 1
+                return "negative", None
+            if not neg and age <= self.ttl:
+                self.hits += 1
+                return "fresh", value
+            if not neg and age <= self.ttl + self.stale:
+                self.stale_hits += 1
+                return "stale", value
+        self.misses += 1
+        return None
+
+    def held(self, key: str):
+        """The value held in memory whatever its age (None if absent or negative); no stats, no SQLite."""
+        rec = self._data.get(key)
+        return None if rec is None or rec[1] else rec[2]
+
+    async def last_known(self, key: str):
+        """The held value whatever its age, from memory or the shared tier (None if absent or negative); no stats."""
+        rec = self._data.get(key)
+        if rec is None and self.shared is not None:
+            rec = await self._shared_get(key)
+        return None if rec is None or rec[1] else rec[2]
+
+    async def fetch(self, key: str, loader: Callable[[], Awaitable[object]]):
+        """
+        Cached value for `key`, calling `loader` when needed. `loader` returns the
+        value, or None for "not found" (cached negatively, raised as NotFound).
+        """
+        hit = await self.peek(key)
+        if hit is not None:
+            state, value = hit
+            if state == "negative":
+                raise NotFound(key)
+            if state == "stale" and key not in self._inflight:
+                asyncio.create_task(self._refresh(key, loader))
+            return value
+        try:
+            value = await self._load(key, loader)
+        except Exception:
+            value = await self.last_known(key)
+            if value is None:
+                raise
+            self.expired_served += 1
+            return value
+        if value is None:
+            raise NotFound(key)
+        return value
+
+    async def _load(self, key: str, loader):
+        fut = self._inflight.get(key)
+        if fut is not None:
+            return await asyncio.shield(fut)
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            value = await loader()
+            self.put(key, value, neg=value is None)
+            fut.set_result(value)
+            return value
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # retrieved here so waiters alone see it
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _refresh(self, key: str, loader):
+        refreshing.set(True)   # this task only
+        self.refreshes += 1
+        try:
+            await self._load(key, loader)
+        except Exception:
+            self.refresh_errors += 1  # keep serving the stale copy
+
+    def stats(self) -> dict:
+        served = self.hits + self.stale_hits + self.negative_hits
+        total = served + self.misses
+        return {"size": len(self._data), "maxsize": self.maxsize, "ttl_s": self.ttl, "stale_s": self.stale,
+                "shared": self.shared is not None, "hits": self.hits, "stale_hits": self.stale_hits,
+                "negative_hits": self.negative_hits, "shared_hits": self.shared_hits, "misses": self.misses,
+                "hit_rate": round(served / total, 4) if total else 0.0, "evictions": self.evictions,
+                "refreshes": self.refreshes, "refresh_errors": self.refresh_errors,
+                "expired_served": self.expired_served, "shared_errors": self.shared_errors, "pruned": self.pruned}
+
+
+def search_key(q: str, page_size: int) -> str:
+    return f"{' '.join(q.lower().split())}|{page_size}"
+
+
+_shared = SharedTier(FOOD_CACHE_DB) if FOOD_CACHE_DB else None
+food_cache = FoodCache("food", FOOD_CACHE_MAX, FOOD_CACHE_TTL, FOOD_CACHE_STALE, FOOD_CACHE_NEG_TTL, _shared)
+search_cache = FoodCache("search", SEARCH_CACHE_MAX, SEARCH_CACHE_TTL, SEARCH_CACHE_TTL, FOOD_CACHE_NEG_TTL, _shared)
+metrics.register("food_cache", food_cache.stats)
+metrics.register("search_cache", search_cache.stats)
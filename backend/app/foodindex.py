@@ -0,0 +1,156 @@
+# backend/app/foodindex.py
+"""
+Local FoodData Central index so /nutrition/search and /nutrition/food answer
+without calling api.nal.usda.gov.
+
+Build it from the FDC bulk JSON downloads (Foundation, SR Legacy, FNDDS) at
+https://fdc.nal.usda.gov/download-datasets :
+
+    python -m app.foodindex build FoodData_Central_foundation_food_json_*.json \\
+        FoodData_Central_sr_legacy_food_json_*.json FoodData_Central_survey_food_json_*.json
+    python -m app.foodindex build seeds/fdc_sample.json --out /tmp/fdc.jsonl.gz   # small extract
+    python -m app.foodindex search "greek yog"
+
+The output (FDC_LOCAL_INDEX) is gzipped JSON lines, one food per line with its
+macros already in the pick_macros shape. It is loaded once per process into
+memory: foods by id, a token -> ids posting list, and a sorted token list that
+is bisected for prefix matches, so the last word of a query can be partial.
+"""
+import argparse, bisect, gzip, json, re, time
+from pathlib import Path
+
+from .config import FDC_LOCAL_INDEX
+from .fdc import pick_macros, search_item, food_detail
+
+# bulk file top-level keys -> dataType as the API reports it
+_BULK_KEYS = {"FoundationFoods": "Foundation", "SRLegacyFoods": "SR Legacy", "SurveyFoods": "Survey (FNDDS)"}
+# ranking tie-break, same preference as the search route's dataType filter order
+_TYPE_RANK = {"Foundation": 0, "SR Legacy": 1, "Survey (FNDDS)": 2}
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokens(text: str) -> list[str]:
+    return _TOKEN.findall((text or "").lower())
+
+
+# ---------- import ----------
+
+def _records(path: Path):
+    with open(path, "rb") as f:
+        data = json.load(f)
+    for key, data_type in _BULK_KEYS.items():
+        for food in data.get(key) or []:
+            yield {
+                "fdcId": food.get("fdcId"),
+                "description": food.get("description"),
+                "dataType": food.get("dataType") or data_type,
+                "servingSize": food.get("servingSize"),
+                "servingSizeUnit": food.get("servingSizeUnit"),
+                "macros": pick_macros(food),
+            }
+
+
+def build(paths: list[str], out: str) -> int:
+    n = 0
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(out, "wt", encoding="utf-8") as f:
+        for p in paths:
+            for rec in _records(Path(p)):
+                if rec["fdcId"] is None or not rec["description"]:
+                    continue
+                f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+                n += 1
+    return n
+
+
+# ---------- in-memory index ----------
+
+class FoodIndex:
+    def __init__(self, foods: list[dict]):
+        self.foods: dict[int, dict] = {}
+        postings: dict[str, set[int]] = {}
+        for rec in foods:
+            fid = int(rec["fdcId"])
+            self.foods[fid] = rec
+            for t in set(tokens(rec["description"])):
+                postings.setdefault(t, set()).add(fid)
+        self.postings = postings
+        self.vocab = sorted(postings)   # bisected for prefix matches
+
+    @classmethod
+    def load(cls, path: str) -> "FoodIndex":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return cls([json.loads(line) for line in f if line.strip()])
+
+    def __len__(self):
+        return len(self.foods)
+
+    def __contains__(self, fid: int):
+        return fid in self.foods
+
+    def _prefix_ids(self, prefix: str) -> set[int]:
+        ids: set[int] = set()
+        i = bisect.bisect_left(self.vocab, prefix)
+        while i < len(self.vocab) and self.vocab[i].startswith(prefix):
+            ids |= self.postings[self.vocab[i]]
+            i += 1
+        return ids
+
+    def search(self, q: str, page_size: int) -> dict:
+        """{"total", "items"}: foods whose description has every query word (the last may be a prefix)."""
+        words = tokens(q)
+        if not words:
+            return {"total": 0, "items": []}
+        hits: set[int] | None = None
+        for n, w in enumerate(words):
+            ids = self._prefix_ids(w) if n == len(words) - 1 else self.postings.get(w, set())
+            hits = ids if hits is None else hits & ids
+            if not hits:
+                return {"total": 0, "items": []}
+        ql = q.strip().lower()
+
+        def rank(fid: int):
+            desc = self.foods[fid]["description"].lower()
+            return (not desc.startswith(ql), _TYPE_RANK.get(self.foods[fid]["dataType"], 9), len(desc), fid)
+
+        top = sorted(hits, key=rank)[:page_size]
+        return {"total": len(hits), "items": [search_item(self.foods[fid]) for fid in top]}
+
+    def detail(self, fid: int) -> dict | None:
+        rec = self.foods.get(fid)
+        return food_detail(rec, rec["macros"]) if rec else None
+
+
+_index: FoodIndex | None = None
+
+
+def get_index() -> FoodIndex | None:
+    """The process-wide index, loaded on first use; None when FDC_LOCAL_INDEX doesn't exist."""
+    global _index
+    if _index is None and FDC_LOCAL_INDEX and Path(FDC_LOCAL_INDEX).is_file():
+        t0 = time.perf_counter()
+        _index = FoodIndex.load(FDC_LOCAL_INDEX)
+        print(f"[foodindex] loaded {len(_index)} foods in {time.perf_counter() - t0:.2f}s")
+    return _index
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Build or query the local FoodData Central index.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="import FDC bulk JSON files")
+    b.add_argument("files", nargs="+")
+    b.add_argument("--out", default=FDC_LOCAL_INDEX)
+    s = sub.add_parser("search", help="query the built index")
+    s.add_argument("q")
+    s.add_argument("--index", default=FDC_LOCAL_INDEX)
+    s.add_argument("--n", type=int, default=10)
+    args = ap.parse_args()
+    if args.cmd == "build":
+        print(f"[foodindex] wrote {build(args.files, args.out)} foods to {args.out}")
+    else:
+        idx = FoodIndex.load(args.index)
+        t0 = time.perf_counter()
+        res = idx.search(args.q, args.n)
+        print(f"[foodindex] {res['total']} hits in {(time.perf_counter() - t0) * 1000:.3f} ms")
+        for it in res["items"]:
+            print(f"  {it['fdcId']:>8}  {it['dataType']:<15} {it['description']}")
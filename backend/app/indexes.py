@@ -0,0 +1,208 @@
+# backend/app/indexes.py
+"""
+Every index the routes rely on, declared in one place and applied idempotently.
+
+    python -m app.indexes            # create what is missing, report drift
+    python -m app.indexes --check    # report only; exit 1 on drift
+    python -m app.indexes --prune    # also drop undeclared indexes
+    python -m app.indexes --explain [--user UID]
+
+--explain runs explain("executionStats") for each route's query shape
+(queries()) against the configured database and exits 1 if any plan uses a
+COLLSCAN, sorts in memory (a SORT stage) or examines more than
+MAX_EXAMINED_RATIO x the documents it returns. tests/test_index_plans.py runs
+the same check when a mongod is reachable.
+Run it against a local mongod with realistic data before shipping a new query
+or index change.
+
+Drift is reported as missing (declared, not on the server), conflicting (same
+name, different keys/options: fix by hand, never auto-dropped) and extra (on
+the server, not declared; only dropped with --prune).
+"""
+import argparse, asyncio
+from datetime import date, timedelta
+from pymongo import IndexModel, ASCENDING as ASC, DESCENDING as DESC
+from pymongo.errors import OperationFailure
+
+from .db import _db, users, activity, meals, rollups, digests
+from .aggregates import activity_day_pipeline
+from .paging import SORT
+
+# collection -> declared indexes (names are explicit so drift checks are by name)
+INDEXES: dict[str, list[IndexModel]] = {
+    users.name: [
+        IndexModel([("email", ASC)], name="email_1", unique=True),            # register / login
+    ],
+    activity.name: [
+        # day summaries, exports and keyset pages (prefix covers userId+dateISO lookups)
+        IndexModel([("userId", ASC), ("dateISO", DESC), ("_id", DESC)], name="userId_1_dateISO_-1__id_-1"),
+        # /activity/log/upsert and bulk/write-behind flushes match on the full key
+        IndexModel([("userId", ASC), ("dateISO", ASC), ("type", ASC)], name="userId_1_dateISO_1_type_1"),
+    ],
+    meals.name: [
+        # one document per day (mealdays.py); needs `python -m app.mealdays` on older data
+        IndexModel([("userId", ASC), ("dateISO", DESC)], name="userId_1_dateISO_-1", unique=True),
+        IndexModel([("userId", ASC), ("dateISO", DESC), ("_id", DESC)], name="userId_1_dateISO_-1__id_-1"),
+    ],
+    rollups.name: [
+        IndexModel([("userId", ASC), ("dateISO", DESC)], name="userId_1_dateISO_-1", unique=True),
+        # precompute's active users (covered; dateISO never changes, so only inserts touch it)
+        IndexModel([("dateISO", DESC), ("userId", ASC)], name="dateISO_-1_userId_1"),
+    ],
+    digests.name: [
+        IndexModel([("userId", ASC), ("dateISO", ASC), ("goal", ASC)], name="userId_1_dateISO_1_goal_1", unique=True),
+        IndexModel([("computedAt", ASC)], name="computedAt_1", expireAfterSeconds=3 * 24 * 3600),
+    ],
+}
+
+_COLLS = {c.name: c for c in (users, activity, meals, rollups, digests)}
+_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+
+def _spec(doc: dict) -> tuple:
+    return tuple((k, int(v)) for k, v in doc["key"]) + tuple((o, doc.get(o)) for o in _OPTIONS if doc.get(o))
+
+
+async def drift() -> dict[str, dict[str, list[str]]]:
+    """{collection: {"missing": [...], "conflicting": [...], "extra": [...]}}"""
+    out = {}
+    for name, models in INDEXES.items():
+        have = await _COLLS[name].index_information()
+        have = {n: _spec({"key": info["key"], **info}) for n, info in have.items() if n != "_id_"}
+        want = {m.document["name"]: _spec({**m.document, "key": list(m.document["key"].items())}) for m in models}
+        out[name] = {
+            "missing": sorted(n for n in want if n not in have),
+            "conflicting": sorted(n for n in want if n in have and have[n] != want[n]),
+            "extra": sorted(n for n in have if n not in want),
+        }
+    return out
+
+
+async def ensure_indexes(prune: bool = False) -> dict:
+    """
+    Create missing indexes (and drop extras with prune=True). Returns the drift
+    found before, plus per collection the indexes that could not be built.
+    """
+    found = await drift()
+    for name, d in found.items():
+        coll = _COLLS[name]
+        d["errors"] = []
+        for m in INDEXES[name]:
+            if m.document["name"] not in d["missing"]:
+                continue
+            try:
+                await coll.create_indexes([m])
+            except OperationFailure as e:
+                # e.g. a unique index over data that still has duplicates
+                d["errors"].append(f"{m.document['name']}: {e}")
+        if prune:
+            for n in d["extra"]:
+                await coll.drop_index(n)
+    return found
+
+
+# ---------- query plans ----------
+
+MAX_EXAMINED_RATIO = 10
+
+def _find(coll, flt, sort=None, limit=0):
+    cmd = {"find": coll.name, "filter": flt}
+    if sort:
+        cmd["sort"] = dict(sort)
+    if limit:
+        cmd["limit"] = limit
+    return cmd
+
+
+def _agg(coll, pipeline):
+    return {"aggregate": coll.name, "pipeline": pipeline, "cursor": {}}
+
+
+# (label, command) for each route query shape
+def queries(uid: str, dateISO: str, email: str) -> list[tuple[str, dict]]:
+    day = {"userId": uid, "dateISO": dateISO}
+    lo = (date.fromisoformat(dateISO) - timedelta(days=29)).isoformat()
+    rng = {"userId": uid, "dateISO": {"$gte": lo, "$lte": dateISO}}
+    return [
+        ("auth: user by email", _find(users, {"email": email}, limit=1)),
+        ("activity: upsert key", _find(activity, {**day, "type": "walk"}, limit=1)),
+        ("activity: logs page", _find(activity, {"userId": uid}, SORT, 31)),
+        ("activity: day by type", _agg(activity, activity_day_pipeline(uid, dateISO))),
+        ("activity: export", _find(activity, {"userId": uid}, [("dateISO", 1), ("_id", 1)])),
+        ("meals: day doc", _find(meals, day, limit=1)),
+        ("meals: logs page", _find(meals, {"userId": uid}, SORT, 31)),
+        ("rollups: day", _find(rollups, day, limit=1)),
+        ("rollups: range", _find(rollups, rng, [("dateISO", 1)])),
+        ("precompute: active users", _agg(rollups, [{"$match": {"dateISO": {"$gte": lo}}},
+                                                    {"$group": {"_id": "$userId"}}])),
+        ("digests: day", _find(digests, {**day, "goal": "maintain"}, limit=1)),
+    ]
+
+
+def _walk(node, stages: list, stats: list):
+    if isinstance(node, dict):
+        if isinstance(node.get("stage"), str):
+            stages.append(node["stage"])
+        if "totalDocsExamined" in node and "nReturned" in node:
+            stats.append((node["totalDocsExamined"], node["nReturned"]))
+        for v in node.values():
+            _walk(v, stages, stats)
+    elif isinstance(node, list):
+        for v in node:
+            _walk(v, stages, stats)
+
+
+async def check_plans(user_id: str | None = None) -> list[dict]:
+    """explain() every route query; each result carries `ok` and the reasons it failed."""
+    sample = await activity.find_one({"userId": user_id} if user_id else {}) or \
+        await meals.find_one({"userId": user_id} if user_id else {}) or {}
+    u = await users.find_one({}, {"email": 1}) or {}
+    uid = user_id or sample.get("userId", "000000000000000000000000")
+    dateISO = sample.get("dateISO", "2024-01-01")
+
+    results = []
+    for label, cmd in queries(uid, dateISO, u.get("email", "nobody@example.com")):
+        plan = await _db.command({"explain": cmd, "verbosity": "executionStats"})
+        stages, stats = [], []
+        _walk(plan, stages, stats)
+        examined = sum(s[0] for s in stats)
+        returned = max((s[1] for s in stats), default=0)
+        problems = []
+        if "COLLSCAN" in stages:
+            problems.append("COLLSCAN")
+        if "SORT" in stages:
+            problems.append("in-memory SORT")
+        if examined > MAX_EXAMINED_RATIO * max(returned, 1):
+            problems.append(f"examined {examined} for {returned} returned")
+        results.append({"query": label, "ok": not problems, "problems": problems,
+                        "examined": examined, "returned": returned})
+    return results
+
+
+async def _main(args) -> int:
+    if args.explain:
+        results = await check_plans(args.user)
+        for r in results:
+            print(f"[plans] {'ok  ' if r['ok'] else 'FAIL'} {r['query']}: examined={r['examined']} "
+                  f"returned={r['returned']} {'; '.join(r['problems'])}")
+        return 0 if all(r["ok"] for r in results) else 1
+
+    found = await drift() if args.check else await ensure_indexes(prune=args.prune)
+    for name, d in found.items():
+        for kind in ("missing", "conflicting", "extra", "errors"):
+            for n in d[kind]:
+                print(f"[indexes] {name}: {kind} {n}")
+    if not args.check:
+        print("[indexes] applied")
+    dirty = any(d["missing"] or d["conflicting"] for d in found.values())
+    failed = any(d.get("errors") for d in found.values())
+    return 1 if (args.check and dirty) or failed else 0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Apply or check the declared MongoDB indexes.")
+    ap.add_argument("--check", action="store_true", help="report drift without changing anything")
+    ap.add_argument("--prune", action="store_true", help="drop indexes that are not declared")
+    ap.add_argument("--explain", action="store_true", help="check each route query's plan")
+    ap.add_argument("--user", help="userId to sample for --explain")
+    raise SystemExit(asyncio.run(_main(ap.parse_args())))
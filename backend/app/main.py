@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from .routes_auth import router as auth_router
@@ -7,8 +7,15 @@ from .routes_activity import router as activity_router
 from .routes_meals import router as meals_router
 from .routes_nutrition import router as nutrition_router
 from .routes_coach import router as coach_router
+from .routes_dashboard import router as dashboard_router
+from .routes_export import router as export_router
 import numpy as np
-from .config import DIABETES_API_URL, HEART_API_URL
+from .config import DIABETES_API_URL, HEART_API_URL, ENSURE_INDEXES, DB_MONITOR, DB_TIMING_HEADER
+from . import metrics, dbmon, upstream
+from .writebehind import activity_buffer
+from .foodindex import get_index
+from .suggest import get_suggest, popularity
+from .precompute import worker as precompute_worker
 import httpx
 
 # 1) Create the app first
@@ -23,25 +30,74 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Time", "ETag"],
 )
 
+if DB_MONITOR:
+    @app.middleware("http")
+    async def db_time(request: Request, call_next):
+        # commands issued while serving this request are charged to its route (dbmon.py)
+        req = dbmon.RequestDB()
+        token = dbmon.current.set(req)
+        try:
+            response = await call_next(request)
+        finally:
+            dbmon.current.reset(token)
+        route = request.scope.get("route")
+        dbmon.stats.request(f"{request.method} {route.path if route else '(unmatched)'}", req)
+        if DB_TIMING_HEADER:
+            response.headers["X-DB-Time"] = req.header()
+        return response
+
 app.include_router(auth_router)
 app.include_router(users_router)
 app.include_router(activity_router)
 app.include_router(meals_router)
 app.include_router(nutrition_router)
 app.include_router(coach_router)
-
-
-# 3) (Optional) DB init — keep commented while you’re debugging
-# from .db import init_db
-# @app.on_event("startup")
-# async def startup():
-#     try:
-#         await init_db()
-#         print("[db] init OK")
-#     except Exception as e:
-#         print("[db] init FAILED:", e)
+app.include_router(dashboard_router)
+app.include_router(export_router)
+
+
+# 3) DB init: create any missing declared indexes (ENSURE_INDEXES=0 to skip while debugging)
+from .db import init_db
+@app.on_event("startup")
+async def startup():
+    if not ENSURE_INDEXES:
+        return
+    try:
+        found = await init_db()
+        created = sum(len(d["missing"]) - len(d["errors"]) for d in found.values())
+        print(f"[db] init OK (created {created} index(es))")
+        for name, d in found.items():
+            for n in d["conflicting"]:
+                print(f"[db] index drift: {name}.{n} differs from its declaration")
+            for err in d["errors"]:
+                print(f"[db] index not built: {name}.{err}")
+    except Exception as e:
+        print("[db] init FAILED:", e)
+
+@app.on_event("startup")
+async def load_food_index():
+    # pay the local FDC index load before the first /nutrition request (no-op without the file)
+    get_index()
+    try:
+        print(f"[suggest] popularity for {await popularity.load()} foods")
+    except Exception as e:
+        print("[suggest] popularity load FAILED:", e)
+    get_suggest()   # ranked with the popularity just loaded
+
+@app.on_event("startup")
+async def start_precompute():
+    # PRECOMPUTE=inproc: nightly coach digests in this process (precompute.py)
+    precompute_worker.start()
+
+@app.on_event("shutdown")
+async def flush_buffers():
+    # buffered activity increments must reach the DB before the process exits
+    await precompute_worker.stop()
+    await activity_buffer.close()
+    await upstream.aclose()
 
 # --- Demo ML endpoints (fine to keep) ---
 
@@ -56,6 +112,10 @@ def sigmoid(x: float) -> float:
 def health():
     return {"ok": True}
 
+@app.get("/metrics")
+def metrics_snapshot():
+    return metrics.snapshot()
+
 # --- PROXY to ML service ---
 @app.post("/ml/diabetes/screen")
 async def diabetes_screen(payload: PredictPayload):
@@ -0,0 +1,171 @@
+# backend/app/mealdays.py
+"""
+`meal_logs`: one document per (userId, dateISO). Each save $pushes its items
+and an entry record and $incs the running totals, upserting the day:
+
+    {"userId", "dateISO",
+     "items":   [...every item logged that day, in order...],
+     "entries": [{"createdAt", "notes", "items": <n items in this save>}, ...],
+     "count":   <saves>,
+     "totals":  {"kcal", "carb_g", ..., "sodium_mg"},
+     "totalCalories", "createdAt", "updatedAt"}
+
+so every day read is a point lookup on the unique (userId, dateISO) index.
+
+Older data has one document per save; merge it once right after deploying,
+before meals are logged again (safe to re-run if interrupted):
+
+    python -m app.mealdays            # merge per-save documents into day documents
+    python -m app.mealdays --dry-run  # only count what would be merged
+
+A full run (no --user) then rebuilds the (userId, dateISO) index as unique:
+older deployments have a non-unique index under the same name, which
+ensure_indexes reports as conflicting but never replaces.
+"""
+import argparse, asyncio
+from datetime import datetime
+from pymongo import UpdateOne
+
+from .db import meals
+from .aggregates import NUTRIENTS, empty_totals
+
+
+def _number(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def item_totals(items: list[dict]) -> dict:
+    return {k: sum(it.get(k) for it in items if _number(it.get(k))) for k in NUTRIENTS}
+
+
+def day_update(saves: list[tuple[list[dict], str | None]], now: str | None = None) -> dict:
+    """Update for one or more saves [(items, notes)] landing on the same day."""
+    now = now or datetime.utcnow().isoformat()
+    items = [it for its, _ in saves for it in its]
+    inc = {"count": len(saves), "totalCalories": sum((it.get("kcal") or 0) for it in items)}
+    inc.update({f"totals.{k}": v for k, v in item_totals(items).items()})
+    return {
+        "$push": {"items": {"$each": items},
+                  "entries": {"$each": [{"createdAt": now, "notes": notes, "items": len(its)} for its, notes in saves]}},
+        "$inc": inc,
+        "$setOnInsert": {"createdAt": now},
+        "$set": {"updatedAt": now},
+    }
+
+
+def day_op(user_id: str, dateISO: str, saves: list[tuple[list[dict], str | None]], now: str | None = None) -> UpdateOne:
+    return UpdateOne({"userId": user_id, "dateISO": dateISO}, day_update(saves, now), upsert=True)
+
+
+async def add(user_id: str, dateISO: str, items: list[dict], notes: str | None = None):
+    await meals.update_one({"userId": user_id, "dateISO": dateISO}, day_update([(items, notes)]), upsert=True)
+
+
+async def read_day(user_id: str, dateISO: str, with_items: bool = False) -> dict:
+    """{"count", "totals"} (+ "items") for one day; zeros when nothing is logged."""
+    proj = {"_id": 0, "count": 1, "totals": 1}
+    if with_items:
+        proj["items"] = 1
+    doc = await meals.find_one({"userId": user_id, "dateISO": dateISO}, proj) or {}
+    out = {"count": doc.get("count", 0), "totals": {**empty_totals(), **(doc.get("totals") or {})}}
+    if with_items:
+        out["items"] = doc.get("items") or []
+    return out
+
+
+# ---------- migration from one document per save ----------
+
+def _legacy_entry(doc: dict) -> dict | None:
+    """The per-save record a pre-migration document stands for (None for pure day docs)."""
+    if "entries" in doc and "notes" not in doc:
+        return None
+    pushed = sum(e.get("items", 0) for e in doc.get("entries") or [])
+    return {"createdAt": doc.get("createdAt"), "notes": doc.get("notes"),
+            "items": len(doc.get("items") or []) - pushed}
+
+
+def merge_docs(docs: list[dict]) -> dict:
+    """Fold a day's documents (oldest first) into one day document."""
+    items, entries, absorbed = [], [], []
+    for doc in docs:
+        absorbed.append(doc["_id"])
+        its = doc.get("items") or []
+        legacy = _legacy_entry(doc)
+        if legacy is not None:
+            # legacy items come first; anything after them was $pushed before the migration ran
+            entries.append(legacy)
+        entries.extend(doc.get("entries") or [])
+        items.extend(its)
+    first = docs[0]
+    totals = item_totals(items)
+    return {
+        "userId": first["userId"], "dateISO": first["dateISO"],
+        "items": items, "entries": entries, "count": len(entries),
+        "totals": totals, "totalCalories": sum((it.get("kcal") or 0) for it in items),
+        "createdAt": min((d.get("createdAt") for d in docs if d.get("createdAt")), default=None),
+        "updatedAt": datetime.utcnow().isoformat(),
+        "mergedFrom": absorbed[1:],
+    }
+
+
+async def _merge_day(docs: list[dict], dry_run: bool) -> bool:
+    # documents a previous (interrupted) run already folded in are only deleted
+    done = {i for d in docs for i in d.get("mergedFrom") or []}
+    pending = [d for d in docs if d["_id"] not in done]
+    if len(pending) == 1 and _legacy_entry(pending[0]) is None and not done:
+        return False
+    if dry_run:
+        return True
+    keep = pending[0]["_id"]
+    merged = merge_docs(pending) if len(pending) > 1 or _legacy_entry(pending[0]) is not None else None
+    if merged is not None:
+        await meals.replace_one({"_id": keep}, merged)
+    await meals.delete_many({"_id": {"$in": [d["_id"] for d in docs if d["_id"] != keep]}})
+    await meals.update_one({"_id": keep}, {"$unset": {"mergedFrom": ""}})
+    return True
+
+
+async def migrate(user_id: str | None = None, dry_run: bool = False) -> dict:
+    """Merge every day that still has per-save or multiple documents."""
+    match = {"userId": user_id} if user_id else {}
+    days = merged = 0
+    group, key = [], None
+    # index order (userId, dateISO desc, _id desc): each day's docs arrive together, newest first
+    cur = meals.find(match).sort([("userId", 1), ("dateISO", -1), ("_id", -1)]).batch_size(500)
+    async for doc in cur:
+        k = (doc.get("userId"), doc.get("dateISO"))
+        if k != key and group:
+            days += 1
+            merged += await _merge_day(group[::-1], dry_run)
+            group = []
+        key = k
+        group.append(doc)
+    if group:
+        days += 1
+        merged += await _merge_day(group[::-1], dry_run)
+    return {"days": days, "merged": merged, "dry_run": dry_run}
+
+
+async def ensure_unique_day_index() -> str:
+    """Replace a non-unique userId_1_dateISO_-1 with the declared unique one; returns what was done."""
+    from .indexes import INDEXES
+    model = next(m for m in INDEXES[meals.name] if m.document.get("unique"))
+    name = model.document["name"]
+    info = (await meals.index_information()).get(name)
+    if info is not None and info.get("unique"):
+        return "already unique"
+    if info is not None:
+        await meals.drop_index(name)
+    await meals.create_indexes([model])   # fails if duplicate day documents remain
+    return "rebuilt unique" if info is not None else "created"
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Merge per-save meal documents into one document per day.")
+    ap.add_argument("--user", help="limit to one userId")
+    ap.add_argument("--dry-run", action="store_true", help="count days that need merging, change nothing")
+    args = ap.parse_args()
+    res = asyncio.run(migrate(args.user, dry_run=args.dry_run))
+    print(f"[mealdays] days={res['days']} {'to merge' if args.dry_run else 'merged'}={res['merged']}")
+    if not args.dry_run and not args.user:
+        print(f"[mealdays] day index: {asyncio.run(ensure_unique_day_index())}")
@@ -0,0 +1,14 @@
+# backend/app/metrics.py
+"""
+In-process metrics registry. Subsystems register a callable returning a dict
+of plain numbers; GET /metrics returns a snapshot of all of them.
+"""
+from typing import Callable
+
+_sources: dict[str, Callable[[], dict]] = {}
+
+def register(name: str, fn: Callable[[], dict]):
+    _sources[name] = fn
+
+def snapshot() -> dict:
+    return {name: fn() for name, fn in _sources.items()}
@@ -0,0 +1,125 @@
+# backend/app/nutrients.py
+"""
+Nutrient engine: one per-gram float vector per food, in aggregates.NUTRIENTS
+order (NaN where FDC has no value), so any portion is `vector * grams`.
+
+A food's vector comes from the per-100 g macros already held for it: the local
+index record's "macros", or the "per_100g" field of the food cache entry
+written by /nutrition/food or /nutrition/foods (both mapped from FDC nutrient
+ids by fdc.amounts). Cache entries written before that field existed are read
+from "macros_per_serving", which always held the same per-100 g values. Vectors are
+built once per food and kept in an LRU; nothing here calls upstream, and only
+prime() touches the shared SQLite tier (callers await it before scaling).
+
+portion() scales a whole list of (fdcId, grams) in one NumPy pass; apply()
+does the same for logged meal items that carry fdcId and grams.
+"""
+from collections import OrderedDict
+import numpy as np
+
+from .aggregates import NUTRIENTS
+from .config import FOOD_CACHE_MAX
+from .fdc import NUTRIENT_IDS
+from .foodindex import get_index
+from .foodcache import food_cache
+from . import metrics
+
+# vectors are built by field name, so only the field sets have to agree
+if set(NUTRIENT_IDS) != set(NUTRIENTS):
+    raise RuntimeError(f"fdc.NUTRIENT_IDS fields {sorted(NUTRIENT_IDS)} differ from aggregates.NUTRIENTS {sorted(NUTRIENTS)}")
+
+_UNKNOWN = np.full(len(NUTRIENTS), np.nan)
+
+
+def from_macros(macros: dict) -> np.ndarray:
+    """Per-gram vector from a per-100 g macros dict (pick_macros shape)."""
+    return np.array([np.nan if macros.get(k) is None else float(macros[k]) for k in NUTRIENTS]) / 100.0
+
+
+def _as_dict(row: np.ndarray) -> dict:
+    return {k: None if np.isnan(v) else round(float(v), 2) for k, v in zip(NUTRIENTS, row)}
+
+
+class VectorStore:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[int, np.ndarray] = OrderedDict()
+        self.hits = self.built = self.misses = 0
+
+    def _source(self, fid: int) -> dict | None:
+        idx = get_index()
+        if idx is not None and fid in idx:
+            return idx.foods[fid]["macros"]
+        body = food_cache.held(str(fid))
+        # bodies cached before "per_100g" existed carry the same pick_macros values as macros_per_serving
+        return (body.get("per_100g") or body.get("macros_per_serving")) if body else None
+
+    async def prime(self, fids: list[int]):
+        """Load cached details the shared tier has for fids without a vector yet (one read, off the loop)."""
+        idx = get_index()
+        await food_cache.warm([str(f) for f in fids if f not in self._data and (idx is None or f not in idx)])
+
+    def get(self, fid: int) -> np.ndarray | None:
+        vec = self._data.get(fid)
+        if vec is not None:
+            self._data.move_to_end(fid)
+            self.hits += 1
+            return vec
+        macros = self._source(fid)
+        if macros is None:
+            self.misses += 1
+            return None
+        vec = from_macros(macros)
+        vec.setflags(write=False)
+        self.built += 1
+        self._data[fid] = vec
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return vec
+
+    def unknown(self, fids: list[int]) -> list[int]:
+        return [f for f in dict.fromkeys(fids) if self.get(f) is None]
+
+    def scale(self, fids: list[int], grams: list[float]) -> tuple[np.ndarray, list[int]]:
+        """(len(fids) x NUTRIENTS matrix of portion values, fdcIds with no vector)."""
+        vecs = [self.get(f) for f in fids]
+        missing = list(dict.fromkeys(f for f, v in zip(fids, vecs) if v is None))
+        m = np.vstack([_UNKNOWN if v is None else v for v in vecs]) if vecs else np.empty((0, len(NUTRIENTS)))
+        return m * np.asarray(grams, dtype=float)[:, None], missing
+
+    def portion(self, pairs: list[tuple[int, float]]) -> dict:
+        """{"items": [per-item values], "totals", "missing"} for [(fdcId, grams)]."""
+        fids = [f for f, _ in pairs]
+        scaled, missing = self.scale(fids, [g for _, g in pairs])
+        totals = np.nansum(scaled, axis=0)
+        items = [{"fdcId": f, "grams": g, **_as_dict(row)} for (f, g), row in zip(pairs, scaled)]
+        return {"items": items, "totals": {k: round(float(v), 2) for k, v in zip(NUTRIENTS, totals)},
+                "missing": missing}
+
+    def apply(self, items: list[dict]) -> int:
+        """
+        Overwrite the nutrient fields of items that have fdcId and grams with
+        server-computed values (fields FDC lacks keep what the client sent).
+        Returns how many items were computed.
+        """
+        picked = [i for i, it in enumerate(items) if it.get("fdcId") is not None and (it.get("grams") or 0) > 0]
+        if not picked:
+            return 0
+        scaled, _ = self.scale([items[i]["fdcId"] for i in picked], [items[i]["grams"] for i in picked])
+        n = 0
+        for i, row in zip(picked, scaled):
+            if np.isnan(row).all():
+                continue
+            for k, v in _as_dict(row).items():
+                if v is not None:
+                    items[i][k] = v
+            n += 1
+        return n
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits,
+                "built": self.built, "misses": self.misses}
+
+
+vectors = VectorStore(FOOD_CACHE_MAX)
+metrics.register("nutrient_vectors", vectors.stats)
@@ -0,0 +1,64 @@
+# backend/app/paging.py
+"""
+Keyset pagination over (dateISO desc, _id desc) for per-user log collections.
+
+The cursor is the last row's (dateISO, _id); the next page starts strictly
+after it, so every page is an index range scan on (userId, dateISO, _id)
+no matter how deep the client has paged, unlike skip/offset.
+"""
+import base64
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+SORT = [("dateISO", -1), ("_id", -1)]
+
+
+def encode_cursor(doc: dict) -> str:
+    raw = f"{doc.get('dateISO', '')}|{doc['_id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, ObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        dateISO, oid = raw.rsplit("|", 1)
+        return dateISO, ObjectId(oid)
+    except (ValueError, InvalidId, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def after_cursor(query: dict, cursor: str | None) -> dict:
+    if not cursor:
+        return query
+    dateISO, oid = decode_cursor(cursor)
+    return {**query, "$or": [{"dateISO": {"$lt": dateISO}},
+                             {"dateISO": dateISO, "_id": {"$lt": oid}}]}
+
+
+def projection(fields: str | None, allowed: set[str]) -> dict | None:
+    """?fields=a,b -> Mongo projection (always keeps the cursor keys)."""
+    if not fields:
+        return None
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(unknown)}")
+    return {"dateISO": 1, **{f: 1 for f in wanted}}
+
+
+async def page(coll, query: dict, *, cursor: str | None, limit: int, fields: str | None,
+               allowed: set[str], dump, compact: bool = False) -> dict:
+    """
+    One page of `coll` newest first: {"logs": [...], "next": cursor|None}, or with
+    compact=True {"fields": [...], "rows": [[...]], "next"} (column names once).
+    """
+    proj = projection(fields, allowed)
+    cols = ["id"] + sorted(proj if proj else allowed)
+    cur = coll.find(after_cursor(query, cursor), proj).sort(SORT).limit(limit + 1)
+    docs = [doc async for doc in cur]
+    nxt = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    rows = [dump(d) for d in docs[:limit]]
+    if not compact:
+        return {"logs": rows, "next": nxt}
+    return {"fields": cols, "rows": [[r.get(c) for c in cols] for r in rows], "next": nxt}
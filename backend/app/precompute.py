@@ -0,0 +1,322 @@
+# backend/app/precompute.py
+"""
+Nightly coach digests, computed off-peak so the morning's first requests are
+reads:
+
+    coach_digests {userId, dateISO, goal, profile, sourceUpdatedAt, computedAt, body}
+
+body is GET /coach/digest: today's plan (activity level from the last 7 days'
+average minutes), yesterday's score, badge and messages, and the streak over
+STREAK_DAYS. Building a digest goes through scores.history, so the same run
+also stores every day score it touches.
+
+Active users are those with a rollup in the last PRECOMPUTE_ACTIVE_DAYS. A run
+starts at PRECOMPUTE_HOUR (or at startup if today's run is still due) and
+claims the day in `jobs` first, so with PRECOMPUTE=inproc in several workers,
+or next to a separate `python -m app.precompute`, only one of them does the
+work. The lease is renewed after every batch; a crashed run's lease expires
+after LEASE_S and the next worker to look (each re-checks an unfinished day
+every LEASE_S) takes over.
+
+A stored digest is served while it is fresh: same day, same profile, no
+rollup in its window written since it was built and nothing pending in the
+write-behind buffer. Anything else is computed live and stored again.
+"""
+import argparse, asyncio, os, socket, time
+from datetime import date, datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+
+from .config import PRECOMPUTE, PRECOMPUTE_HOUR, PRECOMPUTE_ACTIVE_DAYS, PRECOMPUTE_CONCURRENCY
+from .db import users, rollups, digests, jobs
+from .reco import plan, activity_level_from_minutes
+from .scores import history, streaks, appreciation_badge, PROFILE_FIELDS
+from .usercache import PROFILE_FIELDS as USER_FIELDS
+from .writebehind import activity_buffer
+from . import metrics
+
+MODES = ("off", "inproc")
+GOALS = ("maintain",)      # what the app asks for; other goals are built on first read
+STREAK_DAYS = 90
+PLAN_DAYS = 7
+BATCH = 200
+LEASE_S = 15 * 60
+
+
+def _window(today: str) -> tuple[str, str]:
+    d = date.fromisoformat(today)
+    return (d - timedelta(days=STREAK_DAYS)).isoformat(), (d - timedelta(days=1)).isoformat()
+
+
+def _profile(user: dict) -> dict:
+    return {k: user.get(k) for k in sorted(PROFILE_FIELDS)}
+
+
+async def _source_updated_at(uid: str, lo: str, hi: str) -> str:
+    doc = await rollups.find_one({"userId": uid, "dateISO": {"$gte": lo, "$lte": hi}},
+                                 {"_id": 0, "updatedAt": 1}, sort=[("updatedAt", -1)])
+    return (doc or {}).get("updatedAt") or ""
+
+
+async def build(user: dict, today: str, goal: str) -> tuple[dict, dict]:
+    """(stored document, response body) for one user. Raises ValueError on an incomplete profile."""
+    uid = user["id"]
+    lo, hi = _window(today)
+    source = await _source_updated_at(uid, lo, hi)   # read first: a write landing meanwhile makes it stale
+    days = await history(user, lo, hi, goal)
+
+    since = (date.fromisoformat(today) - timedelta(days=PLAN_DAYS)).isoformat()
+    avg_minutes = sum(b["minutes"] for b in days if b["dateISO"] >= since) / PLAN_DAYS
+    level = activity_level_from_minutes(int(avg_minutes))
+    last = days[-1] if days and days[-1]["dateISO"] == hi else None
+
+    now = datetime.utcnow()
+    body = {
+        "dateISO": today,
+        "goal": goal,
+        "activity_level": level,
+        "avg_minutes": round(avg_minutes, 1),
+        "plan": plan(user, level, goal),
+        "yesterday": None if last is None else {
+            "dateISO": hi, "score": last["score"], "badge": appreciation_badge(last["score"]),
+            "minutes": last["minutes"], "messages": last["messages"]},
+        "streak": streaks(days, today),
+        "computedAt": now.isoformat(),
+    }
+    doc = {"userId": uid, "dateISO": today, "goal": goal, "profile": _profile(user),
+           "sourceUpdatedAt": source, "computedAt": now, "body": body}
+    return doc, body
+
+
+def _upsert(doc: dict) -> UpdateOne:
+    return UpdateOne({"userId": doc["userId"], "dateISO": doc["dateISO"], "goal": doc["goal"]},
+                     {"$set": doc}, upsert=True)
+
+
+async def _fresh(user: dict, doc: dict) -> bool:
+    uid, today = user["id"], doc["dateISO"]
+    if doc["profile"] != _profile(user):
+        return False
+    lo, hi = _window(today)
+    if activity_buffer.has_pending(uid, hi):
+        return False
+    newer = await rollups.find_one({"userId": uid, "dateISO": {"$gte": lo, "$lte": hi},
+                                    "updatedAt": {"$gt": doc["sourceUpdatedAt"]}}, {"_id": 1})
+    return newer is None
+
+
+async def digest(user: dict, goal: str) -> dict:
+    """GET /coach/digest body: the stored digest when fresh, else built live (and stored)."""
+    today = date.today().isoformat()
+    doc = await digests.find_one({"userId": user["id"], "dateISO": today, "goal": goal}, {"_id": 0})
+    if doc is not None and await _fresh(user, doc):
+        stats.fresh += 1
+        return {**doc["body"], "precomputed": True}
+    if doc is None:
+        stats.missing += 1
+    else:
+        stats.stale += 1
+    doc, body = await build(user, today, goal)
+    try:
+        await digests.bulk_write([_upsert(doc)])
+    except (BulkWriteError, DuplicateKeyError):
+        pass  # a concurrent read stored the same day
+    return {**body, "precomputed": False}
+
+
+# ---------- the nightly run ----------
+
+class _Stats:
+    def __init__(self):
+        self.fresh = self.stale = self.missing = 0
+        self.runs = 0
+        self.running = False
+        self.next_run_at: str | None = None
+        self.last: dict = {}
+
+    def snapshot(self) -> dict:
+        served = self.fresh + self.stale + self.missing
+        return {"mode": PRECOMPUTE, "running": self.running, "next_run_at": self.next_run_at, "runs": self.runs,
+                **{f"last_{k}": v for k, v in self.last.items()},
+                "fresh": self.fresh, "stale": self.stale, "missing": self.missing,
+                "fresh_rate": round(self.fresh / served, 4) if served else 0.0}
+
+
+stats = _Stats()
+metrics.register("precompute", stats.snapshot)
+
+
+def _job_id(today: str) -> str:
+    return f"precompute:{today}"
+
+
+async def _unfinished(job_id: str) -> bool:
+    doc = await jobs.find_one({"_id": job_id}, {"finishedAt": 1})
+    return doc is None or doc.get("finishedAt") is None
+
+
+def _owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def _claim(job_id: str) -> bool:
+    """Take the day's lease: a new job, or one whose runner stopped renewing it before finishing."""
+    now = datetime.utcnow()
+    lease = {"owner": _owner(), "startedAt": now, "leaseUntil": now + timedelta(seconds=LEASE_S),
+             "finishedAt": None, "users": 0, "done": 0, "failed": 0}
+    try:
+        await jobs.insert_one({"_id": job_id, **lease})
+        return True
+    except DuplicateKeyError:
+        taken = await jobs.find_one_and_update(
+            {"_id": job_id, "finishedAt": None, "leaseUntil": {"$lt": now}}, {"$set": lease})
+        return taken is not None
+
+
+async def _progress(job_id: str, fields: dict):
+    await jobs.update_one({"_id": job_id, "owner": _owner()},
+                          {"$set": {**fields, "leaseUntil": datetime.utcnow() + timedelta(seconds=LEASE_S)}})
+
+
+async def active_users(today: str) -> list[str]:
+    lo = (date.fromisoformat(today) - timedelta(days=PRECOMPUTE_ACTIVE_DAYS)).isoformat()
+    return [row["_id"] async for row in rollups.aggregate([{"$match": {"dateISO": {"$gte": lo}}},
+                                                           {"$group": {"_id": "$userId"}}])]
+
+
+async def _load_users(ids: list[str]) -> list[dict]:
+    oids = []
+    for uid in ids:
+        try:
+            oids.append(ObjectId(uid))
+        except InvalidId:
+            pass
+    out = []
+    async for doc in users.find({"_id": {"$in": oids}}, USER_FIELDS):
+        doc["id"] = str(doc.pop("_id"))
+        out.append(doc)
+    return out
+
+
+async def run(today: str | None = None, force: bool = False) -> dict | None:
+    """
+    Precompute today's digests for every active user. Returns the run summary,
+    or None when another worker holds (or finished) the day and force is False.
+    """
+    today = today or date.today().isoformat()
+    job_id = _job_id(today)
+    if not await _claim(job_id):
+        if not force:
+            return None
+        await jobs.update_one({"_id": job_id}, {"$set": {"owner": _owner(), "finishedAt": None}})
+
+    t0 = time.time()
+    stats.running = True
+    sem = asyncio.Semaphore(PRECOMPUTE_CONCURRENCY)
+    done = failed = skipped = 0
+    try:
+        ids = await active_users(today)
+        await _progress(job_id, {"users": len(ids)})
+
+        async def one(user: dict, goal: str):
+            nonlocal skipped
+            async with sem:
+                try:
+                    return (await build(user, today, goal))[0]
+                except ValueError:
+                    skipped += 1   # incomplete profile: nothing to plan
+                    return None
+
+        for i in range(0, len(ids), BATCH):
+            batch = await _load_users(ids[i:i + BATCH])
+            results = await asyncio.gather(*(one(u, g) for u in batch for g in GOALS), return_exceptions=True)
+            docs = [r for r in results if isinstance(r, dict)]
+            failed += sum(isinstance(r, Exception) for r in results)
+            if docs:
+                await digests.bulk_write([_upsert(d) for d in docs], ordered=False)
+            done += len(docs)
+            await _progress(job_id, {"done": done, "failed": failed})
+            stats.last = {"users": len(ids), "done": done, "failed": failed, "skipped": skipped}
+
+        finished = datetime.utcnow()
+        await _progress(job_id, {"done": done, "failed": failed, "skipped": skipped, "finishedAt": finished})
+        duration = time.time() - t0
+        # how long after the scheduled hour the last digest landed
+        due = datetime.combine(date.fromisoformat(today), datetime.min.time()).replace(hour=PRECOMPUTE_HOUR)
+        stats.last = {"date": today, "users": len(ids), "done": done, "failed": failed, "skipped": skipped,
+                      "duration_s": round(duration, 3), "lag_s": round(max(0.0, time.time() - due.timestamp()), 1)}
+        stats.runs += 1
+        return stats.last
+    finally:
+        stats.running = False
+
+
+def _next_run(now: datetime) -> datetime:
+    at = now.replace(hour=PRECOMPUTE_HOUR, minute=0, second=0, microsecond=0)
+    return at if at > now else at + timedelta(days=1)
+
+
+async def loop():
+    """
+    Run today's job if it is past PRECOMPUTE_HOUR and still due, then once a
+    day at that hour. While today's job is unfinished (another worker holds
+    the lease, or this run failed) look again every LEASE_S, so a runner that
+    dies is taken over the same day.
+    """
+    while True:
+        now = datetime.now()
+        due = False
+        if now.hour >= PRECOMPUTE_HOUR:
+            today = now.date().isoformat()
+            try:
+                summary = await run(today)
+                if summary:
+                    print(f"[precompute] {summary}")
+                due = await _unfinished(_job_id(today))
+            except Exception as e:
+                print("[precompute] run FAILED:", e)
+                due = True
+        at = _next_run(datetime.now())
+        if due:
+            at = min(at, datetime.now() + timedelta(seconds=LEASE_S))
+        stats.next_run_at = at.isoformat()
+        await asyncio.sleep((at - datetime.now()).total_seconds())
+
+
+class Worker:
+    """The in-process loop (PRECOMPUTE=inproc), started and stopped with the app."""
+    def __init__(self, mode: str):
+        if mode not in MODES:
+            raise ValueError(f"PRECOMPUTE must be one of {MODES}, got {mode!r}")
+        self.mode = mode
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self.mode == "inproc" and self._task is None:
+            self._task = asyncio.create_task(loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+worker = Worker(PRECOMPUTE)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Precompute coach digests (separate worker process).")
+    ap.add_argument("--once", action="store_true", help="run today's job now and exit")
+    ap.add_argument("--date", help="YYYY-MM-DD to run for (with --once), default today")
+    ap.add_argument("--force", action="store_true", help="rerun even if the day is already done")
+    args = ap.parse_args()
+    if args.once:
+        print(f"[precompute] {asyncio.run(run(args.date, force=args.force))}")
+    else:
+        asyncio.run(loop())
@@ -1,3 +1,15 @@
+# coach messages, indexed by the category codes reco_batch returns
+HEADLINE_MSGS = ("🔥 Fantastic day! Keep this momentum.",        # score >= 85
+                 "👏 Solid work — you’re on track.",              # score >= 70
+                 "You’ve got this — small changes add up. 💪")
+ACTIVITY_MSGS = ("Great job hitting 30+ active minutes! 🎉",
+                 "Try to reach 30+ minutes of movement today — even a brisk walk helps.")
+KCAL_MSGS = ("Calories are nicely on target. 👍",
+             "Slightly over calorie target — a lighter dinner or short walk can balance it.",
+             "Slightly under calories — consider a protein-rich snack.")
+SUGAR_MSG = "Sugar is a bit high today. Swap sweet drinks for water/unsweetened tea."
+FIBER_MSG = "Aim for ~25g fiber: oats, veggies, beans, or fruit can help."
+
 def mifflin_st_jeor(sex: str, age: int, height_cm: float, weight_kg: float) -> float:
     s = 5 if (sex or "").lower().startswith("m") else (-161 if (sex or "").lower().startswith("f") else -78)
     return 10*weight_kg + 6.25*height_cm - 5*age + s
@@ -99,19 +111,17 @@ def adherence_score(plan_macros: dict, totals: dict, mins: int) -> tuple[int, li
     score += W_SUG * sug_score
 
     # messages
-    msgs.append("Great job hitting 30+ active minutes! 🎉" if act_score >= 1.0
-                else "Try to reach 30+ minutes of movement today — even a brisk walk helps.")
+    msgs.append(ACTIVITY_MSGS[0] if act_score >= 1.0 else ACTIVITY_MSGS[1])
     if kcal_score >= 0.9:
-        msgs.append("Calories are nicely on target. 👍")
+        msgs.append(KCAL_MSGS[0])
     elif kcal > kcal_t:
-        msgs.append("Slightly over calorie target — a lighter dinner or short walk can balance it.")
+        msgs.append(KCAL_MSGS[1])
     else:
-        msgs.append("Slightly under calories — consider a protein-rich snack.")
-    if sugar > 50: msgs.append("Sugar is a bit high today. Swap sweet drinks for water/unsweetened tea.")
-    if fiber < 25: msgs.append("Aim for ~25g fiber: oats, veggies, beans, or fruit can help.")
+        msgs.append(KCAL_MSGS[2])
+    if sugar > 50: msgs.append(SUGAR_MSG)
+    if fiber < 25: msgs.append(FIBER_MSG)
 
     final = round(score * 100)
-    msgs.insert(0, "🔥 Fantastic day! Keep this momentum." if final >= 85
-                    else ("👏 Solid work — you’re on track." if final >= 70
-                          else "You’ve got this — small changes add up. 💪"))
+    msgs.insert(0, HEADLINE_MSGS[0] if final >= 85
+                    else (HEADLINE_MSGS[1] if final >= 70 else HEADLINE_MSGS[2]))
     return final, msgs
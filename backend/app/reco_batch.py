@@ -0,0 +1,173 @@
+# backend/app/reco_batch.py
+"""
+Columnar counterparts of reco.py for scoring many user-days at once (weekly
+reports, cohort stats). Every function takes equal-length NumPy arrays, one
+element per user-day, and matches the scalar version element for element:
+same formulas, same branch order, same half-to-even rounding.
+
+Categorical inputs are small integer codes (sex_codes, level_codes,
+goal_codes convert strings with the scalar rules); messages come back as codes
+into reco.HEADLINE_MSGS / ACTIVITY_MSGS / KCAL_MSGS plus sugar/fiber flags,
+and messages() turns one row back into the list adherence_score returns.
+
+    cols = {"sex": sex_codes(...), "age": ..., "height_cm": ..., "weight_kg": ...,
+            "minutes": ..., "goal": goal_codes(...), "kcal": ..., "carb_g": ..., ...}
+    out = score_days(cols)      # dict of arrays: bmr, tdee, targets, scores, codes
+"""
+import numpy as np
+
+from .reco import HEADLINE_MSGS, ACTIVITY_MSGS, KCAL_MSGS, SUGAR_MSG, FIBER_MSG
+
+MALE, FEMALE, OTHER = 0, 1, 2
+_SEX_OFFSET = np.array([5.0, -161.0, -78.0])
+
+LEVELS = ("sedentary", "light", "moderate", "active", "very_active")
+_FACTORS = np.array([1.2, 1.375, 1.55, 1.725, 1.9])
+
+MAINTAIN, LOSE, GAIN = 0, 1, 2
+GOALS = ("maintain", "lose", "gain")
+
+# carb/protein/fat shares: balanced, higher_protein (goal == lose)
+_SHARES = np.array([[0.45, 0.25, 0.30], [0.40, 0.30, 0.30]])
+
+W_KCAL, W_MAC, W_ACT, W_SUG = 0.35, 0.35, 0.20, 0.10
+
+
+# ---------- code conversion (scalar string rules) ----------
+
+def sex_codes(values) -> np.ndarray:
+    def one(s):
+        s = (s or "").lower()
+        return MALE if s.startswith("m") else (FEMALE if s.startswith("f") else OTHER)
+    return np.fromiter((one(v) for v in values), dtype=np.int8)
+
+
+def level_codes(values) -> np.ndarray:
+    """Unknown levels count as "light", like reco.tdee."""
+    index = {name: i for i, name in enumerate(LEVELS)}
+    return np.fromiter((index.get((v or "light").lower(), 1) for v in values), dtype=np.int8)
+
+
+def goal_codes(values) -> np.ndarray:
+    """Anything but lose/gain plans like maintain, like reco.plan."""
+    return np.fromiter((LOSE if v == "lose" else GAIN if v == "gain" else MAINTAIN for v in values), dtype=np.int8)
+
+
+def _num(a) -> np.ndarray:
+    """Float column with missing values (None/NaN) as 0, like `x or 0`."""
+    return np.nan_to_num(np.asarray(a, dtype=float), nan=0.0)
+
+
+# ---------- plan ----------
+
+def mifflin_st_jeor(sex, age, height_cm, weight_kg) -> np.ndarray:
+    return 10 * np.asarray(weight_kg, float) + 6.25 * np.asarray(height_cm, float) - 5 * np.asarray(age, float) \
+        + _SEX_OFFSET[np.asarray(sex)]
+
+
+def tdee(bmr, level) -> np.ndarray:
+    return np.asarray(bmr, float) * _FACTORS[np.asarray(level)]
+
+
+def level_from_minutes(mins) -> np.ndarray:
+    """reco.activity_level_from_minutes: thresholds 15/30/60/90 minutes."""
+    m = np.trunc(_num(mins))
+    return np.searchsorted(np.array([15, 30, 60, 90]), m, side="right").astype(np.int8)
+
+
+def plan(sex, age, height_cm, weight_kg, level, goal) -> dict:
+    """
+    reco.plan for N rows. "ok" is False where age/height/weight is missing or
+    0 (the scalar raises ValueError); those rows hold NaN.
+    """
+    age, h, w = (np.asarray(a, dtype=float) for a in (age, height_cm, weight_kg))
+    goal = np.asarray(goal)
+    ok = ~(np.isnan(age) | np.isnan(h) | np.isnan(w) | (age == 0) | (h == 0) | (w == 0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bmr = mifflin_st_jeor(sex, age, h, w)
+        need = tdee(bmr, level)
+        bmi = w / ((h / 100.0) ** 2)
+    need = need - np.where((goal == LOSE) & (bmi >= 25), 250, 0) + np.where(goal == GAIN, 250, 0)
+    shares = _SHARES[(goal == LOSE).astype(np.int8)]
+    nan = np.where(ok, 1.0, np.nan)
+    return {
+        "ok": ok,
+        "bmr": np.rint(bmr) * nan,
+        "tdee": np.rint(need) * nan,
+        "kcal": np.rint(need) * nan,
+        "carb_g": np.rint((need * shares[:, 0]) / 4) * nan,
+        "protein_g": np.rint((need * shares[:, 1]) / 4) * nan,
+        "fat_g": np.rint((need * shares[:, 2]) / 9) * nan,
+    }
+
+
+# ---------- adherence ----------
+
+def _window_score(pct, full: float, zero: float) -> np.ndarray:
+    with np.errstate(invalid="ignore"):
+        mid = 1.0 - (pct - full) / (zero - full)
+    return np.where(pct <= full, 1.0, np.where(pct >= zero, 0.0, mid))
+
+
+def adherence(targets: dict, totals: dict, mins) -> dict:
+    """
+    reco.adherence_score for N rows. `targets` has kcal/carb_g/protein_g/fat_g
+    (rounded plan macros), `totals` the day's nutrient sums.
+    """
+    kcal_t, carb_t, prot_t, fat_t = (_num(targets[k]) for k in ("kcal", "carb_g", "protein_g", "fat_g"))
+    kcal, carb, prot, fat, sugar, fiber = (_num(totals.get(k, np.zeros_like(kcal_t)))
+                                           for k in ("kcal", "carb_g", "protein_g", "fat_g", "sugar_g", "fiber_g"))
+    mins = _num(mins)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        kcal_score = np.where(kcal_t > 0, _window_score(np.abs(kcal - kcal_t) / kcal_t, 0.10, 0.20), 0.5)
+        parts_sum = np.zeros_like(kcal_t)
+        parts_n = np.zeros_like(kcal_t)
+        for actual, target in ((carb, carb_t), (prot, prot_t), (fat, fat_t)):
+            has = target > 0
+            parts_sum = parts_sum + np.where(has, _window_score(np.abs(actual - target) / target, 0.15, 0.30), 0.0)
+            parts_n = parts_n + has
+        mac_score = np.where(parts_n > 0, parts_sum / np.maximum(parts_n, 1), 0.5)
+    act_score = np.minimum(1.0, mins / 30.0)
+    sug_score = np.where(sugar <= 50, 1.0, np.where(sugar <= 75, 0.5, 0.0))
+
+    score = 0.0 + W_KCAL * kcal_score
+    score = score + W_MAC * mac_score
+    score = score + W_ACT * act_score
+    score = score + W_SUG * sug_score
+    final = np.rint(score * 100).astype(np.int16)
+
+    return {
+        "score": final,
+        "kcal_score": kcal_score, "macro_score": mac_score, "activity_score": act_score, "sugar_score": sug_score,
+        "headline": np.where(final >= 85, 0, np.where(final >= 70, 1, 2)).astype(np.int8),
+        "activity_msg": np.where(act_score >= 1.0, 0, 1).astype(np.int8),
+        "kcal_msg": np.where(kcal_score >= 0.9, 0, np.where(kcal > kcal_t, 1, 2)).astype(np.int8),
+        "sugar_high": sugar > 50,
+        "fiber_low": fiber < 25,
+    }
+
+
+def score_days(cols: dict) -> dict:
+    """
+    Plan + adherence for N user-days, as the coach computes each day: the
+    activity level comes from that day's minutes unless cols["level"] is given.
+    Rows without a complete profile have ok=False and score -1.
+    """
+    n = len(cols["age"])
+    level = cols["level"] if "level" in cols else level_from_minutes(cols["minutes"])
+    goal = cols.get("goal", np.zeros(n, dtype=np.int8))
+    p = plan(cols["sex"], cols["age"], cols["height_cm"], cols["weight_kg"], level, goal)
+    a = adherence(p, cols, cols["minutes"])
+    a["score"] = np.where(p["ok"], a["score"], -1).astype(np.int16)
+    return {**{f"{k}_target" if k in ("kcal", "carb_g", "protein_g", "fat_g") else k: v for k, v in p.items()}, **a}
+
+
+def messages(out: dict, i: int) -> list[str]:
+    """Row i's message list, as reco.adherence_score would return it."""
+    msgs = [HEADLINE_MSGS[out["headline"][i]], ACTIVITY_MSGS[out["activity_msg"][i]], KCAL_MSGS[out["kcal_msg"][i]]]
+    if out["sugar_high"][i]:
+        msgs.append(SUGAR_MSG)
+    if out["fiber_low"][i]:
+        msgs.append(FIBER_MSG)
+    return msgs
@@ -0,0 +1,176 @@
+# backend/app/rollups.py
+"""
+`daily_rollups`: one small document per (userId, dateISO) with running totals,
+bumped with $inc by the same request that writes a meal or activity log.
+
+    {"userId", "dateISO",
+     "meals":    {"count", "kcal", "carb_g", ..., "sodium_mg"},
+     "activity": {"count", "minutes", "steps",
+                  "by_type": {"walk": {"count", "minutes", "steps"}, ...}},
+     "scores":   {"<goal>": <memoised /coach/motivate body + "_profile">},   (see scores.py)
+     "v":        <incremented by every write; ETag version, see etag.py>,
+     "updatedAt"}
+
+Per-type kcal is derived from by_type minutes at read time (METS x current
+weight), so a profile weight change is reflected exactly as before.
+
+Days logged before rollups existed have no document; run the rebuild once
+after deploying, and use --verify any time to compare against the raw logs:
+
+    python -m app.rollups            # recompute every day from raw logs
+    python -m app.rollups --verify   # report drift only, exit 1 if any
+"""
+import argparse, asyncio, math
+from datetime import datetime
+from pymongo import UpdateOne
+
+from .db import rollups, meals, activity
+from .aggregates import NUTRIENTS, empty_totals, activity_day_by_type, activity_day_minutes
+from . import mealdays
+
+
+def type_key(act_type: str) -> str:
+    """Activity type usable as a field name inside by_type."""
+    return (act_type or "walk").lower().replace(".", "_").replace("$", "_")
+
+
+def empty_day() -> dict:
+    return {
+        "meals": {"count": 0, **empty_totals()},
+        "activity": {"count": 0, "minutes": 0, "steps": 0, "by_type": {}},
+    }
+
+
+def _number(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def meal_inc(items: list[dict], docs: int = 1) -> dict:
+    inc = {"meals.count": docs}
+    inc.update({f"meals.{k}": v for k, v in mealdays.item_totals(items).items()})
+    return inc
+
+
+def activity_inc(act_type: str, minutes: int, steps: int | None, new_doc: bool) -> dict:
+    t = f"activity.by_type.{type_key(act_type)}"
+    inc = {
+        "activity.minutes": minutes, "activity.steps": steps or 0,
+        f"{t}.minutes": minutes, f"{t}.steps": steps or 0,
+    }
+    if new_doc:
+        inc["activity.count"] = 1
+        inc[f"{t}.count"] = 1
+    return inc
+
+
+def rollup_update(inc: dict) -> dict:
+    # any change to the day drops its memoised coach scores (scores.py) and moves its ETag version (etag.py)
+    return {"$inc": {**inc, "v": 1}, "$set": {"updatedAt": datetime.utcnow().isoformat()}, "$unset": {"scores": ""}}
+
+
+async def bump(user_id: str, dateISO: str, inc: dict):
+    await rollups.update_one({"userId": user_id, "dateISO": dateISO}, rollup_update(inc), upsert=True)
+
+
+def merge_inc(into: dict, inc: dict) -> dict:
+    for k, v in inc.items():
+        into[k] = into.get(k, 0) + v
+    return into
+
+
+async def bump_many(user_id: str, incs: dict[str, dict]):
+    """One unordered bulk_write for a batch: {dateISO: $inc doc}."""
+    if not incs:
+        return
+    await rollups.bulk_write([
+        UpdateOne({"userId": user_id, "dateISO": d}, rollup_update(inc), upsert=True)
+        for d, inc in incs.items()
+    ], ordered=False)
+
+
+def as_day(doc: dict | None) -> dict:
+    """A stored rollup with every field present (zeros when nothing is logged)."""
+    day = empty_day()
+    if doc:
+        day["meals"].update(doc.get("meals") or {})
+        day["activity"].update(doc.get("activity") or {})
+    return day
+
+
+async def read_day(user_id: str, dateISO: str) -> dict:
+    doc = await rollups.find_one({"userId": user_id, "dateISO": dateISO},
+                                 {"_id": 0, "meals": 1, "activity": 1})
+    return as_day(doc)
+
+
+def meal_totals(day: dict) -> dict:
+    return {k: day["meals"].get(k, 0) for k in NUTRIENTS}
+
+
+# ---------- rebuild / verify from raw logs ----------
+
+async def compute_day(user_id: str, dateISO: str) -> dict:
+    day = empty_day()
+    m = await mealdays.read_day(user_id, dateISO)
+    day["meals"] = {"count": m["count"], **m["totals"]}
+
+    by_type = await activity_day_by_type(user_id, dateISO)
+    a = day["activity"]
+    a["minutes"] = await activity_day_minutes(user_id, dateISO)
+    for t, v in by_type.items():
+        a["count"] += v["count"]
+        a["steps"] += v["steps"]
+        # "Walk" and "walk" (or "a.b" and "a_b") share a key, as they do in activity_inc
+        merge_inc(a["by_type"].setdefault(type_key(t), {"count": 0, "minutes": 0, "steps": 0}), v)
+    return day
+
+
+async def logged_days(user_id: str | None = None):
+    match = {"userId": user_id} if user_id else {}
+    seen = set()
+    for coll in (meals, activity):
+        pipeline = [{"$match": match}, {"$group": {"_id": {"u": "$userId", "d": "$dateISO"}}}]
+        async for row in coll.aggregate(pipeline):
+            key = (row["_id"].get("u"), row["_id"].get("d"))
+            if None not in key:
+                seen.add(key)
+    return sorted(seen)
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, dict) and isinstance(b, dict):
+        return all(_same(a.get(k, 0), b.get(k, 0)) for k in set(a) | set(b))
+    if _number(a) and _number(b):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+    return a == b
+
+
+async def rebuild(user_id: str | None = None, verify_only: bool = False) -> dict:
+    checked, drift = 0, []
+    for uid, dateISO in await logged_days(user_id):
+        expected = await compute_day(uid, dateISO)
+        stored = await read_day(uid, dateISO)
+        checked += 1
+        if _same(expected, stored):
+            continue
+        drift.append({"userId": uid, "dateISO": dateISO})
+        if not verify_only:
+            await rollups.update_one(
+                {"userId": uid, "dateISO": dateISO},
+                {"$set": {**expected, "updatedAt": datetime.utcnow().isoformat()}, "$inc": {"v": 1},
+                 "$unset": {"scores": ""}},
+                upsert=True,
+            )
+    return {"checked": checked, "drift": drift, "repaired": 0 if verify_only else len(drift)}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Rebuild or verify daily_rollups from raw logs.")
+    ap.add_argument("--user", help="limit to one userId")
+    ap.add_argument("--verify", action="store_true", help="report drift without writing")
+    args = ap.parse_args()
+    res = asyncio.run(rebuild(args.user, verify_only=args.verify))
+    print(f"[rollups] checked={res['checked']} drift={len(res['drift'])} repaired={res['repaired']}")
+    for d in res["drift"][:50]:
+        print("  drift:", d["userId"], d["dateISO"])
+    raise SystemExit(1 if args.verify and res["drift"] else 0)
@@ -1,9 +1,17 @@
 # backend/app/routes_activity.py
-from fastapi import APIRouter, Depends, Query
-from datetime import datetime
-from .deps import get_current_user
-from .schemas import ActivityIn
+from fastapi import APIRouter, Depends, Query, Request, Response
+from datetime import datetime, date
+from typing import Literal
+from .deps import get_current_user, get_token_user
+from .schemas import ActivityIn, BulkIn
+from .bulk import validate_entries, write_unordered, summary
+from pymongo import UpdateOne
 from .db import activity
+from . import rollups
+from .trends import resolve_range, activity_trend
+from .paging import page
+from .writebehind import activity_buffer
+from .etag import day_tag, not_modified, tag
 from bson import ObjectId
 
 
@@ -32,6 +40,34 @@ def kcal_for_activity(act_type: str, minutes: int, weight_kg: float | None) -> f
     hours = max(0.0, (minutes or 0)) / 60.0
     return float(met * weight_kg * hours)
 
+def summarize_day(dateISO: str, day: dict, weight_kg: float | None) -> dict:
+    """/activity/summary body from a day's rollup; kcal depends on each type's MET."""
+    per_type = day["activity"]["by_type"]
+
+    total_count = 0
+    total_minutes = 0
+    total_steps = 0
+    total_kcal = 0.0
+    by_type: dict[str, dict] = {}
+
+    for t, agg in per_type.items():
+        m, s = agg.get("minutes", 0), agg.get("steps", 0)
+        kcal = kcal_for_activity(t, m, weight_kg)
+        total_count += agg.get("count", 0)
+        total_minutes += m
+        total_steps += s
+        total_kcal += kcal
+        by_type[t] = {"minutes": m, "steps": s, "kcal": kcal}
+
+    return {
+        "dateISO": dateISO,
+        "count": total_count,
+        "minutes": total_minutes,
+        "steps": total_steps,
+        "calories_kcal": round(total_kcal, 1),
+        "by_type": {k: {"minutes": v["minutes"], "steps": v["steps"], "kcal": round(v["kcal"],1)} for k,v in by_type.items()},
+    }
+
 router = APIRouter(prefix="/activity", tags=["activity"])
 
 @router.post("/log", status_code=201)
@@ -45,8 +81,12 @@ async def log_activity(payload: ActivityIn, user=Depends(get_current_user)):
         "createdAt": datetime.utcnow().isoformat()
     }
     await activity.insert_one(doc)
+    await rollups.bump(user["id"], doc["dateISO"],
+                       rollups.activity_inc(doc["type"], doc["minutes"], doc["steps"], new_doc=True))
     return {"ok": True}
 
+LOG_FIELDS = {"dateISO", "minutes", "steps", "type", "createdAt"}
+
 def _dump(d: dict) -> dict:
     d = dict(d)
     d["id"] = str(d.pop("_id", ""))   # make ObjectId JSON-safe
@@ -55,52 +95,33 @@ def _dump(d: dict) -> dict:
     return d
 
 @router.get("/logs")
-async def list_activity(user=Depends(get_current_user), limit: int = 30):
-    cur = activity.find({"userId": user["id"]}).sort("dateISO", -1).limit(limit)
-    return {"logs": [_dump(doc) async for doc in cur]}
+async def list_activity(
+    user=Depends(get_current_user),
+    limit: int = Query(30, ge=1, le=500),
+    cursor: str | None = Query(default=None, description="`next` from the previous page"),
+    fields: str | None = Query(default=None, description="comma list, e.g. dateISO,minutes"),
+    compact: bool = False,
+):
+    await activity_buffer.flush_user(user["id"])
+    return await page(activity, {"userId": user["id"]}, cursor=cursor, limit=limit, fields=fields,
+                      allowed=LOG_FIELDS, dump=_dump, compact=compact)
 
 @router.get("/summary")
 async def activity_summary(
+    request: Request,
+    response: Response,
     dateISO: str | None = Query(default=None),
-    user=Depends(get_current_user)
+    user=Depends(get_token_user)
 ):
     from datetime import date
     dateISO = dateISO or date.today().isoformat()
+    etag = await day_tag("activity/summary", user, dateISO)
+    if (r := not_modified(request, etag)) is not None:
+        return r
+    tag(response, etag)
 
-    # pull all entries for the day
-    entries = [doc async for doc in activity.find({"userId": user["id"], "dateISO": dateISO})]
-
-    total_minutes = 0
-    total_steps = 0
-    total_kcal = 0.0
-    by_type: dict[str, dict] = {}
-
-    weight_kg = user.get("weightKg")  # may be None
-
-    for a in entries:
-        m = int(a.get("minutes") or 0)
-        s = int(a.get("steps") or 0)
-        t = (a.get("type") or "walk").lower()
-
-        total_minutes += m
-        total_steps += s
-
-        kcal = kcal_for_activity(t, m, weight_kg)
-        total_kcal += kcal
-
-        b = by_type.setdefault(t, {"minutes": 0, "steps": 0, "kcal": 0.0})
-        b["minutes"] += m
-        b["steps"] += s
-        b["kcal"] += kcal
-
-    return {
-        "dateISO": dateISO,
-        "count": len(entries),
-        "minutes": total_minutes,
-        "steps": total_steps,
-        "calories_kcal": round(total_kcal, 1),
-        "by_type": {k: {"minutes": v["minutes"], "steps": v["steps"], "kcal": round(v["kcal"],1)} for k,v in by_type.items()},
-    }
+    day = await activity_buffer.read_day(user["id"], dateISO)
+    return summarize_day(dateISO, day, user.get("weightKg"))
 
 @router.post("/log/upsert", status_code=200)
 async def upsert_activity(payload: ActivityIn, user=Depends(get_current_user)):
@@ -113,9 +134,71 @@ async def upsert_activity(payload: ActivityIn, user=Depends(get_current_user)):
     if payload.steps is not None:
         inc["steps"] = int(payload.steps)
 
-    await activity.update_one(
+    if activity_buffer.enabled:
+        # merged with other pings for this key and written by the next flush
+        await activity_buffer.add(user["id"], q["dateISO"], q["type"], inc["minutes"], inc.get("steps"))
+        return {"ok": True, "merged": True, "buffered": activity_buffer.mode}
+
+    res = await activity.update_one(
         q,
         {"$inc": inc, "$setOnInsert": {"createdAt": datetime.utcnow().isoformat()}},
         upsert=True,
     )
+    await rollups.bump(user["id"], q["dateISO"], rollups.activity_inc(
+        q["type"], inc["minutes"], inc.get("steps"), new_doc=res.upserted_id is not None))
     return {"ok": True, "merged": True}
+
+@router.post("/log/bulk", status_code=200)
+async def bulk_upsert_activity(payload: BulkIn, user=Depends(get_current_user)):
+    """
+    Wearable/app sync: validate every entry, merge entries that hit the same
+    (dateISO, type) key, $inc them all with one unordered bulk_write, and bump
+    rollups once per day touched. Returns a status per entry.
+    """
+    valid, results = validate_entries(ActivityIn, payload.entries)
+
+    # one op per (dateISO, type); remember which entries fed it
+    keys: dict[tuple[str, str], dict] = {}
+    for i, e in valid:
+        k = (e.date.isoformat(), (e.type or "walk").lower())
+        agg = keys.setdefault(k, {"minutes": 0, "steps": 0, "entries": []})
+        agg["minutes"] += int(e.minutes)
+        agg["steps"] += int(e.steps or 0)
+        agg["entries"].append(i)
+
+    now = datetime.utcnow().isoformat()
+    key_list = list(keys)
+    ops = [UpdateOne({"userId": user["id"], "dateISO": d, "type": t},
+                     {"$inc": {"minutes": keys[(d, t)]["minutes"], "steps": keys[(d, t)]["steps"]},
+                      "$setOnInsert": {"createdAt": now}},
+                     upsert=True)
+           for d, t in key_list]
+    failed, upserted = await write_unordered(activity, ops)
+
+    incs: dict[str, dict] = {}
+    for n, (d, t) in enumerate(key_list):
+        agg = keys[(d, t)]
+        status = {"status": "failed", "error": "write failed"} if n in failed else {"status": "ok"}
+        for i in agg["entries"]:
+            results[i] = {"index": i, **status}
+        if n not in failed:
+            rollups.merge_inc(incs.setdefault(d, {}), rollups.activity_inc(
+                t, agg["minutes"], agg["steps"], new_doc=n in upserted))
+    await rollups.bump_many(user["id"], incs)
+    return summary(results)
+
+@router.get("/trend")
+async def activity_trend_range(
+    from_: date | None = Query(default=None, alias="from", description="YYYY-MM-DD, default to-29d"),
+    to: date | None = Query(default=None, description="YYYY-MM-DD, default today"),
+    bucket: Literal["day", "week", "month"] = "day",
+    user=Depends(get_token_user)
+):
+    lo, hi = resolve_range(from_, to)
+    weight_kg = user.get("weightKg")
+    await activity_buffer.flush_user(user["id"])
+    points = await activity_trend(user["id"], lo, hi, bucket)
+    for pt in points:
+        kcal = sum(kcal_for_activity(t, m, weight_kg) for t, m in pt.pop("minutes_by_type").items())
+        pt["calories_kcal"] = round(kcal, 1)
+    return {"from": lo, "to": hi, "bucket": bucket, "points": points}
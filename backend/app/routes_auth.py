@@ -1,19 +1,28 @@
 from fastapi import APIRouter, HTTPException
 from .schemas import RegisterIn, LoginIn, TokenOut
 from .db import users
-from .auth import hash_password, verify_password, create_access_token
+from .auth import hash_password_async, verify_password_async, user_token, HashPoolBusy
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+def _busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Too many sign-ins right now, please retry",
+                         headers={"Retry-After": "2"})
+
 @router.post("/register", response_model=TokenOut, status_code=201)
 async def register(payload: RegisterIn):
     if await users.find_one({"email": payload.email.lower()}):
         raise HTTPException(status_code=409, detail="Email already in use")
 
+    try:
+        pw_hash = await hash_password_async(payload.password)
+    except HashPoolBusy:
+        raise _busy()
+
     doc = {
         "name": payload.name,
         "email": payload.email.lower(),
-        "passwordHash": hash_password(payload.password),
+        "passwordHash": pw_hash,
         "age": payload.age,
        "sex": (payload.sex or "other").lower(), 
         "heightCm": payload.heightCm,
@@ -30,14 +39,24 @@ async def register(payload: RegisterIn):
         "heightCm": doc.get("heightCm"),
         "weightKg": doc.get("weightKg"),
     }
-    token = create_access_token({"id": user["id"], "email": user["email"], "name": user["name"]})
+    token = user_token(user)
     return {"token": token, "user": user}
 
 @router.post("/login", response_model=TokenOut)
 async def login(payload: LoginIn):
     doc = await users.find_one({"email": payload.email.lower()})
-    if not doc or not verify_password(payload.password, doc.get("passwordHash", "")):
+    if not doc or not doc.get("passwordHash"):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        ok, new_hash = await verify_password_async(payload.password, doc["passwordHash"])
+    except HashPoolBusy:
+        raise _busy()
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # stored hash used an older cost setting; upgrade it transparently
+        await users.update_one({"_id": doc["_id"], "passwordHash": doc["passwordHash"]},
+                               {"$set": {"passwordHash": new_hash}})
 
     user = {
         "id": str(doc["_id"]),
@@ -48,5 +67,5 @@ async def login(payload: LoginIn):
         "heightCm": doc.get("heightCm"),
         "weightKg": doc.get("weightKg"),
     }
-    token = create_access_token({"id": user["id"], "email": user["email"], "name": user["name"]})
+    token = user_token(user)
     return {"token": token, "user": user}
@@ -1,16 +1,27 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
-from .deps import get_current_user
-from .db import meals, activity
-from .reco import plan, activity_level_from_minutes, adherence_score
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
+from datetime import date, timedelta
+from typing import Literal
+from .deps import get_token_user
+from .reco import plan
+from .trends import resolve_range, bucket_of
+from .scores import day_score, history, streaks, appreciation_badge
+from .precompute import digest
+from .etag import day_tag, profile_tag, not_modified, tag
 
 router = APIRouter(prefix="/coach", tags=["coach"])
 
 @router.get("/plan")
 async def coach_plan(
+    request: Request,
+    response: Response,
     activity: str = "light",
     goal: str = "maintain",
-    user = Depends(get_current_user)
+    user = Depends(get_token_user)
 ):
+    etag = profile_tag("coach/plan", user, activity, goal)
+    if (r := not_modified(request, etag)) is not None:
+        return r
+    tag(response, etag)
     try:
         return plan(user, activity, goal)
     except Exception as e:
@@ -18,7 +29,7 @@ async def coach_plan(
         raise HTTPException(status_code=400, detail=f"Profile incomplete: {e}")
 
 @router.get("/tips")
-async def coach_tips(activity_minutes: int = 30, sugar_g_today: float = 0.0, user=Depends(get_current_user)):
+async def coach_tips(activity_minutes: int = 30, sugar_g_today: float = 0.0, user=Depends(get_token_user)):
     tips = []
     if activity_minutes < 30: tips.append("Try to reach 30+ minutes of movement today. A short brisk walk counts!")
     if sugar_g_today > 50: tips.append("Today’s sugar is high. Swap sweet drinks for water/unsweetened tea.")
@@ -26,45 +37,65 @@ async def coach_tips(activity_minutes: int = 30, sugar_g_today: float = 0.0, use
     return {"tips": tips}
 
 @router.get("/motivate")
-async def coach_motivate(dateISO: str = Query(default=None), goal: str = "maintain", user=Depends(get_current_user)):
-    from datetime import date
+async def coach_motivate(request: Request, response: Response, dateISO: str = Query(default=None),
+                         goal: str = "maintain", user=Depends(get_token_user)):
     dateISO = dateISO or date.today().isoformat()
+    etag = await day_tag("coach/motivate", user, dateISO, goal)
+    if (r := not_modified(request, etag)) is not None:
+        return r
+    tag(response, etag)
+    # memoised per day and goal until the day's logs change (scores.py)
+    return await day_score(user, dateISO, goal)
 
-    # Sum activity minutes
-    mins = 0
-    async for a in activity.find({"userId": user["id"], "dateISO": dateISO}):
-        v = a.get("minutes") or a.get("durationMin") or 0
-        if isinstance(v, (int,float)): mins += v
-
-    # Build plan for the user's inferred activity level
-    act_level = activity_level_from_minutes(mins)
-    p = plan(user, act_level, goal)
-
-    # Sum today's nutrition
-    totals = {"kcal":0,"carb_g":0,"protein_g":0,"fat_g":0,"fiber_g":0,"sugar_g":0,"sodium_mg":0}
-    async for m in meals.find({"userId": user["id"], "dateISO": dateISO}):
-        for it in (m.get("items") or []):
-            for k in totals.keys():
-                v = it.get(k)
-                if isinstance(v, (int,float)): totals[k] += v
+@router.get("/digest")
+async def coach_digest(goal: str = "maintain", user=Depends(get_token_user)):
+    """Today's plan, yesterday's score and the streak; precomputed overnight (precompute.py)."""
+    try:
+        return await digest(user, goal)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Profile incomplete: {e}")
 
-    score, messages = adherence_score(p["macros"], totals, mins)
-    return {
-        "dateISO": dateISO,
-        "activity_level": act_level,
-        "minutes": mins,
-        "plan": p,
-        "nutrition_totals": totals,
-        "score": score,
-        "messages": messages
-    }
+@router.get("/trend")
+async def coach_trend(
+    from_: date | None = Query(default=None, alias="from", description="YYYY-MM-DD, default to-29d"),
+    to: date | None = Query(default=None, description="YYYY-MM-DD, default today"),
+    bucket: Literal["day", "week", "month"] = "day",
+    goal: str = "maintain",
+    user=Depends(get_token_user)
+):
+    """Adherence score per bucket (mean over days with any meal or activity logged)."""
+    lo, hi = resolve_range(from_, to)
+    buckets: dict[str, list[int]] = {}
+    try:
+        days = await history(user, lo, hi, goal)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Profile incomplete: {e}")
+    for d in days:
+        buckets.setdefault(bucket_of(d["dateISO"], bucket), []).append(d["score"])
+    points = [{"bucket": b, "days": len(v), "score": round(sum(v) / len(v)), "min": min(v), "max": max(v)}
+              for b, v in buckets.items()]
+    return {"from": lo, "to": hi, "bucket": bucket, "goal": goal, "points": points}
 
 
-def appreciation_badge(score: int) -> str:
-    if score >= 90: return "🏅 Gold Day"
-    if score >= 80: return "🥈 Silver Day"
-    if score >= 70: return "🥉 Bronze Day"
-    return "✨ Keep Going"
+@router.get("/scores")
+async def coach_scores(
+    from_: date | None = Query(default=None, alias="from", description="YYYY-MM-DD, default to-29d"),
+    to: date | None = Query(default=None, description="YYYY-MM-DD, default today"),
+    days: int | None = Query(default=None, ge=1, le=366, description="shorthand for from=to-(days-1), e.g. 30 or 90"),
+    goal: str = "maintain",
+    user=Depends(get_token_user)
+):
+    """Score per logged day plus streaks, served from the memoised day scores."""
+    if days is not None and from_ is None:
+        from_ = (to or date.today()) - timedelta(days=days - 1)
+    lo, hi = resolve_range(from_, to)
+    try:
+        bodies = await history(user, lo, hi, goal)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Profile incomplete: {e}")
+    points = [{"dateISO": b["dateISO"], "score": b["score"], "minutes": b["minutes"],
+               "activity_level": b["activity_level"], "badge": appreciation_badge(b["score"])} for b in bodies]
+    return {"from": lo, "to": hi, "goal": goal, "days": points, "streak": streaks(bodies, hi)}
 
 @router.get("/workouts")
 async def coach_workouts(minutes: int = Query(30, ge=10, le=120), level: str = "light"):
@@ -0,0 +1,56 @@
+# backend/app/routes_dashboard.py
+import asyncio
+from datetime import date
+from fastapi import APIRouter, Depends, Query, Request, Response
+from .deps import get_current_user
+from .db import meals
+from . import rollups
+from .routes_meals import ui_items
+from .routes_activity import summarize_day
+from .scores import motivate
+from .writebehind import activity_buffer
+from .etag import day_tag, not_modified, tag
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+@router.get("/today")
+async def dashboard_today(
+    request: Request,
+    response: Response,
+    dateISO: str | None = Query(default=None),
+    goal: str = "maintain",
+    activity: str | None = Query(default=None, description="activity level for the plan; default inferred from today's minutes"),
+    user=Depends(get_current_user),
+):
+    """
+    Everything the home page shows in one response: plan, nutrition totals,
+    activity summary, coach score/messages and the day's meal items. The
+    user is authenticated once and the day's reads run concurrently.
+    """
+    dateISO = dateISO or date.today().isoformat()
+    etag = await day_tag("dashboard/today", user, dateISO, goal, activity)
+    if (r := not_modified(request, etag)) is not None:
+        return r
+    tag(response, etag)
+    day, meal_doc = await asyncio.gather(
+        activity_buffer.read_day(user["id"], dateISO),
+        meals.find_one({"userId": user["id"], "dateISO": dateISO}, {"_id": 0, "items": 1}),
+    )
+
+    out = {
+        "dateISO": dateISO,
+        "meals": {"count": day["meals"]["count"], "totals": rollups.meal_totals(day)},
+        "meal_log": {"items": ui_items(meal_doc)},
+        "activity": summarize_day(dateISO, day, user.get("weightKg")),
+        "plan": None,
+        "coach": None,
+    }
+    try:
+        coach = motivate(user, dateISO, day, goal, activity_level=activity)
+    except ValueError as e:
+        # same message /coach/plan gives; the rest of the page still renders
+        out["profile_error"] = f"Profile incomplete: {e}"
+        return out
+    out["plan"] = coach["plan"]
+    out["coach"] = coach
+    return out
@@ -0,0 +1,146 @@
+# backend/app/routes_export.py
+"""
+Full-history exports streamed straight off the Motor cursor: each batch of
+EXPORT_BATCH_SIZE documents is written out as NDJSON or CSV lines before the
+next one is fetched, so memory stays flat and the first bytes go out at once.
+"""
+import csv, io, json
+from datetime import date
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from .deps import get_current_user
+from .db import meals, activity, rollups as rollup_docs
+from .aggregates import NUTRIENTS
+from .config import EXPORT_BATCH_SIZE
+from .writebehind import activity_buffer
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+MEAL_COLUMNS = ["id", "dateISO", "entry", "createdAt", "notes", "item", "name", "grams", "fdcId", *NUTRIENTS]
+ACTIVITY_COLUMNS = ["id", "dateISO", "type", "minutes", "steps", "createdAt"]
+SUMMARY_COLUMNS = ["dateISO", "meal_count", *NUTRIENTS, "activity_count", "activity_minutes", "activity_steps"]
+
+
+def _date_filter(user_id: str, from_: date | None, to: date | None) -> dict:
+    if from_ and to and from_ > to:
+        raise HTTPException(status_code=400, detail="'from' must be on or before 'to'")
+    q: dict = {"userId": user_id}
+    rng = {}
+    if from_:
+        rng["$gte"] = from_.isoformat()
+    if to:
+        rng["$lte"] = to.isoformat()
+    if rng:
+        q["dateISO"] = rng
+    return q
+
+
+def _meal_json(d: dict) -> dict:
+    return {"id": str(d["_id"]), "dateISO": d.get("dateISO"), "count": d.get("count", 0),
+            "totals": d.get("totals") or {}, "entries": d.get("entries") or [], "items": d.get("items") or []}
+
+
+def _meal_rows(d: dict):
+    """One CSV row per item, tagged with the save (entry) it was logged in."""
+    items = d.get("items") or []
+    pos = 0
+    for e_n, entry in enumerate(d.get("entries") or []):
+        base = {"id": str(d["_id"]), "dateISO": d.get("dateISO"), "entry": e_n,
+                "createdAt": entry.get("createdAt"), "notes": entry.get("notes")}
+        its = items[pos:pos + entry.get("items", 0)]
+        pos += len(its)
+        for n, it in enumerate(its or [{}]):
+            yield {**base, "item": n if its else None, "name": it.get("name"), "grams": it.get("grams"),
+                   "fdcId": it.get("fdcId"), **{k: it.get(k) for k in NUTRIENTS}}
+
+
+def _activity_json(d: dict) -> dict:
+    return {"id": str(d["_id"]), **{k: d.get(k) for k in ACTIVITY_COLUMNS[1:]}}
+
+
+def _activity_rows(d: dict):
+    yield _activity_json(d)
+
+
+def _summary_json(d: dict) -> dict:
+    m, a = d.get("meals") or {}, d.get("activity") or {}
+    return {"dateISO": d["dateISO"],
+            "meals": {"count": m.get("count", 0), "totals": {k: m.get(k, 0) for k in NUTRIENTS}},
+            "activity": {"count": a.get("count", 0), "minutes": a.get("minutes", 0), "steps": a.get("steps", 0),
+                         "by_type": a.get("by_type") or {}}}
+
+
+def _summary_rows(d: dict):
+    s = _summary_json(d)
+    yield {"dateISO": s["dateISO"], "meal_count": s["meals"]["count"], **s["meals"]["totals"],
+           "activity_count": s["activity"]["count"], "activity_minutes": s["activity"]["minutes"],
+           "activity_steps": s["activity"]["steps"]}
+
+
+# kind -> (collection, projection, sort, to_json, to_csv_rows, csv columns)
+EXPORTS = {
+    "meals": (meals, None, [("dateISO", 1), ("_id", 1)], _meal_json, _meal_rows, MEAL_COLUMNS),
+    "activity": (activity, None, [("dateISO", 1), ("_id", 1)], _activity_json, _activity_rows, ACTIVITY_COLUMNS),
+    "summaries": (rollup_docs, {"_id": 0, "userId": 0, "updatedAt": 0}, [("dateISO", 1)], _summary_json,
+                  _summary_rows, SUMMARY_COLUMNS),
+}
+
+
+async def _ndjson(cursor, to_json):
+    buf = []
+    async for doc in cursor:
+        buf.append(json.dumps(to_json(doc), default=str))
+        # flush once per fetched batch rather than per document
+        if len(buf) >= EXPORT_BATCH_SIZE:
+            yield "\n".join(buf) + "\n"
+            buf.clear()
+    if buf:
+        yield "\n".join(buf) + "\n"
+
+
+def _drain(out: io.StringIO) -> str:
+    text = out.getvalue()
+    out.seek(0)
+    out.truncate()
+    return text
+
+
+async def _csv(cursor, to_rows, columns):
+    out = io.StringIO()
+    w = csv.DictWriter(out, fieldnames=columns, extrasaction="ignore")
+    w.writeheader()
+    yield _drain(out)
+    n = 0
+    async for doc in cursor:
+        for row in to_rows(doc):
+            w.writerow(row)
+        n += 1
+        if n % EXPORT_BATCH_SIZE == 0:
+            yield _drain(out)
+    tail = _drain(out)
+    if tail:
+        yield tail
+
+
+@router.get("/{kind}")
+async def export_history(
+    kind: Literal["meals", "activity", "summaries"],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    from_: date | None = Query(default=None, alias="from"),
+    to: date | None = None,
+    user=Depends(get_current_user),
+):
+    """
+    Stream the user's whole meal / activity / daily-summary history (optionally
+    limited to from..to), oldest first, as NDJSON (one document per line) or CSV.
+    """
+    coll, proj, sort, to_json, to_rows, columns = EXPORTS[kind]
+    await activity_buffer.flush_user(user["id"])
+    cursor = coll.find(_date_filter(user["id"], from_, to), proj).sort(sort).batch_size(EXPORT_BATCH_SIZE)
+    name = f"predictmedi-{kind}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{name}"'}
+    if format == "csv":
+        return StreamingResponse(_csv(cursor, to_rows, columns), media_type="text/csv", headers=headers)
+    return StreamingResponse(_ndjson(cursor, to_json), media_type="application/x-ndjson", headers=headers)
@@ -1,25 +1,31 @@
 # backend/app/routes_meals.py
-from fastapi import APIRouter, Depends, Query
-from datetime import datetime
-from .deps import get_current_user
-from .schemas import MealIn
+from fastapi import APIRouter, Depends, Query, Request, Response
+from datetime import datetime, date
+from typing import Literal
+from .deps import get_current_user, get_token_user
+from .schemas import MealIn, BulkIn
+from .bulk import validate_entries, write_unordered, summary
 from .db import meals
+from . import rollups, mealdays
+from .trends import resolve_range, meal_trend
+from .paging import page
+from .nutrients import vectors
+from .suggest import popularity
+from .etag import day_tag, not_modified, tag
 
 router = APIRouter(prefix="/meals", tags=["meals"])
 
-@router.get("/log")
-async def get_meal_log(
-    date: str = Query(..., description="YYYY-MM-DD"),
-    user=Depends(get_current_user),
-):
-    doc = await meals.find_one({"userId": user["id"], "dateISO": date})
-    if not doc:
-        # Return the shape your UI expects
-        return {"items": []}
+LOG_FIELDS = {"dateISO", "items", "entries", "count", "totals", "totalCalories", "createdAt", "updatedAt"}
+
+def _dump(d: dict) -> dict:
+    d = dict(d)
+    d["id"] = str(d.pop("_id", ""))   # make ObjectId JSON-safe
+    return d
 
-    # Map DB fields -> UI fields (UI uses "desc", not "name")
+def ui_items(doc: dict | None) -> list[dict]:
+    """Map DB fields -> UI fields (UI uses "desc", not "name")."""
     items = []
-    for it in (doc.get("items") or []):
+    for it in ((doc or {}).get("items") or []):
         items.append({
             "desc": it.get("name") or "",
             "grams": it.get("grams"),
@@ -32,66 +38,121 @@ async def get_meal_log(
             "sodium_mg": it.get("sodium_mg"),
             "fdcId": it.get("fdcId"),
         })
-    return {"items": items}
+    return items
+
+@router.get("/log")
+async def get_meal_log(
+    request: Request,
+    response: Response,
+    date: str = Query(..., description="YYYY-MM-DD"),
+    user=Depends(get_current_user),
+):
+    etag = await day_tag("meals/log", user, date)
+    if (r := not_modified(request, etag)) is not None:
+        return r
+    tag(response, etag)
+    doc = await meals.find_one({"userId": user["id"], "dateISO": date}, {"_id": 0, "items": 1})
+    return {"items": ui_items(doc)}
 
 
 @router.post("/log", status_code=201)
 async def log_meal(payload: MealIn, user=Depends(get_current_user)):
-    total_cal = sum((getattr(i, "kcal", None) or 0) for i in payload.items)
-    doc = {
-        "userId": user["id"],
-        "dateISO": payload.date.isoformat(),
-        "items": [i.dict() for i in payload.items],
-        "totalCalories": total_cal,
-        "notes": payload.notes,
-        "createdAt": datetime.utcnow().isoformat()
-    }
-    await meals.insert_one(doc)
+    dateISO = payload.date.isoformat()
+    items = [i.dict() for i in payload.items]
+    await vectors.prime([it["fdcId"] for it in items if it.get("fdcId") is not None])
+    vectors.apply(items)  # items with fdcId + grams get server-computed nutrients
+    total_cal = sum((it.get("kcal") or 0) for it in items)
+    # appended to the day's document (one per user per day, see mealdays.py)
+    await mealdays.add(user["id"], dateISO, items, payload.notes)
+    await rollups.bump(user["id"], dateISO, rollups.meal_inc(items))
+    popularity.bump(items)
     return {"ok": True, "totalCalories": total_cal}
 
 
+@router.post("/log/bulk", status_code=200)
+async def bulk_log_meals(payload: BulkIn, user=Depends(get_current_user)):
+    """
+    Validate all entries, append each day's entries to its document with one
+    unordered bulk_write (one upsert per day), bump rollups once per day.
+    """
+    valid, results = validate_entries(MealIn, payload.entries)
+    by_day: dict[str, list[tuple[int, list[dict], str | None]]] = {}
+    await vectors.prime([it.fdcId for _, m in valid for it in m.items if it.fdcId is not None])
+    for i, m in valid:
+        items = [it.dict() for it in m.items]
+        vectors.apply(items)
+        by_day.setdefault(m.date.isoformat(), []).append((i, items, m.notes))
+
+    now = datetime.utcnow().isoformat()
+    days = list(by_day)
+    ops = [mealdays.day_op(user["id"], d, [(items, notes) for _, items, notes in by_day[d]], now) for d in days]
+    failed, _ = await write_unordered(meals, ops)
+
+    incs: dict[str, dict] = {}
+    for n, d in enumerate(days):
+        for i, items, _ in by_day[d]:
+            if n in failed:
+                results[i] = {"index": i, "status": "failed", "error": "write failed"}
+            else:
+                results[i] = {"index": i, "status": "ok", "totalCalories": sum((it.get("kcal") or 0) for it in items)}
+        if n not in failed:
+            all_items = [it for _, items, _ in by_day[d] for it in items]
+            incs[d] = rollups.meal_inc(all_items, docs=len(by_day[d]))
+            popularity.bump(all_items)
+    await rollups.bump_many(user["id"], incs)
+    return summary(results)
+
+
 @router.get("/logs")
-async def list_meals(user=Depends(get_current_user), limit: int = 30):
-    cur = meals.find({"userId": user["id"]}).sort("dateISO", -1).limit(limit)
-    return {"logs": [doc async for doc in cur]}
+async def list_meals(
+    user=Depends(get_current_user),
+    limit: int = Query(30, ge=1, le=500),
+    cursor: str | None = Query(default=None, description="`next` from the previous page"),
+    fields: str | None = Query(default=None, description="comma list, e.g. dateISO,totalCalories"),
+    compact: bool = False,
+):
+    return await page(meals, {"userId": user["id"]}, cursor=cursor, limit=limit, fields=fields,
+                      allowed=LOG_FIELDS, dump=_dump, compact=compact)
 
 
 
 @router.get("/summary")
 async def meals_summary(
+    request: Request,
+    response: Response,
     dateISO: str | None = Query(default=None),
-    user=Depends(get_current_user)
+    user=Depends(get_token_user)
 ):
     from datetime import date
     dateISO = dateISO or date.today().isoformat()
+    etag = await day_tag("meals/summary", user, dateISO)
+    if (r := not_modified(request, etag)) is not None:
+        return r
+    tag(response, etag)
 
-    totals = {
-        "kcal": 0, "carb_g": 0, "protein_g": 0, "fat_g": 0,
-        "fiber_g": 0, "sugar_g": 0, "sodium_mg": 0
-    }
-    count = 0
-    async for doc in meals.find({"userId": user["id"], "dateISO": dateISO}):
-        count += 1
-        for it in (doc.get("items") or []):
-            for k in totals.keys():
-                v = it.get(k)
-                if isinstance(v, (int, float)):
-                    totals[k] += v
-
-    return {"dateISO": dateISO, "count": count, "totals": totals}
+    day = await rollups.read_day(user["id"], dateISO)
+    return {"dateISO": dateISO, "count": day["meals"]["count"], "totals": rollups.meal_totals(day)}
 
 @router.get("/day")
 async def get_meals_for_day(
+    request: Request,
+    response: Response,
     dateISO: str = Query(..., min_length=8),
     user=Depends(get_current_user)
 ):
-    docs = [doc async for doc in meals.find({"userId": user["id"], "dateISO": dateISO})]
-    items = []
-    totals = {"kcal":0,"carb_g":0,"protein_g":0,"fat_g":0,"fiber_g":0,"sugar_g":0,"sodium_mg":0}
-    for d in docs:
-        for it in (d.get("items") or []):
-            items.append(it)
-            for k in totals:
-                v = it.get(k)
-                if isinstance(v,(int,float)): totals[k] += v
-    return {"dateISO": dateISO, "count": len(docs), "items": items, "totals": totals}
+    etag = await day_tag("meals/day", user, dateISO)
+    if (r := not_modified(request, etag)) is not None:
+        return r
+    tag(response, etag)
+    agg = await mealdays.read_day(user["id"], dateISO, with_items=True)
+    return {"dateISO": dateISO, "count": agg["count"], "items": agg["items"], "totals": agg["totals"]}
+
+@router.get("/trend")
+async def meals_trend(
+    from_: date | None = Query(default=None, alias="from", description="YYYY-MM-DD, default to-29d"),
+    to: date | None = Query(default=None, description="YYYY-MM-DD, default today"),
+    bucket: Literal["day", "week", "month"] = "day",
+    user=Depends(get_token_user)
+):
+    lo, hi = resolve_range(from_, to)
+    return {"from": lo, "to": hi, "bucket": bucket, "points": await meal_trend(user["id"], lo, hi, bucket)}
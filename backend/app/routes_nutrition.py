@@ -1,112 +1,219 @@
 from fastapi import APIRouter, HTTPException, Query
-from .config import FDC_API_KEY, FDC_BASE
-import httpx, time
+from .config import FDC_API_KEY, SUGGEST_MIN_LOCAL, SUGGEST_DEBOUNCE_MS
+from .fdc import search_item, food_detail as detail_body, fetch_foods
+from .foodindex import get_index
+from .foodcache import food_cache, search_cache, search_key, NotFound
+from .upstream import request as fdc_request, BudgetExhausted, DETAIL, SEARCH, REFRESH
+from .nutrients import vectors
+from .suggest import get_suggest
+from .schemas import FoodIdsIn, PortionIn
+import asyncio, math
 
 router = APIRouter(prefix="/nutrition", tags=["nutrition"])
 
-# --- simple TTL cache in memory ---
-_food_cache: dict[int, tuple[float, dict]] = {}
-_CACHE_TTL = 60 * 60 * 24   # 24h
-_CACHE_MAX = 500
-
-def _cache_get(fid: int):
-    rec = _food_cache.get(fid)
-    if not rec: return None
-    ts, val = rec
-    if time.time() - ts > _CACHE_TTL:
-        _food_cache.pop(fid, None)
-        return None
-    return val
-
-def _cache_put(fid: int, val: dict):
-    if len(_food_cache) >= _CACHE_MAX:
-        # drop an arbitrary (oldest-ish) item
-        _food_cache.pop(next(iter(_food_cache)))
-    _food_cache[fid] = (time.time(), val)
-
-def _want(n):
-    n = (n or "").lower()
-    return n in {
-        "energy", "energy (atwater general factors)",
-        "protein", "total lipid (fat)", "carbohydrate, by difference",
-        "fiber, total dietary", "sugars, total including nlea", "sodium, na"
-    }
-
-def pick_macros(food_json: dict):
-    out = {"kcal": None, "protein_g": None, "carb_g": None, "fat_g": None,
-           "fiber_g": None, "sugar_g": None, "sodium_mg": None}
-    for n in (food_json.get("foodNutrients") or []):
-        name = (n.get("nutrient", {}) or {}).get("name")
-        if not name or not _want(name): 
-            continue
-        unit = (n["nutrient"].get("unitName") or "").lower()
-        val  = n.get("amount")
-        if val is None: 
-            continue
-        nm = name.lower()
-        if "energy" in nm:
-            out["kcal"] = float(val)
-        elif nm == "protein":
-            out["protein_g"] = float(val)
-        elif "carbohydrate" in nm:
-            out["carb_g"] = float(val)
-        elif "total lipid" in nm:
-            out["fat_g"] = float(val)
-        elif "fiber" in nm:
-            out["fiber_g"] = float(val)
-        elif "sugars" in nm:
-            out["sugar_g"] = float(val)
-        elif "sodium" in nm:
-            out["sodium_mg"] = float(val if unit == "mg" else val)
-    return out
+def _over_budget(e: BudgetExhausted) -> HTTPException:
+    return HTTPException(503, "FoodData Central request budget exhausted, try again later",
+                         headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
 
 @router.get("/search")
 async def search_foods(q: str = Query(..., min_length=2), pageSize: int = 15):
+    idx = get_index()
+    if idx is not None:
+        local = idx.search(q, max(1, min(pageSize, 50)))
+        # the remote API only gets queries the local index has nothing for
+        if local["total"] or not FDC_API_KEY:
+            return local
     if not FDC_API_KEY:
         raise HTTPException(500, "FDC_API_KEY not configured")
+    size = max(1, min(pageSize, 50))
+    try:
+        return await search_cache.fetch(search_key(q, size), lambda: _remote_search(q, size))
+    except BudgetExhausted as e:
+        raise _over_budget(e)
+
+async def _remote_search(q: str, size: int) -> dict:
     params = {
         "api_key": FDC_API_KEY,
         "query": q,
-        "pageSize": max(1, min(pageSize, 50)),
+        "pageSize": size,
         "dataType": ["Survey (FNDDS)", "SR Legacy", "Foundation"],
     }
-    async with httpx.AsyncClient(timeout=8) as client:
-        r = await client.get(f"{FDC_BASE}/foods/search", params=params)
-        r.raise_for_status()
-        data = r.json()
-        items = []
-        for f in data.get("foods", []):
-            items.append({
-                "fdcId": f.get("fdcId"),
-                "description": f.get("description"),
-                "brandOwner": f.get("brandOwner"),
-                "dataType": f.get("dataType"),
-                "servingSize": f.get("servingSize"),
-                "servingSizeUnit": f.get("servingSizeUnit"),
-            })
-        return {"total": data.get("totalHits", 0), "items": items}
+    r = await fdc_request("GET", "/foods/search", SEARCH, params=params)
+    r.raise_for_status()
+    data = r.json()
+    items = [search_item(f) for f in data.get("foods", [])]
+    _seen(items)
+    return {"total": data.get("totalHits", 0), "items": items}
+
+def _seen(items: list[dict]):
+    # every food FDC shows us becomes suggestible
+    idx = get_suggest()
+    for it in items:
+        idx.add(it)
 
 @router.get("/food/{fdcId}")
 async def food_detail(fdcId: int):
+    idx = get_index()
+    if idx is not None and fdcId in idx:
+        return idx.detail(fdcId)
     if not FDC_API_KEY:
+        if idx is not None:
+            raise HTTPException(404, "Food not in the local index (FDC_API_KEY not configured)")
         raise HTTPException(500, "FDC_API_KEY not configured")
 
-    cached = _cache_get(fdcId)
-    if cached:
-        return cached
-
-    async with httpx.AsyncClient(timeout=8) as client:
-        r = await client.get(f"{FDC_BASE}/food/{fdcId}", params={"api_key": FDC_API_KEY})
-        r.raise_for_status()
-        food = r.json()
-        macros = pick_macros(food)
-        grams = food.get("servingSize") or 100
-        unit  = food.get("servingSizeUnit") or "g"
-        out = {
-            "fdcId": food.get("fdcId"),
-            "description": food.get("description"),
-            "serving": {"amount": grams, "unit": unit},
-            "macros_per_serving": macros,
-        }
-        _cache_put(fdcId, out)
-        return out
+    try:
+        return await food_cache.fetch(str(fdcId), lambda: _remote_food(fdcId))
+    except NotFound:
+        raise HTTPException(404, "Food not found")
+    except BudgetExhausted as e:
+        raise _over_budget(e)
+
+async def _remote_food(fdcId: int) -> dict | None:
+    r = await fdc_request("GET", f"/food/{fdcId}", DETAIL, params={"api_key": FDC_API_KEY})
+    if r.status_code == 404:
+        return None  # remembered for FOOD_CACHE_NEG_TTL
+    r.raise_for_status()
+    body = detail_body(r.json())
+    _seen([body])
+    return body
+
+# ---- batch lookup: every food of a multi-item meal in one round trip ----
+
+@router.get("/foods")
+async def foods_by_ids(ids: str = Query(..., description="comma-separated fdcIds")):
+    try:
+        wanted = [int(x) for x in ids.split(",") if x.strip()]
+    except ValueError:
+        raise HTTPException(422, "ids must be comma-separated integers")
+    if not 1 <= len(wanted) <= 100:
+        raise HTTPException(422, "between 1 and 100 ids")
+    return await _foods(wanted)
+
+@router.post("/foods")
+async def foods_by_ids_body(payload: FoodIdsIn):
+    return await _foods(payload.ids)
+
+async def _foods(wanted: list[int]) -> dict:
+    """
+    {"foods": [...in request order], "notFound": [...], "unavailable": [...]}.
+    Local and cached ids are answered at once; only the rest go upstream, in
+    POST /foods batches. Stale cache entries are served and refreshed in the
+    background like /food/{fdcId}; ids whose batch failed get their expired
+    copy when one is still held.
+    """
+    wanted = list(dict.fromkeys(wanted))
+    idx = get_index()
+    found: dict[int, dict] = {}
+    missing: set[int] = set()
+    fetch: list[int] = []
+    stale: list[int] = []
+    for fid in wanted:
+        if idx is not None and fid in idx:
+            found[fid] = idx.detail(fid)
+            continue
+        hit = await food_cache.peek(str(fid))
+        if hit is None:
+            fetch.append(fid)
+        elif hit[0] == "negative":
+            missing.add(fid)
+        else:
+            found[fid] = hit[1]
+            if hit[0] == "stale":
+                stale.append(fid)
+
+    failed: set[int] = set()
+    if fetch and not FDC_API_KEY:
+        if idx is None:
+            raise HTTPException(500, "FDC_API_KEY not configured")
+        missing.update(fetch)  # the local index is all there is
+    elif fetch:
+        got, failed, over_budget = await _fetch_into_cache(fetch)
+        found.update(got)
+        missing.update(fid for fid in fetch if fid not in got and fid not in failed)
+        for fid in list(failed):
+            old = await food_cache.last_known(str(fid))
+            if old is not None:
+                found[fid] = old
+                failed.discard(fid)
+                food_cache.expired_served += 1
+        if failed and not found:
+            if over_budget is not None:
+                raise _over_budget(over_budget)
+            raise HTTPException(502, "FoodData Central unavailable")
+    if stale and FDC_API_KEY:
+        asyncio.create_task(_refresh_stale(stale))
+
+    return {"foods": [found[fid] for fid in wanted if fid in found],
+            "notFound": [fid for fid in wanted if fid in missing],
+            "unavailable": [fid for fid in wanted if fid in failed]}
+
+async def _fetch_into_cache(ids: list[int], prio: int = DETAIL
+                            ) -> tuple[dict[int, dict], set[int], BudgetExhausted | None]:
+    foods, failed, over_budget = await fetch_foods(ids, FDC_API_KEY, prio)
+    got = {}
+    for fid in ids:
+        if fid in foods:
+            got[fid] = detail_body(foods[fid])
+            _seen([foods[fid]])
+            food_cache.put(str(fid), got[fid])
+        elif fid not in failed:
+            food_cache.put(str(fid), None, neg=True)  # remembered for FOOD_CACHE_NEG_TTL
+    return got, failed, over_budget
+
+async def _refresh_stale(ids: list[int]):
+    food_cache.refreshes += 1
+    try:
+        _, failed, _ = await _fetch_into_cache(ids, REFRESH)
+        if failed:
+            food_cache.refresh_errors += 1
+    except Exception:
+        food_cache.refresh_errors += 1  # keep serving the stale copies
+
+# ---- portions: nutrient totals for (fdcId, grams) lists, scaled server-side ----
+
+@router.post("/portion")
+async def portion(payload: PortionIn):
+    pairs = [(it.fdcId, it.grams) for it in payload.items]
+    await vectors.prime([f for f, _ in pairs])
+    unknown = vectors.unknown([f for f, _ in pairs])
+    if unknown and FDC_API_KEY:
+        try:
+            await _foods(unknown)   # one batched lookup fills the food cache
+        except HTTPException:
+            pass                    # answered below with those ids under "missing"
+    return vectors.portion(pairs)
+
+# ---- autocomplete: local prefix index, FDC only in the background when it has too few matches ----
+
+SUGGEST_FILL_SIZE = 25
+_filling: dict[str, asyncio.Task] = {}   # queries still in their debounce window
+
+@router.get("/suggest")
+async def suggest(q: str = Query(..., min_length=1, max_length=100), limit: int = 8):
+    limit = max(1, min(limit, 20))
+    items = get_suggest().suggest(q, limit)
+    pending = False
+    if len(items) < min(limit, SUGGEST_MIN_LOCAL) and FDC_API_KEY and len(q.strip()) >= 3:
+        pending = _fill_later(" ".join(q.lower().split()))
+    # "pending": an FDC search will add foods for this prefix shortly; ask again to see them
+    return {"items": items, "pending": pending}
+
+def _fill_later(q: str) -> bool:
+    """Debounce: a query typed on top of a waiting one replaces it; shorter ones ride along."""
+    for k, task in list(_filling.items()):
+        if q.startswith(k) and q != k and not task.done():
+            task.cancel()
+            _filling.pop(k, None)
+    if any(k.startswith(q) for k in _filling):
+        return True
+    _filling[q] = asyncio.create_task(_fill(q))
+    return True
+
+async def _fill(q: str):
+    await asyncio.sleep(SUGGEST_DEBOUNCE_MS / 1000.0)
+    _filling.pop(q, None)   # past the window: no longer cancellable
+    try:
+        res = await search_cache.fetch(search_key(q, SUGGEST_FILL_SIZE), lambda: _remote_search(q, SUGGEST_FILL_SIZE))
+        _seen(res["items"])   # a shared-tier hit was fetched by another worker
+    except Exception:
+        pass  # budget exhausted or upstream down: local matches are all we have
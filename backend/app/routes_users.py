@@ -1,8 +1,13 @@
 from fastapi import APIRouter, Depends
 from bson import ObjectId
+from datetime import date
 from .deps import get_current_user
+from .usercache import user_cache
+from .auth import user_token
+from .config import JWT_PROFILE_CLAIMS
 from .db import users
 from .schemas import UserUpdate
+from . import scores
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -22,10 +27,19 @@ async def update_me(payload: UserUpdate, user=Depends(get_current_user)):
         update["sex"] = update["sex"].lower()
     if update:
         await users.update_one({"_id": ObjectId(user["id"])}, {"$set": update})
+        changed = any(user.get(k) != update[k] for k in scores.PROFILE_FIELDS & update.keys())
         user.update(update)
-    return {"user": {
+        # the fresh copy also overrides older tokens' profile claims (deps.get_token_user)
+        user_cache.put(user["id"], user)
+        if changed:
+            # the plan changes from today on; past days keep the scores they were given
+            await scores.invalidate_day(user["id"], date.today().isoformat())
+    out = {"user": {
         "id": user["id"], "name": user["name"], "email": user["email"],
         "age": user.get("age"), "sex": user.get("sex"),
         "heightCm": user.get("heightCm"), "weightKg": user.get("weightKg"),
     }}
+    if JWT_PROFILE_CLAIMS:
+        out["token"] = user_token(out["user"])  # old token's profile claim is now stale
+    return out
 
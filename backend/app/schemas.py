@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, constr
-from typing import Optional, List
+from typing import Any, Optional, List
 from datetime import date
 from typing import Literal
 
@@ -45,6 +45,9 @@ class MealItem(BaseModel):
     fiber_g: Optional[float] = None
     sugar_g: Optional[float] = None
     sodium_mg: Optional[float] = None
+    # FoodData Central food and portion; when both are set the server computes the nutrients
+    fdcId: Optional[int] = None
+    grams: Optional[float] = Field(None, ge=0)
     # aliases for old/UI variations
     calories: Optional[float] = Field(None, alias="calories")
     carbs_g: Optional[float] = Field(None, alias="carbs_g")
@@ -66,3 +69,19 @@ class UserUpdate(BaseModel):
     sex: Optional[Literal["male","female","other"]] = None
     heightCm: Optional[float] = Field(None, gt=0, le=300)
     weightKg: Optional[float] = Field(None, gt=0, le=500)
+
+# Bulk sync: entries are validated one by one so each gets its own status.
+class BulkIn(BaseModel):
+    entries: List[Any] = Field(..., min_length=1, max_length=1000)
+
+# Batch food lookup for multi-item meals (/nutrition/foods).
+class FoodIdsIn(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=100)
+
+# Portion totals (/nutrition/portion).
+class PortionItem(BaseModel):
+    fdcId: int
+    grams: float = Field(..., ge=0)
+
+class PortionIn(BaseModel):
+    items: List[PortionItem] = Field(..., min_length=1, max_length=100)
@@ -0,0 +1,184 @@
+# backend/app/scores.py
+"""
+Memoised coach scores, kept on each day's rollup document:
+
+    daily_rollups.scores.<goal> = the /coach/motivate body for that day
+
+A day is scored the first time it is read and reused until something changes
+it. Every rollup write (meal or activity log, bulk sync, write-behind flush,
+rebuild) unsets `scores` in the same update, and a profile change (age, sex,
+height, weight) unsets today's: the new profile applies from today on, past
+days keep the plan they were scored with.
+
+Stored scores are written back with the rollup's updatedAt in the filter, so
+a log landing between the read and the write is never covered by a stale
+score. Days with write-behind increments still pending are scored live.
+
+Each stored score also carries the profile it was computed with (`_profile`,
+stripped before it is served). Read routes take the profile from the token
+(deps.get_token_user), and another worker may still be serving a token
+issued before the profile changed. So a stored score for today or later is
+only served to the same profile; otherwise it is scored again and replaced.
+"""
+from datetime import date
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from .db import rollups
+from .rollups import as_day, meal_totals
+from .reco import plan, activity_level_from_minutes, adherence_score
+from .writebehind import activity_buffer
+from . import metrics
+
+GOALS = ("maintain", "lose", "gain")          # memoised; other goals are scored live
+PROFILE_FIELDS = {"age", "sex", "heightCm", "weightKg"}
+STREAK_MIN = 70                                # "on track" and above
+
+
+def motivate(user: dict, dateISO: str, day: dict, goal: str, activity_level: str | None = None) -> dict:
+    """/coach/motivate body from a day's rollup. Raises ValueError on an incomplete profile."""
+    mins = day["activity"]["minutes"]
+
+    # Build plan for the user's inferred activity level (or the one asked for)
+    act_level = activity_level or activity_level_from_minutes(mins)
+    p = plan(user, act_level, goal)
+
+    totals = meal_totals(day)
+
+    score, messages = adherence_score(p["macros"], totals, mins)
+    return {
+        "dateISO": dateISO,
+        "activity_level": act_level,
+        "minutes": mins,
+        "plan": p,
+        "nutrition_totals": totals,
+        "score": score,
+        "messages": messages
+    }
+
+
+class _Stats:
+    def __init__(self):
+        self.hits = self.computed = self.stored = self.invalidated = self.other_profile = 0
+
+    def snapshot(self) -> dict:
+        served = self.hits + self.computed
+        return {"hits": self.hits, "computed": self.computed, "stored": self.stored,
+                "invalidated": self.invalidated, "other_profile": self.other_profile,
+                "hit_rate": round(self.hits / served, 4) if served else 0.0}
+
+
+stats = _Stats()
+metrics.register("scores", stats.snapshot)
+
+
+def _projection(goal: str) -> dict:
+    proj = {"_id": 0, "dateISO": 1, "meals": 1, "activity": 1, "updatedAt": 1}
+    if goal in GOALS:
+        proj[f"scores.{goal}"] = 1
+    return proj
+
+
+def _profile(user: dict) -> dict:
+    return {k: user.get(k) for k in sorted(PROFILE_FIELDS)}
+
+
+def _stored(user: dict, doc: dict | None, goal: str) -> dict | None:
+    """The day's stored body when it may be served to this profile, else None."""
+    body = ((doc or {}).get("scores") or {}).get(goal)
+    if body is None:
+        return None
+    body = dict(body)
+    profile = body.pop("_profile", None)
+    if profile != _profile(user) and doc["dateISO"] >= date.today().isoformat():
+        stats.other_profile += 1
+        return None
+    return body
+
+
+def _store(user: dict, doc: dict, goal: str, body: dict) -> UpdateOne:
+    return UpdateOne({"userId": user["id"], "dateISO": doc["dateISO"], "updatedAt": doc.get("updatedAt")},
+                     {"$set": {f"scores.{goal}": {**body, "_profile": _profile(user)}}})
+
+
+async def _write(ops: list[UpdateOne]):
+    if not ops:
+        return
+    try:
+        res = await rollups.bulk_write(ops, ordered=False)
+        stats.stored += res.modified_count
+    except BulkWriteError:
+        pass  # only a cache; the next read scores those days again
+
+
+async def day_score(user: dict, dateISO: str, goal: str) -> dict:
+    """One day's motivate body, memoised. Raises ValueError on an incomplete profile."""
+    uid = user["id"]
+    if activity_buffer.has_pending(uid, dateISO):
+        stats.computed += 1
+        return motivate(user, dateISO, await activity_buffer.read_day(uid, dateISO), goal)
+    doc = await rollups.find_one({"userId": uid, "dateISO": dateISO}, _projection(goal))
+    body = _stored(user, doc, goal)
+    if body is not None:
+        stats.hits += 1
+        return body
+    body = motivate(user, dateISO, as_day(doc), goal)
+    stats.computed += 1
+    if doc is not None and goal in GOALS:
+        await _write([_store(user, doc, goal, body)])
+    return body
+
+
+async def history(user: dict, lo: str, hi: str, goal: str) -> list[dict]:
+    """
+    Motivate bodies for every day in [lo, hi] with a meal or activity logged,
+    oldest first; only days without a stored score are computed.
+    """
+    uid = user["id"]
+    await activity_buffer.flush_user(uid)
+    cur = rollups.find({"userId": uid, "dateISO": {"$gte": lo, "$lte": hi}}, _projection(goal)).sort("dateISO", 1)
+    out, ops = [], []
+    async for doc in cur:
+        body = _stored(user, doc, goal)
+        if body is None:
+            day = as_day(doc)
+            if not (day["meals"]["count"] or day["activity"]["count"]):
+                continue
+            body = motivate(user, doc["dateISO"], day, goal)
+            stats.computed += 1
+            if goal in GOALS:
+                ops.append(_store(user, doc, goal, body))
+        else:
+            stats.hits += 1
+        out.append(body)
+    await _write(ops)
+    return out
+
+
+def streaks(days: list[dict], today: str) -> dict:
+    """Runs of consecutive calendar days scoring >= STREAK_MIN; the current one may end today or yesterday."""
+    best = run = 0
+    prev = None
+    last_end = None
+    for b in days:
+        d = date.fromisoformat(b["dateISO"])
+        if b["score"] >= STREAK_MIN:
+            run = run + 1 if prev is not None and (d - prev).days == 1 and run else 1
+            prev, last_end = d, d
+            best = max(best, run)
+        else:
+            run, prev = 0, None
+    current = run if last_end is not None and prev is not None and (date.fromisoformat(today) - last_end).days <= 1 else 0
+    return {"current": current, "best": best, "threshold": STREAK_MIN}
+
+
+def appreciation_badge(score: int) -> str:
+    if score >= 90: return "🏅 Gold Day"
+    if score >= 80: return "🥈 Silver Day"
+    if score >= 70: return "🥉 Bronze Day"
+    return "✨ Keep Going"
+
+
+async def invalidate_day(user_id: str, dateISO: str):
+    res = await rollups.update_one({"userId": user_id, "dateISO": dateISO}, {"$unset": {"scores": ""}, "$inc": {"v": 1}})
+    stats.invalidated += res.modified_count
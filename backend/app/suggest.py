@@ -0,0 +1,241 @@
+# backend/app/suggest.py
+"""
+Autocomplete for the food search box (/nutrition/suggest).
+
+Foods come from the local FDC index at startup and from every FDC search or
+detail answer seen since. Each description's tokens go into a sorted array
+that is bisected for the last (partial) word; earlier words must prefix some
+token of the description. Matches are ranked by how often users logged the
+food (meal items' fdcId, loaded once at startup and bumped on each log), then
+by description-starts-with-query, data type and length.
+
+Answers are memoised for SUGGEST_MEMO_S per normalised query, so repeated
+keystrokes from many users are dictionary lookups.
+"""
+import bisect, heapq, time
+from collections import OrderedDict
+
+from .config import SUGGEST_MEMO_S
+from .db import meals
+from .foodindex import get_index, tokens
+from . import metrics
+
+# same preference as foodindex search
+_TYPE_RANK = {"Foundation": 0, "SR Legacy": 1, "Survey (FNDDS)": 2}
+_MEMO_MAX = 4096
+_CAP = 64        # candidates taken per source
+_TOP_LEN = 3     # prefixes this short use the precomputed lists
+_SCAN = 5000     # posting entries checked for multi-word queries
+
+
+class Popularity:
+    """Logged-item counts per fdcId across users."""
+    def __init__(self):
+        self.counts: dict[int, int] = {}
+
+    async def load(self, limit: int = 100_000) -> int:
+        pipeline = [
+            {"$match": {"items.fdcId": {"$type": "number"}}},
+            {"$unwind": "$items"},
+            {"$match": {"items.fdcId": {"$type": "number"}}},
+            {"$group": {"_id": "$items.fdcId", "n": {"$sum": 1}}},
+            {"$sort": {"n": -1}},
+            {"$limit": limit},
+        ]
+        counts = {}
+        async for row in meals.aggregate(pipeline):
+            counts[int(row["_id"])] = row["n"]
+        self.counts = counts
+        return len(counts)
+
+    def bump(self, items: list[dict]):
+        for it in items:
+            fid = it.get("fdcId")
+            if isinstance(fid, int):
+                self.counts[fid] = self.counts.get(fid, 0) + 1
+                if _index is not None and fid in _index.foods:
+                    _index.boosted.add(fid)   # ranked live until the next reindex
+
+    def __getitem__(self, fid: int) -> int:
+        return self.counts.get(fid, 0)
+
+
+class SuggestIndex:
+    """
+    Foods are kept in a static rank order (popularity when last reindexed, data
+    type, description length) and every posting list follows it, so the best
+    matches for a word are at the head of its lists. Prefixes of up to
+    _TOP_LEN characters have their first _CAP foods precomputed, since "c" or
+    "ch" would otherwise touch most of the catalogue. At most _CAP * a few
+    candidates are ranked per query, with live popularity.
+    """
+    def __init__(self, popularity: Popularity):
+        self.popularity = popularity
+        self.foods: dict[int, dict] = {}         # fdcId -> search_item shape
+        self._tokens: dict[int, tuple[str, ...]] = {}
+        self._norm: dict[int, str] = {}          # description as normalised tokens
+        self._rank: dict[int, int] = {}
+        self.postings: dict[str, list[int]] = {} # token -> fdcIds in rank order
+        self.vocab: list[str] = []               # sorted, bisected for the last word
+        self.descs: list[tuple[str, int]] = []   # sorted (normalised description, fdcId)
+        self._top: dict[str, list[int]] = {}     # short prefix -> first _CAP fdcIds in rank order
+        self.boosted: set[int] = set()           # logged since the last reindex
+        self._memo: OrderedDict[str, tuple[float, int, list[dict]]] = OrderedDict()
+        self.version = 0
+        self.queries = self.memo_hits = 0
+        self.ms_total = self.ms_max = 0.0
+
+    def __len__(self):
+        return len(self.foods)
+
+    # ---- building ----
+
+    def _put(self, item: dict) -> int | None:
+        fid, desc = item.get("fdcId"), item.get("description")
+        if fid is None or not desc or int(fid) in self.foods:
+            return None
+        fid = int(fid)
+        self.foods[fid] = {k: item.get(k) for k in ("fdcId", "description", "brandOwner", "dataType")}
+        toks = tokens(desc)
+        self._tokens[fid] = tuple(dict.fromkeys(toks))
+        self._norm[fid] = " ".join(toks)
+        return fid
+
+    def _static_key(self, fid: int):
+        return (-self.popularity[fid], _TYPE_RANK.get(self.foods[fid]["dataType"], 9), len(self._norm[fid]), fid)
+
+    def add(self, item: dict):
+        """One food seen at runtime; ranked after everything already indexed until the next reindex."""
+        fid = self._put(item)
+        if fid is None:
+            return
+        self._rank[fid] = len(self._rank)
+        for t in self._tokens[fid]:
+            ids = self.postings.get(t)
+            if ids is None:
+                self.postings[t] = [fid]
+                bisect.insort(self.vocab, t)
+            else:
+                ids.append(fid)
+            for n in range(1, min(len(t), _TOP_LEN) + 1):
+                top = self._top.setdefault(t[:n], [])
+                if len(top) < _CAP and (not top or top[-1] != fid):
+                    top.append(fid)
+        bisect.insort(self.descs, (self._norm[fid], fid))
+        self.version += 1
+
+    def add_many(self, items):
+        for it in items:
+            self._put(it)
+        self.reindex()
+
+    def reindex(self):
+        """Re-rank everything with current popularity (O(n log n); startup, imports, scheduled jobs)."""
+        order = sorted(self.foods, key=self._static_key)
+        self._rank = {fid: i for i, fid in enumerate(order)}
+        postings: dict[str, list[int]] = {}
+        top: dict[str, list[int]] = {}
+        for fid in order:
+            for t in self._tokens[fid]:
+                postings.setdefault(t, []).append(fid)
+                for n in range(1, min(len(t), _TOP_LEN) + 1):
+                    lst = top.setdefault(t[:n], [])
+                    if len(lst) < _CAP and (not lst or lst[-1] != fid):
+                        lst.append(fid)
+        self.postings, self._top = postings, top
+        self.vocab = sorted(postings)
+        self.descs = sorted((self._norm[f], f) for f in order)
+        self.boosted.clear()
+        self.version += 1
+
+    # ---- queries ----
+
+    def _heads(self, prefix: str) -> list[int]:
+        """Best-ranked foods having a token that starts with `prefix`."""
+        if len(prefix) <= _TOP_LEN:
+            return self._top.get(prefix, [])
+        out: list[int] = []
+        i = bisect.bisect_left(self.vocab, prefix)
+        while i < len(self.vocab) and self.vocab[i].startswith(prefix):
+            out.extend(self.postings[self.vocab[i]][:_CAP])
+            i += 1
+        return out
+
+    def _matches(self, fid: int, words: list[str]) -> bool:
+        toks = self._tokens[fid]
+        return all(any(t.startswith(w) for t in toks) for w in words)
+
+    def _candidates(self, words: list[str]) -> set[int]:
+        ql = " ".join(words)
+        # descriptions starting with the whole query, straight from the sorted array
+        i = bisect.bisect_left(self.descs, (ql,))
+        cands = {fid for d, fid in self.descs[i:i + _CAP] if d.startswith(ql)}
+        if len(words) == 1:
+            cands.update(self._heads(words[0]))
+        else:
+            # walk the shortest exact posting list among the earlier words, in rank order
+            lists = [self.postings[w] for w in words[:-1] if w in self.postings]
+            src = min(lists, key=len) if lists else self._heads(words[-1])
+            found = 0
+            for fid in src[:_SCAN]:
+                if self._matches(fid, words):
+                    cands.add(fid)
+                    found += 1
+                    if found >= _CAP:
+                        break
+        cands.update(f for f in self.boosted if self._matches(f, words))
+        return cands
+
+    def suggest(self, q: str, limit: int) -> list[dict]:
+        t0 = time.perf_counter()
+        words = tokens(q)
+        key = f"{' '.join(words)}|{limit}"
+        hit = self._memo.get(key)
+        if hit is not None and hit[1] == self.version and time.time() - hit[0] <= SUGGEST_MEMO_S:
+            self._memo.move_to_end(key)
+            self.memo_hits += 1
+            out = hit[2]
+        else:
+            out = self._ranked(words, limit) if words else []
+            self._memo[key] = (time.time(), self.version, out)
+            self._memo.move_to_end(key)
+            if len(self._memo) > _MEMO_MAX:
+                self._memo.popitem(last=False)
+        ms = (time.perf_counter() - t0) * 1000.0
+        self.queries += 1
+        self.ms_total += ms
+        self.ms_max = max(self.ms_max, ms)
+        return out
+
+    def _ranked(self, words: list[str], limit: int) -> list[dict]:
+        ql = " ".join(words)
+        pop, norm, rank = self.popularity, self._norm, self._rank
+
+        def key(fid: int):
+            return (-pop[fid], not norm[fid].startswith(ql), rank[fid])
+
+        return [self.foods[f] for f in heapq.nsmallest(limit, self._candidates(words), key=key)]
+
+    def stats(self) -> dict:
+        return {"foods": len(self.foods), "tokens": len(self.vocab), "popular": len(self.popularity.counts),
+                "boosted": len(self.boosted), "queries": self.queries, "memo_hits": self.memo_hits,
+                "ms_avg": round(self.ms_total / self.queries, 3) if self.queries else 0.0,
+                "ms_max": round(self.ms_max, 3)}
+
+
+popularity = Popularity()
+_index: SuggestIndex | None = None
+
+
+def get_suggest() -> SuggestIndex:
+    """The process-wide index, seeded from the local FDC index on first use."""
+    global _index
+    if _index is None:
+        _index = SuggestIndex(popularity)
+        local = get_index()
+        if local is not None:
+            _index.add_many(local.foods.values())
+    return _index
+
+
+metrics.register("suggest", lambda: get_suggest().stats())
@@ -0,0 +1,95 @@
+# backend/app/trends.py
+"""
+Date-range history answered from `daily_rollups` with one indexed range query
+per request; buckets are grouped by the database where possible.
+"""
+from datetime import date, timedelta
+from fastapi import HTTPException
+
+from .db import rollups
+from .aggregates import NUTRIENTS
+
+BUCKETS = ("day", "week", "month")
+MAX_RANGE_DAYS = 731
+
+
+def resolve_range(from_: date | None, to: date | None) -> tuple[str, str]:
+    to = to or date.today()
+    from_ = from_ or (to - timedelta(days=29))
+    if from_ > to:
+        raise HTTPException(status_code=400, detail="'from' must be on or before 'to'")
+    if (to - from_).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"range is limited to {MAX_RANGE_DAYS} days")
+    return from_.isoformat(), to.isoformat()
+
+
+def bucket_expr(bucket: str):
+    """Label a rollup's dateISO: 2024-01-05 | 2024-W01 (ISO week) | 2024-01."""
+    if bucket == "month":
+        return {"$substrBytes": ["$dateISO", 0, 7]}
+    if bucket == "week":
+        return {"$dateToString": {"format": "%G-W%V", "date": {"$dateFromString": {"dateString": "$dateISO"}}}}
+    return "$dateISO"
+
+
+def bucket_of(dateISO: str, bucket: str) -> str:
+    """Python twin of bucket_expr, for series computed per day in the app."""
+    if bucket == "month":
+        return dateISO[:7]
+    if bucket == "week":
+        y, w, _ = date.fromisoformat(dateISO).isocalendar()
+        return f"{y}-W{w:02d}"
+    return dateISO
+
+
+def _match(user_id: str, lo: str, hi: str) -> dict:
+    return {"$match": {"userId": user_id, "dateISO": {"$gte": lo, "$lte": hi}}}
+
+
+async def meal_trend(user_id: str, lo: str, hi: str, bucket: str) -> list[dict]:
+    group = {"_id": bucket_expr(bucket),
+             "days": {"$sum": {"$cond": [{"$gt": ["$meals.count", 0]}, 1, 0]}},
+             "count": {"$sum": "$meals.count"}}
+    for k in NUTRIENTS:
+        group[k] = {"$sum": f"$meals.{k}"}
+    pipeline = [_match(user_id, lo, hi), {"$group": group}, {"$match": {"count": {"$gt": 0}}}, {"$sort": {"_id": 1}}]
+    return [
+        {"bucket": row["_id"], "days": row["days"], "count": row["count"],
+         "totals": {k: row.get(k, 0) for k in NUTRIENTS}}
+        async for row in rollups.aggregate(pipeline)
+    ]
+
+
+async def activity_trend(user_id: str, lo: str, hi: str, bucket: str) -> list[dict]:
+    """Per bucket: days with activity, entry count, minutes, steps and per-type minutes."""
+    pipeline = [
+        _match(user_id, lo, hi),
+        {"$match": {"activity.count": {"$gt": 0}}},
+        {"$project": {"b": bucket_expr(bucket), "activity": 1,
+                      "types": {"$objectToArray": {"$ifNull": ["$activity.by_type", {}]}}}},
+        {"$group": {
+            "_id": "$b",
+            "days": {"$sum": 1},
+            "count": {"$sum": "$activity.count"},
+            "minutes": {"$sum": "$activity.minutes"},
+            "steps": {"$sum": "$activity.steps"},
+            "types": {"$push": "$types"},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+    out = []
+    async for row in rollups.aggregate(pipeline):
+        by_type: dict[str, int] = {}
+        for day_types in row["types"]:
+            for t in day_types:
+                by_type[t["k"]] = by_type.get(t["k"], 0) + (t["v"].get("minutes") or 0)
+        out.append({"bucket": row["_id"], "days": row["days"], "count": row["count"],
+                    "minutes": row["minutes"], "steps": row["steps"], "minutes_by_type": by_type})
+    return out
+
+
+async def day_rollups(user_id: str, lo: str, hi: str) -> list[dict]:
+    """Raw rollup docs for a range, oldest first (for per-day derived series)."""
+    cur = rollups.find({"userId": user_id, "dateISO": {"$gte": lo, "$lte": hi}},
+                       {"_id": 0, "dateISO": 1, "meals": 1, "activity": 1}).sort("dateISO", 1)
+    return [doc async for doc in cur]
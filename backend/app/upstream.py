@@ -0,0 +1,202 @@
+# backend/app/upstream.py
+"""
+Every FoodData Central call goes through one pooled client and the scheduler
+below, which keeps this process inside the API key's hourly quota.
+
+  budget    token bucket of FDC_HOURLY_QUOTA (>= 1) tokens refilled at
+            quota/3600 per second; FDC's X-RateLimit-Remaining header caps
+            it, so other processes sharing the key are accounted for
+  priority  DETAIL (food lookups while logging a meal) > SEARCH (search as
+            you type) > REFRESH (background cache refreshes). SEARCH leaves
+            FDC_SEARCH_RESERVE of the bucket to DETAIL; REFRESH leaves twice
+            that. A caller waits in the queue at most MAX_WAIT[priority], and
+            is told BudgetExhausted at once when the wait can't fit
+  retries   429, 5xx and network errors are retried FDC_RETRIES times with
+            full-jitter exponential backoff; a 429 empties the bucket and
+            blocks it for Retry-After (60s when absent)
+
+Callers serve stale cache entries on BudgetExhausted (see foodcache.py).
+GET /metrics "fdc_upstream" shows the remaining budget and queue waits.
+"""
+import asyncio, heapq, random, time
+from collections import deque
+import httpx
+
+from .config import (FDC_BASE, FDC_HOURLY_QUOTA, FDC_SEARCH_RESERVE, FDC_RETRIES,
+                     FDC_BACKOFF_MS, FDC_BACKOFF_MAX_MS)
+from .foodcache import refreshing
+from . import metrics
+
+DETAIL, SEARCH, REFRESH = 0, 1, 2
+NAMES = {DETAIL: "detail", SEARCH: "search", REFRESH: "refresh"}
+MAX_WAIT = {DETAIL: 3.0, SEARCH: 1.0, REFRESH: 0.0}   # seconds in the queue before giving up
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_client: httpx.AsyncClient | None = None
+
+
+def client() -> httpx.AsyncClient:
+    """One pooled (keep-alive) client per process for every FDC call."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(base_url=FDC_BASE, timeout=8,
+                                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10))
+    return _client
+
+
+async def aclose():
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+
+
+class BudgetExhausted(Exception):
+    """No FDC request can be made within the caller's wait."""
+    def __init__(self, retry_after: float):
+        super().__init__(f"FDC budget exhausted, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class Scheduler:
+    def __init__(self, quota: int, search_reserve: float, retries: int, backoff_ms: float, backoff_max_ms: float):
+        if quota <= 0:
+            raise ValueError(f"FDC_HOURLY_QUOTA must be a positive number of requests, got {quota!r}")
+        self.capacity = float(quota)
+        self.rate = quota / 3600.0                       # tokens per second
+        self.tokens = self.capacity
+        r = self.capacity * search_reserve
+        self.reserve = {DETAIL: 0.0, SEARCH: r, REFRESH: min(2 * r, self.capacity - 1)}
+        self.retries, self.backoff, self.backoff_max = retries, backoff_ms / 1000.0, backoff_max_ms / 1000.0
+        self._stamp = time.monotonic()
+        self._queue: list[tuple[int, int, asyncio.Future]] = []   # heap of (priority, seq, waiter)
+        self._seq = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self.blocked_until = 0.0
+        self.upstream_remaining: int | None = None
+        self.waits = {p: deque(maxlen=1000) for p in NAMES}       # recent queue waits, ms
+        self.granted = {p: 0 for p in NAMES}
+        self.rejected = {p: 0 for p in NAMES}
+        self.requests = self.retried = self.throttled = self.server_errors = self.network_errors = 0
+
+    # ---- budget ----
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def _can_take(self, prio: int) -> bool:
+        return self.tokens - 1 >= self.reserve[prio] and time.monotonic() >= self.blocked_until
+
+    def _eta(self, prio: int) -> float:
+        """Seconds until a new `prio` waiter would get a token."""
+        ahead = sum(1 for p, _, fut in self._queue if p <= prio and not fut.done())
+        need = self.reserve[prio] + 1 + ahead - self.tokens
+        return max(need / self.rate if need > 0 else 0.0, self.blocked_until - time.monotonic())
+
+    def _pump(self):
+        self._timer = None
+        self._refill()
+        while self._queue:
+            prio, _, fut = self._queue[0]
+            if fut.done():                       # timed out
+                heapq.heappop(self._queue)
+                continue
+            if not self._can_take(prio):
+                break
+            heapq.heappop(self._queue)
+            self.tokens -= 1
+            fut.set_result(None)
+        if self._queue and self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(max(self._eta(self._queue[0][0]), 0.001), self._pump)
+
+    async def acquire(self, prio: int):
+        t0 = time.monotonic()
+        self._refill()
+        if not any(not f.done() for _, _, f in self._queue) and self._can_take(prio):
+            self.tokens -= 1
+        else:
+            eta = self._eta(prio)
+            if eta > MAX_WAIT[prio]:
+                self.rejected[prio] += 1
+                raise BudgetExhausted(eta)
+            fut = asyncio.get_running_loop().create_future()
+            self._seq += 1
+            heapq.heappush(self._queue, (prio, self._seq, fut))
+            self._pump()
+            try:
+                await asyncio.wait_for(fut, MAX_WAIT[prio])
+            except asyncio.TimeoutError:
+                self.rejected[prio] += 1
+                raise BudgetExhausted(self._eta(prio))
+        self.granted[prio] += 1
+        self.waits[prio].append((time.monotonic() - t0) * 1000.0)
+
+    # ---- requests ----
+
+    def _observe(self, r: httpx.Response):
+        remaining = r.headers.get("X-RateLimit-Remaining")
+        if remaining is not None and remaining.isdigit():
+            self.upstream_remaining = int(remaining)
+            self.tokens = min(self.tokens, float(remaining))
+        if r.status_code == 429:
+            self.throttled += 1
+            after = r.headers.get("Retry-After", "")
+            self.tokens = 0.0
+            self.blocked_until = time.monotonic() + (float(after) if after.isdigit() else 60.0)
+        elif r.status_code >= 500:
+            self.server_errors += 1
+
+    def _sleep_for(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+
+    async def request(self, method: str, path: str, prio: int = DETAIL, **kw) -> httpx.Response:
+        """
+        One FDC call, budgeted and retried. Returns the final response (the
+        caller checks its status) or raises BudgetExhausted / httpx errors.
+        """
+        if refreshing.get():
+            prio = max(prio, REFRESH)
+        for attempt in range(self.retries + 1):
+            await self.acquire(prio)
+            self.requests += 1
+            try:
+                r = await client().request(method, path, **kw)
+            except httpx.TransportError:
+                self.network_errors += 1
+                if attempt == self.retries:
+                    raise
+            else:
+                self._observe(r)
+                if r.status_code not in RETRY_STATUS:
+                    return r
+                if r.status_code == 429 and (attempt == self.retries or self._eta(prio) > self.backoff_max):
+                    raise BudgetExhausted(self._eta(prio))
+                if attempt == self.retries:
+                    return r
+            self.retried += 1
+            await asyncio.sleep(self._sleep_for(attempt))
+
+    def stats(self) -> dict:
+        self._refill()
+        waits = {}
+        for p, name in NAMES.items():
+            w = sorted(self.waits[p])
+            waits[name] = {"granted": self.granted[p], "rejected": self.rejected[p],
+                           "queued": sum(1 for q, _, f in self._queue if q == p and not f.done()),
+                           "wait_ms_avg": round(sum(w) / len(w), 3) if w else 0.0,
+                           "wait_ms_p95": round(w[int(0.95 * (len(w) - 1))], 3) if w else 0.0,
+                           "wait_ms_max": round(w[-1], 3) if w else 0.0}
+        return {"budget_remaining": round(self.tokens, 2), "budget_capacity": self.capacity,
+                "upstream_remaining": self.upstream_remaining,
+                "blocked_s": round(max(0.0, self.blocked_until - time.monotonic()), 1),
+                "requests": self.requests, "retries": self.retried, "throttled_429": self.throttled,
+                "server_errors": self.server_errors, "network_errors": self.network_errors,
+                "priorities": waits}
+
+
+scheduler = Scheduler(FDC_HOURLY_QUOTA, FDC_SEARCH_RESERVE, FDC_RETRIES, FDC_BACKOFF_MS, FDC_BACKOFF_MAX_MS)
+metrics.register("fdc_upstream", scheduler.stats)
+
+
+async def request(method: str, path: str, prio: int = DETAIL, **kw) -> httpx.Response:
+    return await scheduler.request(method, path, prio, **kw)
@@ -0,0 +1,60 @@
+# backend/app/usercache.py
+"""
+Bounded LRU + TTL cache of user profiles, keyed by user id, so authenticated
+requests don't all hit `users`. Each uvicorn worker has its own copy; writes
+invalidate the local entry and other workers converge within USER_CACHE_TTL.
+"""
+import time
+from collections import OrderedDict
+
+from .config import USER_CACHE_TTL, USER_CACHE_MAX
+from . import metrics
+
+# everything routes read from the user; never the password hash
+PROFILE_FIELDS = {"name": 1, "email": 1, "age": 1, "sex": 1, "heightCm": 1, "weightKg": 1}
+
+
+class UserCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize, self.ttl = maxsize, ttl
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, uid: str) -> dict | None:
+        rec = self._data.get(uid) if self.enabled else None
+        if rec and time.monotonic() - rec[0] <= self.ttl:
+            self._data.move_to_end(uid)
+            self.hits += 1
+            return dict(rec[1])  # callers may mutate their copy
+        if rec:
+            self._data.pop(uid, None)
+        self.misses += 1
+        return None
+
+    def put(self, uid: str, doc: dict):
+        if not self.enabled:
+            return
+        self._data[uid] = (time.monotonic(), dict(doc))
+        self._data.move_to_end(uid)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, uid: str):
+        if self._data.pop(uid, None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"size": len(self._data), "maxsize": self.maxsize, "ttl_s": self.ttl,
+                "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions, "invalidations": self.invalidations}
+
+
+user_cache = UserCache(USER_CACHE_MAX, USER_CACHE_TTL)
+metrics.register("user_cache", user_cache.stats)
@@ -0,0 +1,231 @@
+# backend/app/writebehind.py
+"""
+Write-behind buffer for /activity/log/upsert.
+
+Increments for the same (userId, dateISO, type) are merged in memory and
+written with one bulk_write per flush: after ACTIVITY_BUFFER_MS, or as soon as
+ACTIVITY_BUFFER_MAX keys are pending, or on shutdown. ACTIVITY_BUFFER picks
+the trade-off:
+
+  off    every request does its own update_one (default)
+  sync   the request waits for the flush that carries it: concurrent pings
+         share one bulk_write and nothing is acknowledged before it is stored
+  async  the request returns at once; a crash can lose up to one window
+
+Day reads overlay what is still pending (overlay_day), including batches
+whose flush has started but whose rollup bump has not landed yet; read_day
+keeps a bump that lands during its read from being counted twice or not at
+all. Range reads call flush_user first.
+"""
+import asyncio, time
+from datetime import datetime
+from pymongo import UpdateOne
+
+from .db import activity
+from .bulk import write_unordered
+from .config import ACTIVITY_BUFFER, ACTIVITY_BUFFER_MS, ACTIVITY_BUFFER_MAX
+from . import rollups, metrics
+
+MODES = ("off", "sync", "async")
+
+
+class ActivityBuffer:
+    def __init__(self, mode: str, window_ms: float, max_keys: int):
+        if mode not in MODES:
+            raise ValueError(f"ACTIVITY_BUFFER must be one of {MODES}, got {mode!r}")
+        self.mode, self.window, self.max_keys = mode, window_ms / 1000.0, max_keys
+        # key -> {"minutes", "steps", "waiters": [Future]}
+        self.pending: dict[tuple[str, str, str], dict] = {}
+        # batches taken out of `pending` by a flush that has not finished bumping
+        # rollups, each with a future set when that flush ends
+        self.inflight: list[tuple[dict[tuple[str, str, str], dict], asyncio.Future]] = []
+        self._timer: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._sleeping = False
+        self.bumps_started = 0   # rollup bumps issued so far; read_day retries when one starts mid-read
+        self.adds = self.flushes = self.ops = self.failed = self.rollup_failed = 0
+        self.flush_ms_total = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    async def add(self, user_id: str, dateISO: str, act_type: str, minutes: int, steps: int | None):
+        key = (user_id, dateISO, act_type)
+        entry = self.pending.setdefault(key, {"minutes": 0, "steps": 0, "waiters": []})
+        entry["minutes"] += minutes
+        entry["steps"] += steps or 0
+        self.adds += 1
+        fut = None
+        if self.mode == "sync":
+            fut = asyncio.get_running_loop().create_future()
+            entry["waiters"].append(fut)
+
+        if len(self.pending) >= self.max_keys:
+            self._spawn(self.flush())
+        elif self._timer is None or self._timer.done():
+            self._start_timer()
+        if fut is not None:
+            await fut
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print("[writebehind] flush FAILED:", repr(task.exception()))
+
+    def _start_timer(self):
+        # set before the task first runs, so close() can also cancel a timer that has not started
+        self._sleeping = True
+        self._timer = self._spawn(self._flush_later())
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.window)
+        finally:
+            self._sleeping = False
+        await self.flush()
+
+    async def flush(self, keys: list | None = None):
+        """Write pending increments (all, or only `keys`) with one bulk_write."""
+        if keys is None:
+            batch, self.pending = self.pending, {}
+        else:
+            batch = {k: self.pending.pop(k) for k in keys if k in self.pending}
+        if not batch:
+            return
+        done = asyncio.get_running_loop().create_future()
+        self.inflight.append((batch, done))
+        t0 = time.perf_counter()
+        items = list(batch.items())
+        failed: set[int] = set(range(len(items)))
+        error: BaseException = RuntimeError("activity write failed")
+        try:
+            now = datetime.utcnow().isoformat()
+            ops = [UpdateOne({"userId": u, "dateISO": d, "type": t},
+                             {"$inc": {"minutes": e["minutes"], "steps": e["steps"]},
+                              "$setOnInsert": {"createdAt": now}},
+                             upsert=True)
+                   for (u, d, t), e in items]
+            try:
+                failed, upserted = await write_unordered(activity, ops)
+            except Exception as e:
+                upserted, error = {}, e
+
+            incs: dict[str, dict[str, dict]] = {}
+            for n, ((u, d, t), e) in enumerate(items):
+                if n in failed:
+                    self.failed += 1
+                    del batch[(u, d, t)]
+                    if self.mode == "async":
+                        # nobody is waiting on it: keep it for the next flush
+                        back = self.pending.setdefault((u, d, t), {"minutes": 0, "steps": 0, "waiters": []})
+                        back["minutes"] += e["minutes"]
+                        back["steps"] += e["steps"]
+                    continue
+                rollups.merge_inc(incs.setdefault(u, {}).setdefault(d, {}),
+                                  rollups.activity_inc(t, e["minutes"], e["steps"], new_doc=n in upserted))
+            for u, by_day in incs.items():
+                self.bumps_started += 1
+                try:
+                    await rollups.bump_many(u, by_day)
+                except Exception as e:
+                    # the logs are stored; `python -m app.rollups` repairs the totals
+                    self.rollup_failed += 1
+                    print(f"[writebehind] rollup bump FAILED for {u}: {e!r}")
+                # the rollup now holds this user's increments: stop overlaying them
+                for k in [k for k in batch if k[0] == u]:
+                    del batch[k]
+            self.flushes += 1
+            self.ops += len(ops)
+            self.flush_ms_total += 1000 * (time.perf_counter() - t0)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.inflight = [(b, f) for b, f in self.inflight if b is not batch]
+            done.set_result(None)
+            for n, ((u, d, t), e) in enumerate(items):
+                for fut in e["waiters"]:
+                    if fut.done():
+                        continue
+                    if n in failed:
+                        fut.set_exception(error)
+                    else:
+                        fut.set_result(None)
+            if self.pending and (self._timer is None or self._timer.done()):
+                self._start_timer()
+
+    async def flush_user(self, user_id: str):
+        """Returns once everything this user logged so far is in the rollups."""
+        running = [f for b, f in self.inflight if any(k[0] == user_id for k in b)]
+        keys = [k for k in self.pending if k[0] == user_id]
+        if keys:
+            await self.flush(keys)
+        if running:
+            await asyncio.gather(*running)
+
+    async def close(self):
+        # a timer still waiting is replaced by this flush; running flushes are let finish
+        if self._timer is not None and not self._timer.done() and self._sleeping:
+            self._timer.cancel()
+        await self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _unflushed(self):
+        yield from self.pending.items()
+        for batch, _ in self.inflight:
+            yield from list(batch.items())
+
+    def has_pending(self, user_id: str, dateISO: str) -> bool:
+        return any(u == user_id and d == dateISO for (u, d, _), _e in self._unflushed())
+
+    def overlay_day(self, user_id: str, dateISO: str, day: dict) -> dict:
+        """Add still-unflushed increments to a rollup day (as returned by rollups.read_day)."""
+        a = day["activity"]
+        for (u, d, t), e in self._unflushed():
+            if u != user_id or d != dateISO:
+                continue
+            bt = a["by_type"].setdefault(rollups.type_key(t), {"count": 0, "minutes": 0, "steps": 0})
+            if not bt.get("count"):
+                # no stored doc for this type yet, the flush will create one
+                bt["count"] = 1
+                a["count"] += 1
+            bt["minutes"] = bt.get("minutes", 0) + e["minutes"]
+            bt["steps"] = bt.get("steps", 0) + e["steps"]
+            a["minutes"] += e["minutes"]
+            a["steps"] += e["steps"]
+        return day
+
+    async def read_day(self, user_id: str, dateISO: str) -> dict:
+        """
+        The rollup day plus unflushed increments, each counted once. Flushes
+        already bumping this day are awaited first; if another bump starts
+        while the rollup is being read, the read may or may not include it
+        while its entries are still overlaid, so the day is read again.
+        """
+        while True:
+            running = [f for b, f in self.inflight if any(k[0] == user_id and k[1] == dateISO for k in b)]
+            if running:
+                await asyncio.gather(*running)
+            started = self.bumps_started
+            day = await rollups.read_day(user_id, dateISO)
+            if self.bumps_started == started:
+                return self.overlay_day(user_id, dateISO, day)
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "window_ms": round(1000 * self.window), "max_keys": self.max_keys,
+                "pending_keys": len(self.pending), "inflight_batches": len(self.inflight), "adds": self.adds, "flushes": self.flushes,
+                "ops_written": self.ops, "ops_failed": self.failed, "rollup_failed": self.rollup_failed,
+                "coalesce_ratio": round(self.adds / self.ops, 3) if self.ops else 0.0,
+                "flush_avg_ms": round(self.flush_ms_total / self.flushes, 3) if self.flushes else 0.0}
+
+
+activity_buffer = ActivityBuffer(ACTIVITY_BUFFER, ACTIVITY_BUFFER_MS, ACTIVITY_BUFFER_MAX)
+metrics.register("activity_buffer", activity_buffer.stats)
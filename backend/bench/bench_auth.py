@@ -0,0 +1,64 @@
+# backend/bench/bench_auth.py
+"""
+Authenticated request throughput with the user cache off vs. on.
+
+Registers a throwaway user against the app in-process (httpx ASGI transport,
+real MongoDB at MONGO_URI), then drives GET /users/me with N concurrent
+clients. The user is deleted afterwards.
+
+    python bench/bench_auth.py --requests 2000 --concurrency 20
+"""
+import argparse, asyncio, json, sys, time, uuid
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.main import app  # noqa: E402
+from app.db import users  # noqa: E402
+from app.usercache import user_cache  # noqa: E402
+
+
+async def drive(client, headers, n, conc):
+    lat = []
+    async def worker(k):
+        for _ in range(k):
+            t0 = time.perf_counter()
+            r = await client.get("/users/me", headers=headers)
+            r.raise_for_status()
+            lat.append(time.perf_counter() - t0)
+    per, extra = divmod(n, conc)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(per + (i < extra)) for i in range(conc)))
+    wall = time.perf_counter() - t0
+    lat.sort()
+    return {"rps": round(n / wall, 1), "p50_ms": round(lat[len(lat) // 2] * 1000, 3),
+            "p99_ms": round(lat[int(0.99 * (len(lat) - 1))] * 1000, 3)}
+
+
+async def main(n, conc):
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        r = await client.post("/auth/register", json={"name": "Bench", "email": email, "password": "benchpass123",
+                                                      "age": 30, "heightCm": 175, "weightKg": 70})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['token']}"}
+        try:
+            ttl = user_cache.ttl
+            user_cache.ttl = 0
+            before = await drive(client, headers, n, conc)
+            user_cache.ttl = ttl or 60
+            after = await drive(client, headers, n, conc)
+            print(json.dumps({"requests": n, "concurrency": conc, "no_cache": before,
+                              "cache": after, "cache_stats": user_cache.stats()}, indent=2))
+        finally:
+            await users.delete_one({"email": email})
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=20)
+    args = ap.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,96 @@
+# backend/bench/bench_login_storm.py
+"""
+Latency of an unrelated endpoint while a burst of logins is in flight, with
+bcrypt run inline on the event loop vs. in the hashing pool.
+
+Starts the app with uvicorn in a subprocess per mode (HASH_WORKERS=0 is the
+old inline behaviour), registers a user, then fires --logins concurrent
+logins while probing GET /coach/workouts. Needs MongoDB at MONGO_URI.
+
+    python bench/bench_login_storm.py --logins 200 --port 8765
+"""
+import argparse, asyncio, json, os, subprocess, sys, time, uuid
+from pathlib import Path
+
+import httpx
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+def pct(xs, q):
+    xs = sorted(xs)
+    return round(xs[int(q * (len(xs) - 1))] * 1000, 2) if xs else None
+
+
+async def storm(base: str, logins: int, probe_interval: float):
+    email = f"storm-{uuid.uuid4().hex[:8]}@example.com"
+    creds = {"email": email, "password": "stormpass123"}
+    async with httpx.AsyncClient(base_url=base, timeout=60) as c:
+        (await c.post("/auth/register", json={"name": "Storm", **creds})).raise_for_status()
+
+        async def probe_for(seconds):
+            lat, end = [], time.perf_counter() + seconds
+            while time.perf_counter() < end:
+                t0 = time.perf_counter()
+                (await c.get("/coach/workouts")).raise_for_status()
+                lat.append(time.perf_counter() - t0)
+                await asyncio.sleep(probe_interval)
+            return lat
+
+        idle = await probe_for(1.0)
+        done = asyncio.Event()
+        statuses: list[int] = []
+
+        async def login():
+            statuses.append((await c.post("/auth/login", json=creds)).status_code)
+
+        async def probe_during():
+            lat = []
+            while not done.is_set():
+                t0 = time.perf_counter()
+                (await c.get("/coach/workouts")).raise_for_status()
+                lat.append(time.perf_counter() - t0)
+                await asyncio.sleep(probe_interval)
+            return lat
+
+        probe_task = asyncio.create_task(probe_during())
+        t0 = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        storm_s = time.perf_counter() - t0
+        done.set()
+        busy = await probe_task
+    return {
+        "probe_idle": {"p50_ms": pct(idle, .5), "p99_ms": pct(idle, .99)},
+        "probe_during_storm": {"n": len(busy), "p50_ms": pct(busy, .5), "p99_ms": pct(busy, .99)},
+        "logins": {"n": logins, "seconds": round(storm_s, 2),
+                   "ok": statuses.count(200), "rejected_503": statuses.count(503)},
+    }
+
+
+def run_mode(workers: int, port: int, logins: int):
+    env = {**os.environ, "HASH_WORKERS": str(workers)}
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                             "--log-level", "warning"], cwd=BACKEND, env=env)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"{base}/health", timeout=0.5)
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        return asyncio.run(storm(base, logins, probe_interval=0.01))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--logins", type=int, default=200)
+    ap.add_argument("--workers", type=int, default=4, help="HASH_WORKERS for the pooled run")
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args()
+    report = {"inline": run_mode(0, args.port, args.logins),
+              "pooled": run_mode(args.workers, args.port, args.logins)}
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,119 @@
+# backend/bench/bench_reco.py
+"""
+Coach scoring for N user-days: reco.plan + reco.adherence_score called per
+row (as routes_coach does) vs. one columnar pass through app/reco_batch.py.
+
+Random but realistic profiles and day totals are generated in memory (no
+database). Every row is first checked for parity: plan numbers, score and
+message list must equal the scalar result exactly; the run stops at the first
+mismatch. tests/test_reco_batch.py runs the same check (make_rows, check) on
+every test run.
+
+    python bench/bench_reco.py --rows 200000
+    python bench/bench_reco.py --rows 20000 --check-only
+"""
+import argparse, sys, time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app import reco, reco_batch  # noqa: E402
+
+
+def make_rows(n: int, seed: int = 7) -> dict:
+    rng = np.random.default_rng(seed)
+    sexes = np.array(["male", "female", "other", None], dtype=object)
+    goals = np.array(["maintain", "lose", "gain", None], dtype=object)
+    age = rng.integers(18, 85, n).astype(float)
+    age[rng.random(n) < 0.02] = np.nan          # incomplete profiles
+    kcal = rng.normal(2100, 600, n).clip(0)
+    return {
+        "sex_s": sexes[rng.integers(0, 4, n)], "goal_s": goals[rng.integers(0, 4, n)],
+        "age": age,
+        "height_cm": rng.normal(170, 10, n).round(1),
+        "weight_kg": rng.normal(75, 15, n).clip(40).round(1),
+        "minutes": rng.integers(0, 120, n),
+        "kcal": kcal.round(1),
+        "carb_g": (kcal * rng.uniform(0.3, 0.6, n) / 4).round(1),
+        "protein_g": (kcal * rng.uniform(0.1, 0.35, n) / 4).round(1),
+        "fat_g": (kcal * rng.uniform(0.2, 0.4, n) / 9).round(1),
+        "sugar_g": rng.uniform(0, 120, n).round(1),
+        "fiber_g": rng.uniform(0, 45, n).round(1),
+    }
+
+
+def scalar(rows: dict, i: int):
+    age = rows["age"][i]
+    user = {"age": None if np.isnan(age) else float(age), "heightCm": float(rows["height_cm"][i]),
+            "weightKg": float(rows["weight_kg"][i]), "sex": rows["sex_s"][i]}
+    mins = int(rows["minutes"][i])
+    try:
+        p = reco.plan(user, reco.activity_level_from_minutes(mins), rows["goal_s"][i])
+    except ValueError:
+        return None
+    totals = {k: float(rows[k][i]) for k in ("kcal", "carb_g", "protein_g", "fat_g", "sugar_g", "fiber_g")}
+    score, msgs = reco.adherence_score(p["macros"], totals, mins)
+    return p, score, msgs
+
+
+def columns(rows: dict) -> dict:
+    cols = {k: v for k, v in rows.items() if not k.endswith("_s")}
+    cols["sex"] = reco_batch.sex_codes(rows["sex_s"])
+    cols["goal"] = reco_batch.goal_codes(rows["goal_s"])
+    return cols
+
+
+def check(rows: dict, out: dict) -> int:
+    for i in range(len(rows["age"])):
+        want = scalar(rows, i)
+        if want is None:
+            assert not out["ok"][i] and out["score"][i] == -1, f"row {i}: should be incomplete"
+            continue
+        p, score, msgs = want
+        got = (int(out["bmr"][i]), int(out["tdee"][i]), {k: int(out[f"{k}_target"][i])
+                                                         for k in ("kcal", "carb_g", "protein_g", "fat_g")})
+        assert got == (p["bmr"], p["tdee"], p["macros"]), f"row {i}: plan {got} != {p}"
+        assert int(out["score"][i]) == score, f"row {i}: score {out['score'][i]} != {score}"
+        assert reco_batch.messages(out, i) == msgs, f"row {i}: messages differ"
+    return len(rows["age"])
+
+
+def main(n: int, check_only: bool):
+    rows = make_rows(n)
+    cols = columns(rows)
+    out = reco_batch.score_days(cols)
+    t0 = time.perf_counter()
+    checked = check(rows, out)
+    print(f"parity OK on {checked} rows ({time.perf_counter() - t0:.2f}s)")
+    if check_only:
+        return
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        scalar(rows, i)
+    t_scalar = time.perf_counter() - t0
+
+    reps = 5
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        reco_batch.score_days(cols)
+    t_batch = (time.perf_counter() - t0) / reps
+
+    t0 = time.perf_counter()
+    columns(rows)
+    t_codes = time.perf_counter() - t0
+
+    print(f"{'':<22}{'seconds':>10}{'rows/s':>14}")
+    print(f"{'scalar reco':<22}{t_scalar:>10.3f}{n / t_scalar:>14,.0f}")
+    print(f"{'reco_batch':<22}{t_batch:>10.3f}{n / t_batch:>14,.0f}")
+    print(f"{'  + string->codes':<22}{t_codes:>10.3f}")
+    print(f"speedup x{t_scalar / t_batch:.0f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--check-only", action="store_true", help="parity check, no timings")
+    args = ap.parse_args()
+    main(args.rows, args.check_only)
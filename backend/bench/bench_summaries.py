@@ -0,0 +1,129 @@
+# backend/bench/bench_summaries.py
+"""
+Payload size and latency of per-day summaries: raw documents summed in Python
+(the old route code) vs. aggregation pipelines vs. the single per-day meal
+document with running totals (app/mealdays.py).
+
+Runs against MONGO_URI in a scratch database that is dropped afterwards.
+
+    python bench/bench_summaries.py --items 300 --docs 30 --reps 50
+"""
+import argparse, asyncio, json, statistics, sys, time
+from pathlib import Path
+
+import bson
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.config import MONGO_URI  # noqa: E402
+from app.aggregates import NUTRIENTS, activity_day_pipeline  # noqa: E402
+from app.mealdays import merge_docs  # noqa: E402
+
+UID, DAY = "bench-user", "2024-01-15"
+
+
+async def seed(db, n_docs: int, n_items: int):
+    per_doc = max(1, n_items // n_docs)
+    item = {"name": "Oats, rolled", "grams": 40, "kcal": 150.0, "protein_g": 5.0, "carb_g": 27.0,
+            "fat_g": 3.0, "fiber_g": 4.0, "sugar_g": 1.0, "sodium_mg": 2.0, "fdcId": 173904}
+    await db.meal_logs.insert_many([
+        {"userId": UID, "dateISO": DAY, "items": [dict(item) for _ in range(per_doc)],
+         "totalCalories": 150.0 * per_doc, "notes": None, "createdAt": "2024-01-15T08:00:00"}
+        for _ in range(n_docs)
+    ])
+    await db.activity_logs.insert_many([
+        {"userId": UID, "dateISO": DAY, "minutes": 5, "steps": 500, "type": t, "createdAt": "2024-01-15T08:00:00"}
+        for t in ["walk", "run", "cycle_easy", "yoga"] * max(1, n_items // 4)
+    ])
+    await db.meal_logs.create_index([("userId", 1), ("dateISO", -1)])
+    await db.activity_logs.create_index([("userId", 1), ("dateISO", -1)])
+    # the same day as one merged document, in its own collection
+    docs = [d async for d in db.meal_logs.find({"userId": UID, "dateISO": DAY}).sort("_id", 1)]
+    await db.meal_days.insert_one(merge_docs(docs))
+    await db.meal_days.create_index([("userId", 1), ("dateISO", -1)], unique=True)
+
+
+def meal_day_pipeline(user_id: str, dateISO: str) -> list[dict]:
+    """Per-save layout: sum every document's items inside MongoDB."""
+    group = {"_id": None, "docs": {"$addToSet": "$_id"}}
+    project = {"_id": 0, "count": {"$size": "$docs"}}
+    for k in NUTRIENTS:
+        group[k] = {"$sum": f"$items.{k}"}
+        project[k] = 1
+    return [
+        {"$match": {"userId": user_id, "dateISO": dateISO}},
+        {"$project": {"items": {"$ifNull": ["$items", []]}}},
+        {"$unwind": {"path": "$items", "preserveNullAndEmptyArrays": True}},
+        {"$group": group},
+        {"$project": project},
+    ]
+
+
+async def legacy_meals(db):
+    totals, nbytes = {k: 0 for k in NUTRIENTS}, 0
+    async for doc in db.meal_logs.find({"userId": UID, "dateISO": DAY}):
+        nbytes += len(bson.encode(doc))
+        for it in (doc.get("items") or []):
+            for k in totals:
+                v = it.get(k)
+                if isinstance(v, (int, float)): totals[k] += v
+    return totals, nbytes
+
+
+async def pipeline_meals(db):
+    rows = [r async for r in db.meal_logs.aggregate(meal_day_pipeline(UID, DAY))]
+    return rows, sum(len(bson.encode(r)) for r in rows)
+
+
+async def daydoc_meals(db):
+    doc = await db.meal_days.find_one({"userId": UID, "dateISO": DAY}, {"_id": 0, "count": 1, "totals": 1})
+    return doc, len(bson.encode(doc))
+
+
+async def legacy_activity(db):
+    nbytes, mins = 0, 0
+    async for doc in db.activity_logs.find({"userId": UID, "dateISO": DAY}):
+        nbytes += len(bson.encode(doc))
+        mins += int(doc.get("minutes") or 0)
+    return mins, nbytes
+
+
+async def pipeline_activity(db):
+    rows = [r async for r in db.activity_logs.aggregate(activity_day_pipeline(UID, DAY))]
+    return rows, sum(len(bson.encode(r)) for r in rows)
+
+
+async def timed(fn, db, reps):
+    lat, nbytes = [], 0
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        _, nbytes = await fn(db)
+        lat.append((time.perf_counter() - t0) * 1000)
+    lat.sort()
+    return {"bytes": nbytes, "p50_ms": round(statistics.median(lat), 3),
+            "p95_ms": round(lat[int(0.95 * (len(lat) - 1))], 3)}
+
+
+async def main(items: int, docs: int, reps: int):
+    client = AsyncIOMotorClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    db = client["predictmedi_bench"]
+    await client.drop_database(db.name)
+    try:
+        await seed(db, docs, items)
+        report = {"items_per_day": items, "meal_docs": docs, "reps": reps}
+        for name, fn in [("meals_legacy", legacy_meals), ("meals_pipeline", pipeline_meals),
+                         ("meals_daydoc", daydoc_meals),
+                         ("activity_legacy", legacy_activity), ("activity_pipeline", pipeline_activity)]:
+            report[name] = await timed(fn, db, reps)
+        print(json.dumps(report, indent=2))
+    finally:
+        await client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=300, help="meal items (and activity entries) per day")
+    ap.add_argument("--docs", type=int, default=30, help="meal documents the items are spread over")
+    ap.add_argument("--reps", type=int, default=50)
+    args = ap.parse_args()
+    asyncio.run(main(args.items, args.docs, args.reps))
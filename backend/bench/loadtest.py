@@ -0,0 +1,452 @@
+# backend/bench/loadtest.py
+"""
+Full-stack load test: the gateway (app.main) with its dependencies stood up
+locally, driven by simulated user sessions at increasing concurrency.
+
+Processes started (all on 127.0.0.1, stopped on exit):
+
+  gateway   uvicorn app.main:app; MongoDB at --mongo URI, or "memory" for an
+            in-process mongomock-motor stand-in (pip install mongomock-motor)
+  fdc       stub FoodData Central (/foods/search, /food/{id}, POST /foods)
+            over a generated catalogue, with --fdc-latency-ms per call
+  ml        the real ml_diabetes / ml_heart services (their requirements
+            must be installed), or --ml stub for fixed answers
+
+Each virtual user logs in, then loops through what the app does: dashboard,
+food autocomplete and search, food detail, portion, meal log, activity
+upsert, conditional meal summary (If-None-Match), coach score, and every
+--risk-every rounds the diabetes and heart checks; it logs in again every
+--rounds rounds. Users are closed-loop (next request when the last answers),
+so concurrency is the number of users.
+
+For each --levels step the report has per-endpoint n, error rate, p50/p95/p99
+and max, overall throughput, the client's own CPU share (near 1.0 means the
+load generator, not the gateway, is the limit) and the gateway's /metrics.
+"saturation" names the first level where throughput stopped growing by
+SAT_GAIN, p95 passed SAT_P95 x the first level's, or errors passed SAT_ERRORS.
+
+    python bench/loadtest.py --levels 1,4,16,64 --duration 20 --out load.json
+    python bench/loadtest.py --mongo mongodb://127.0.0.1:27017/loadtest --ml stub
+
+Against a real mongod, use a throwaway server: the app writes to its
+"predictmedi" database whatever the URI says. The memory stand-in keeps
+everything in the gateway process, so it measures the app, not MongoDB.
+"""
+import argparse, asyncio, json, os, random, subprocess, sys, time, uuid
+from datetime import date
+from pathlib import Path
+
+import httpx
+
+BACKEND = Path(__file__).resolve().parents[1]
+SEED_FOODS = BACKEND / "seeds" / "fdc_sample.json"
+
+SAT_GAIN = 0.10      # throughput must grow by this much per level
+SAT_P95 = 3.0        # x the first level's overall p95
+SAT_ERRORS = 0.01
+
+DIABETES_SCREEN = {"HighBP": 0, "HighChol": 0, "CholCheck": 1, "BMI": 28, "Smoker": 0, "Stroke": 0,
+                   "HeartDiseaseorAttack": 0, "PhysActivity": 1, "Fruits": 1, "Veggies": 1,
+                   "HvyAlcoholConsump": 0, "AnyHealthcare": 1, "NoDocbcCost": 0, "GenHlth": 3,
+                   "MentHlth": 0, "PhysHlth": 0, "DiffWalk": 0, "Sex": 0, "Age": 6, "Education": 5, "Income": 6}
+HEART = {"age": 52, "sex": 1, "cp": 2, "trestbps": 130, "chol": 220, "fbs": 0, "restecg": 0,
+         "thalach": 160, "exang": 0, "oldpeak": 1.0, "slope": 1, "ca": 0, "thal": 2}
+
+
+def pct(xs, q):
+    xs = sorted(xs)
+    return round(xs[int(q * (len(xs) - 1))] * 1000, 2) if xs else None
+
+
+# ---------- stand-ins (run as child processes via --role) ----------
+
+_DATA_TYPES = {"FoundationFoods": "Foundation", "SRLegacyFoods": "SR Legacy", "SurveyFoods": "Survey (FNDDS)"}
+_STYLES = ("raw", "cooked", "boiled", "baked", "grilled", "roasted", "steamed", "canned", "frozen", "dried",
+           "fried", "smoked", "mashed", "sliced", "organic", "low fat", "unsalted", "homemade")
+
+
+def catalogue(n: int, seed: int = 11) -> list[dict]:
+    """n FDC food records, variations on the seed sample (same layout, nutrients scaled)."""
+    sample = json.loads(SEED_FOODS.read_text())
+    bases = [(f, _DATA_TYPES[k]) for k, v in sample.items() if k in _DATA_TYPES for f in v]
+    rng = random.Random(seed)
+    foods = []
+    for i in range(n):
+        base, dtype = bases[i % len(bases)]
+        scale = rng.uniform(0.7, 1.3)
+        styles = rng.sample(_STYLES, 2)
+        foods.append({
+            "fdcId": 9_000_000 + i,
+            "description": f"{base['description']}, {styles[0]}, {styles[1]}",
+            "dataType": dtype,
+            "foodNutrients": [{**n, "amount": round(n["amount"] * scale, 2)} for n in base["foodNutrients"]],
+        })
+    return foods
+
+
+def fdc_stub(foods: list[dict], latency_ms: float):
+    from fastapi import FastAPI, Body, HTTPException, Response
+
+    app = FastAPI()
+    by_id = {f["fdcId"]: f for f in foods}
+    lowered = [(f["description"].lower(), f) for f in foods]
+    headers = {"X-RateLimit-Limit": "1000000", "X-RateLimit-Remaining": "999999"}
+
+    async def wait():
+        if latency_ms:
+            await asyncio.sleep(random.uniform(0.5, 1.5) * latency_ms / 1000)
+
+    @app.get("/health")
+    def health():
+        return {"ok": True, "foods": len(foods)}
+
+    @app.get("/foods/search")
+    async def search(response: Response, query: str = "", pageSize: int = 50):
+        await wait()
+        words = query.lower().split()
+        hits = [f for d, f in lowered if all(w in d for w in words)]
+        response.headers.update(headers)
+        return {"totalHits": len(hits), "foods": [{k: f[k] for k in ("fdcId", "description", "dataType")}
+                                                  for f in hits[:pageSize]]}
+
+    @app.get("/food/{fdc_id}")
+    async def food(fdc_id: int, response: Response):
+        await wait()
+        if fdc_id not in by_id:
+            raise HTTPException(404)
+        response.headers.update(headers)
+        return by_id[fdc_id]
+
+    @app.post("/foods")
+    async def foods_batch(response: Response, body: dict = Body(...)):
+        await wait()
+        response.headers.update(headers)
+        return [by_id[i] for i in body.get("fdcIds", []) if i in by_id]
+
+    return app
+
+
+def ml_stub(latency_ms: float):
+    from fastapi import FastAPI, Body
+
+    app = FastAPI()
+
+    async def answer(mode: str | None = None):
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        out = {"probability": 0.12, "label": 0}
+        return {**out, "mode": mode, "risk": {"label": "Low chance", "range": [0.1, 0.25], "advice": ""}} \
+            if mode else {**out, "top_factors": [], "expected_log_odds": -2.0}
+
+    @app.get("/health")
+    def health():
+        return {"ok": True}
+
+    @app.post("/predict_screen")
+    async def screen(payload: dict = Body(...)):
+        return await answer("screen")
+
+    @app.post("/predict_labs")
+    async def labs(payload: dict = Body(...)):
+        return await answer("labs")
+
+    @app.post("/predict")
+    async def heart(payload: dict = Body(...)):
+        return await answer()
+
+    return app
+
+
+def gateway(mongo: str):
+    sys.path.insert(0, str(BACKEND))
+    if mongo == "memory":
+        try:
+            import mongomock_motor
+        except ImportError:
+            raise SystemExit("--mongo memory needs mongomock-motor (pip install mongomock-motor)")
+        import mongomock.collection as mc
+        import app.db as db
+        # pymongo >= 4.11 passes sort= to the bulk builders; mongomock's don't take it
+        for name in ("add_update", "add_replace"):
+            fn = getattr(mc.BulkOperationBuilder, name, None)
+            if fn is not None:
+                setattr(mc.BulkOperationBuilder, name,
+                        lambda self, *a, _fn=fn, **kw: _fn(self, *a, **{k: v for k, v in kw.items() if k != "sort"}))
+        client = mongomock_motor.AsyncMongoMockClient()
+        db._client, db._db = client, client["predictmedi"]
+        for attr in ("users", "activity", "meals", "rollups", "digests", "jobs"):
+            setattr(db, attr, db._db[getattr(db, attr).name])
+    from app.main import app
+    return app
+
+
+def serve(args):
+    import uvicorn
+    if args.role == "fdc":
+        app = fdc_stub(catalogue(args.foods), args.fdc_latency_ms)
+    elif args.role == "ml":
+        app = ml_stub(args.ml_latency_ms)
+    else:
+        app = gateway(args.mongo)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+# ---------- process management ----------
+
+def _spawn(cmd: list[str], cwd: Path, env: dict | None = None) -> subprocess.Popen:
+    return subprocess.Popen(cmd, cwd=cwd, env={**os.environ, **(env or {})})
+
+
+def _wait_up(url: str, proc: subprocess.Popen, seconds: float = 60):
+    end = time.time() + seconds
+    while time.time() < end:
+        if proc.poll() is not None:
+            raise SystemExit(f"{url}: process exited with {proc.returncode}")
+        try:
+            httpx.get(url, timeout=0.5)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise SystemExit(f"{url}: not up after {seconds}s")
+
+
+def start_stack(args) -> tuple[list[subprocess.Popen], str]:
+    me = [sys.executable, str(Path(__file__).resolve())]
+    p = args.port
+    procs, urls = [], {}
+
+    def up(name, cmd, port, cwd=BACKEND, env=None):
+        proc = _spawn(cmd + ["--port", str(port)], cwd, env)
+        procs.append(proc)
+        _wait_up(f"http://127.0.0.1:{port}/health", proc)
+        urls[name] = f"http://127.0.0.1:{port}"
+
+    try:
+        up("fdc", me + ["--role", "fdc", "--foods", str(args.foods), "--fdc-latency-ms", str(args.fdc_latency_ms)], p + 1)
+        if args.ml == "stub":
+            up("diabetes", me + ["--role", "ml", "--ml-latency-ms", str(args.ml_latency_ms)], p + 2)
+            urls["heart"] = urls["diabetes"]
+        else:
+            uv = [sys.executable, "-m", "uvicorn", "app:app", "--log-level", "warning"]
+            up("diabetes", uv, p + 2, cwd=BACKEND / "ml_diabetes")
+            up("heart", uv, p + 3, cwd=BACKEND / "ml_heart")
+        env = {
+            "FDC_BASE": urls["fdc"], "FDC_API_KEY": "loadtest", "FDC_HOURLY_QUOTA": "1000000",
+            "FDC_LOCAL_INDEX": "",   # every food lookup goes through the cache to the stub
+            "DIABETES_API_URL": urls["diabetes"], "HEART_API_URL": urls["heart"],
+        }
+        if args.mongo != "memory":
+            env["MONGO_URI"] = args.mongo
+        env.update(kv.split("=", 1) for kv in args.env)
+        up("gateway", me + ["--role", "gateway", "--mongo", args.mongo], p, env=env)
+    except BaseException:
+        stop_stack(procs)
+        raise
+    return procs, urls["gateway"]
+
+
+def stop_stack(procs: list[subprocess.Popen]):
+    for proc in reversed(procs):
+        proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# ---------- sessions ----------
+
+class Recorder:
+    def __init__(self):
+        self.lat: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.codes: dict[str, dict[int, int]] = {}
+        self.active = False
+
+    async def call(self, c: httpx.AsyncClient, label: str, method: str, url: str, **kw) -> httpx.Response | None:
+        t0 = time.perf_counter()
+        try:
+            r = await c.request(method, url, **kw)
+            status = r.status_code
+        except httpx.HTTPError:
+            r, status = None, 0
+        if self.active:
+            self.lat.setdefault(label, []).append(time.perf_counter() - t0)
+            codes = self.codes.setdefault(label, {})
+            codes[status] = codes.get(status, 0) + 1
+            if status == 0 or status >= 400:
+                self.errors[label] = self.errors.get(label, 0) + 1
+        return r if r is not None and status < 400 else None
+
+    def report(self, seconds: float) -> dict:
+        endpoints, all_lat = {}, []
+        for label in sorted(self.lat):
+            xs, errs = self.lat[label], self.errors.get(label, 0)
+            all_lat += xs
+            endpoints[label] = {"n": len(xs), "errors": errs, "error_rate": round(errs / len(xs), 4),
+                                "p50_ms": pct(xs, .5), "p95_ms": pct(xs, .95), "p99_ms": pct(xs, .99),
+                                "max_ms": round(max(xs) * 1000, 2), "status": dict(sorted(self.codes[label].items()))}
+        n, errs = len(all_lat), sum(self.errors.values())
+        return {"requests": n, "throughput_rps": round(n / seconds, 1), "error_rate": round(errs / n, 4) if n else 0.0,
+                "p50_ms": pct(all_lat, .5), "p95_ms": pct(all_lat, .95), "p99_ms": pct(all_lat, .99),
+                "endpoints": endpoints}
+
+
+async def register(c: httpx.AsyncClient, run_id: str, i: int, rng: random.Random) -> dict:
+    creds = {"email": f"load-{run_id}-{i}@example.com", "password": "loadtest-pass"}
+    profile = {"name": f"Load {i}", "age": rng.randint(20, 70), "sex": rng.choice(["male", "female"]),
+               "heightCm": rng.randint(150, 195), "weightKg": rng.randint(50, 110)}
+    (await c.post("/auth/register", json={**creds, **profile})).raise_for_status()
+    return creds
+
+
+async def session(c: httpx.AsyncClient, rec: Recorder, creds: dict, words: list[str], ids: list[int],
+                  rounds: int, risk_every: int, deadline: float, rng: random.Random):
+    etag = None
+    n = 0
+    while time.perf_counter() < deadline:
+        r = await rec.call(c, "POST /auth/login", "POST", "/auth/login", json=creds)
+        if r is None:
+            continue
+        h = {"Authorization": f"Bearer {r.json()['token']}"}
+        for _ in range(rounds):
+            if time.perf_counter() >= deadline:
+                return
+            n += 1
+            today = date.today().isoformat()
+            await rec.call(c, "GET /dashboard/today", "GET", "/dashboard/today", headers=h)
+
+            # typing a food name: a few suggest keystrokes, then a search and a pick
+            word = rng.choice(words)
+            for k in range(2, min(len(word), 5) + 1):
+                await rec.call(c, "GET /nutrition/suggest", "GET", "/nutrition/suggest", params={"q": word[:k]})
+            r = await rec.call(c, "GET /nutrition/search", "GET", "/nutrition/search",
+                               params={"q": word, "pageSize": 10})
+            found = [it["fdcId"] for it in (r.json().get("items", []) if r is not None else [])]
+            fid = rng.choice(found) if found else rng.choice(ids)
+            await rec.call(c, "GET /nutrition/food/{id}", "GET", f"/nutrition/food/{fid}")
+            grams = rng.choice([50, 100, 150, 200])
+            items = [{"fdcId": fid, "grams": grams}, {"fdcId": rng.choice(ids), "grams": 100}]
+            await rec.call(c, "POST /nutrition/portion", "POST", "/nutrition/portion", json={"items": items})
+            await rec.call(c, "POST /meals/log", "POST", "/meals/log", headers=h, json={
+                "date": today, "items": [{"name": f"food {it['fdcId']}", **it} for it in items]})
+
+            await rec.call(c, "POST /activity/log/upsert", "POST", "/activity/log/upsert", headers=h, json={
+                "date": today, "type": rng.choice(["walk", "run", "cycle"]), "minutes": rng.randint(5, 30),
+                "steps": rng.randint(500, 4000)})
+
+            r = await rec.call(c, "GET /meals/summary", "GET", "/meals/summary",
+                               headers={**h, **({"If-None-Match": etag} if etag else {})})
+            if r is not None and r.status_code == 200:
+                etag = r.headers.get("etag")
+            await rec.call(c, "GET /coach/motivate", "GET", "/coach/motivate", headers=h)
+
+            if risk_every and n % risk_every == 0:
+                await rec.call(c, "POST /ml/diabetes/screen", "POST", "/ml/diabetes/screen",
+                               json={"features": DIABETES_SCREEN})
+                await rec.call(c, "POST /ml/heart/predict", "POST", "/ml/heart/predict",
+                               json={"features": HEART, "top_k": 5})
+
+
+async def run_level(base: str, users: list[dict], level: int, args, words, ids) -> dict:
+    rec = Recorder()
+    limits = httpx.Limits(max_connections=level + 8, max_keepalive_connections=level + 8)
+    async with httpx.AsyncClient(base_url=base, timeout=args.timeout, limits=limits) as c:
+        start = time.perf_counter()
+        deadline = start + args.warmup + args.duration
+        tasks = [asyncio.create_task(session(c, rec, users[i], words, ids, args.rounds, args.risk_every,
+                                             deadline, random.Random(i * 7919 + level)))
+                 for i in range(level)]
+        await asyncio.sleep(args.warmup)
+        rec.active = True
+        cpu0, t0 = time.process_time(), time.perf_counter()
+        await asyncio.gather(*tasks)
+        seconds = time.perf_counter() - t0
+        cpu = time.process_time() - cpu0
+        gw = (await c.get("/metrics")).json()
+    return {"concurrency": level, "seconds": round(seconds, 2), **rec.report(seconds),
+            "client_cpu": round(cpu / seconds, 3), "gateway_metrics": gw}
+
+
+def saturation(levels: list[dict]) -> dict:
+    out = {"throughput": None, "latency": None, "errors": None}
+    base_p95 = levels[0]["p95_ms"] if levels else None
+    for prev, cur in zip([None] + levels, levels):
+        if out["throughput"] is None and prev is not None and \
+                cur["throughput_rps"] < prev["throughput_rps"] * (1 + SAT_GAIN):
+            out["throughput"] = cur["concurrency"]
+        if out["latency"] is None and base_p95 and cur["p95_ms"] and cur["p95_ms"] > SAT_P95 * base_p95:
+            out["latency"] = cur["concurrency"]
+        if out["errors"] is None and cur["error_rate"] > SAT_ERRORS:
+            out["errors"] = cur["concurrency"]
+    best = max(levels, key=lambda lv: lv["throughput_rps"]) if levels else None
+    out["max_rps"] = best["throughput_rps"] if best else None
+    out["max_rps_at"] = best["concurrency"] if best else None
+    out["rules"] = {"gain": SAT_GAIN, "p95_x": SAT_P95, "error_rate": SAT_ERRORS}
+    return out
+
+
+async def drive(base: str, args) -> dict:
+    levels = [int(x) for x in args.levels.split(",")]
+    foods = catalogue(args.foods)
+    ids = [f["fdcId"] for f in foods]
+    words = sorted({w.strip(",").lower() for f in foods for w in f["description"].split() if len(w.strip(",")) >= 4})
+    run_id = uuid.uuid4().hex[:8]
+    rng = random.Random(1)
+    async with httpx.AsyncClient(base_url=base, timeout=60) as c:
+        sem = asyncio.Semaphore(16)
+
+        async def one(i):
+            async with sem:
+                return await register(c, run_id, i, rng)
+        users = await asyncio.gather(*(one(i) for i in range(max(levels))))
+
+    results = []
+    for level in levels:
+        res = await run_level(base, users, level, args, words, ids)
+        print(f"[load] c={level:<4} rps={res['throughput_rps']:<8} p50={res['p50_ms']}ms p95={res['p95_ms']}ms "
+              f"p99={res['p99_ms']}ms err={res['error_rate']} client_cpu={res['client_cpu']}", file=sys.stderr)
+        results.append(res)
+    return {"config": {"levels": levels, "duration_s": args.duration, "warmup_s": args.warmup, "mongo": args.mongo,
+                       "ml": args.ml, "foods": args.foods, "fdc_latency_ms": args.fdc_latency_ms,
+                       "rounds": args.rounds, "risk_every": args.risk_every, "env": args.env},
+            "levels": results, "saturation": saturation(results)}
+
+
+def main(args):
+    procs, base = start_stack(args)
+    try:
+        report = asyncio.run(drive(base, args))
+    finally:
+        stop_stack(procs)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text)
+        print(f"[load] report written to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Load test the gateway with local stand-ins.")
+    ap.add_argument("--levels", default="1,4,16,64", help="comma list of concurrent users")
+    ap.add_argument("--duration", type=float, default=20, help="measured seconds per level")
+    ap.add_argument("--warmup", type=float, default=3, help="unmeasured seconds before each level")
+    ap.add_argument("--mongo", default="memory", help='MongoDB URI, or "memory" for mongomock-motor')
+    ap.add_argument("--ml", choices=("real", "stub"), default="real")
+    ap.add_argument("--foods", type=int, default=5000, help="stub FDC catalogue size")
+    ap.add_argument("--fdc-latency-ms", type=float, default=80)
+    ap.add_argument("--ml-latency-ms", type=float, default=20, help="stub ML answer delay")
+    ap.add_argument("--rounds", type=int, default=5, help="rounds per login")
+    ap.add_argument("--risk-every", type=int, default=5, help="risk checks every N rounds (0 = never)")
+    ap.add_argument("--timeout", type=float, default=30)
+    ap.add_argument("--env", action="append", default=[], help="extra gateway env, KEY=VALUE (repeatable)")
+    ap.add_argument("--port", type=int, default=8900, help="gateway port; stand-ins use the next ones")
+    ap.add_argument("--out", help="write the JSON report here instead of stdout")
+    ap.add_argument("--role", choices=("gateway", "fdc", "ml"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.role:
+        serve(args)
+    else:
+        main(args)
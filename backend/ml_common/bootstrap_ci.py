@@ -0,0 +1,120 @@
+# ml_common/bootstrap_ci.py  (shared by the ml_diabetes and ml_heart training scripts)
+"""
+Vectorized bootstrap confidence intervals for binary classifier reports.
+
+All replicates are drawn at once as a (B, n) resample index matrix. Each
+replicate is reduced to per-score positive/negative counts over the sorted
+unique scores of the original sample, so AUC (rank based, ties counted as
+half) and the confusion matrix at any threshold come from cumulative sums
+instead of sklearn calls per replicate.
+"""
+import numpy as np
+
+SWEEP = [round(t, 2) for t in np.arange(0.05, 0.951, 0.05)]
+# cap on resample matrix elements per chunk (keeps BRFSS-sized splits in memory)
+_CHUNK_ELEMS = 4_000_000
+
+
+def _counts(keys, weights_pos, n_unique):
+    """Per-row histogram of unique-score ids -> (pos, tot) arrays of shape (rows, K)."""
+    rows = keys.shape[0]
+    flat = (keys + (np.arange(rows)[:, None] * n_unique)).ravel()
+    size = rows * n_unique
+    tot = np.bincount(flat, minlength=size).reshape(rows, n_unique)
+    pos = np.bincount(flat, weights=weights_pos.ravel(), minlength=size).reshape(rows, n_unique)
+    return pos, tot
+
+
+def _auc(pos, neg):
+    """Rank AUC per row from per-score counts sorted ascending by score."""
+    neg_below = np.cumsum(neg, axis=1) - neg
+    wins = (pos * (neg_below + 0.5 * neg)).sum(axis=1)
+    P, N = pos.sum(axis=1), neg.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where((P > 0) & (N > 0), wins / (P * N), np.nan)
+
+
+def _at_thresholds(pos, neg, cut):
+    """Confusion metrics for each threshold; cut[j] = first unique-score index >= thr_j."""
+    # counts of scores >= value, padded so cut == K means "nothing predicted positive"
+    zeros = np.zeros((pos.shape[0], 1))
+    tp_ge = np.hstack([np.cumsum(pos[:, ::-1], axis=1)[:, ::-1], zeros])
+    fp_ge = np.hstack([np.cumsum(neg[:, ::-1], axis=1)[:, ::-1], zeros])
+    tp, fp = tp_ge[:, cut], fp_ge[:, cut]
+    P = pos.sum(axis=1, keepdims=True)
+    N = neg.sum(axis=1, keepdims=True)
+    fn, tn = P - tp, N - fp
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(P > 0, tp / P, 0.0)
+        f1 = np.where(2 * tp + fp + fn > 0, 2 * tp / (2 * tp + fp + fn), 0.0)
+        accuracy = (tp + tn) / (P + N)
+    return dict(accuracy=accuracy, precision=precision, recall=recall, f1=f1)
+
+
+def _interval(samples, alpha):
+    lo, hi = np.nanpercentile(samples, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+    return lo, hi
+
+
+def bootstrap_report(y_true, proba, thr=0.5, n_boot=2000, alpha=0.05, seed=42, sweep=None):
+    """
+    Point estimates plus percentile bootstrap CIs for AUC and accuracy/precision/
+    recall/F1 at `thr`, and a threshold sweep with CIs. JSON-serializable output.
+    """
+    y = np.asarray(y_true).astype(int)
+    p = np.asarray(proba, dtype=float)
+    n = len(y)
+    thresholds = np.asarray(sorted(set((sweep or SWEEP) + [thr])), dtype=float)
+
+    uniq, key = np.unique(p, return_inverse=True)
+    K = len(uniq)
+    cut = np.searchsorted(uniq, thresholds, side="left")
+    thr_col = int(np.searchsorted(thresholds, thr))
+
+    # point estimates: the original sample as a single "replicate"
+    pos0, tot0 = _counts(key[None, :], y[None, :].astype(float), K)
+    auc0 = _auc(pos0, tot0 - pos0)[0]
+    pt = {k: v[0] for k, v in _at_thresholds(pos0, tot0 - pos0, cut).items()}
+
+    rng = np.random.default_rng(seed)
+    chunk = max(1, min(n_boot, _CHUNK_ELEMS // max(n, 1)))
+    aucs, per_thr = [], {k: [] for k in pt}
+    done = 0
+    while done < n_boot:
+        rows = min(chunk, n_boot - done)
+        idx = rng.integers(0, n, size=(rows, n))
+        pos, tot = _counts(key[idx], y[idx].astype(float), K)
+        neg = tot - pos
+        aucs.append(_auc(pos, neg))
+        for k, v in _at_thresholds(pos, neg, cut).items():
+            per_thr[k].append(v)
+        done += rows
+
+    aucs = np.concatenate(aucs)
+    per_thr = {k: np.vstack(v) for k, v in per_thr.items()}
+    auc_lo, auc_hi = _interval(aucs, alpha)
+    ci = {k: _interval(v, alpha) for k, v in per_thr.items()}
+
+    at_thr = {"roc_auc": [float(auc_lo), float(auc_hi)]}
+    for k in pt:
+        at_thr[k] = [float(ci[k][0][thr_col]), float(ci[k][1][thr_col])]
+
+    rows_out = []
+    for j, t in enumerate(thresholds):
+        row = {"threshold": float(t)}
+        for k in ("precision", "recall", "f1"):
+            row[k] = float(pt[k][j])
+            row[f"{k}_ci"] = [float(ci[k][0][j]), float(ci[k][1][j])]
+        rows_out.append(row)
+
+    return dict(n_boot=int(n_boot), alpha=float(alpha), seed=int(seed),
+                roc_auc=float(auc0), ci=at_thr, threshold_sweep=rows_out)
+
+
+def without_sweep(block):
+    """Copy of a metrics block with the (long) threshold sweep dropped, for console output."""
+    out = dict(block)
+    if "bootstrap" in out:
+        out["bootstrap"] = {k: v for k, v in out["bootstrap"].items() if k != "threshold_sweep"}
+    return out
@@ -9,6 +9,9 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.calibration import CalibratedClassifierCV
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "ml_common"))
+from bootstrap_ci import bootstrap_report, without_sweep
 
 SEED = 42
 FEATURES = [
@@ -19,7 +22,7 @@ FEATURES = [
 ]
 TARGET = "Diabetes_binary"
 
-def main(csv, out_dir):
+def main(csv, out_dir, n_boot=2000):
     df = pd.read_csv(csv)
     missing = set(FEATURES+[TARGET]) - set(df.columns)
     if missing:
@@ -61,10 +64,11 @@ def main(csv, out_dir):
             recall=float(recall_score(y, pred, zero_division=0)),
             f1=float(f1_score(y, pred)),
             roc_auc=float(roc_auc_score(y, proba)),
+            bootstrap=bootstrap_report(y, proba, thr=0.5, n_boot=n_boot, seed=SEED),
         )
 
     metrics = {"val": block(X_va, y_va, "val"), "test": block(X_te, y_te, "test")}
-    print(json.dumps(metrics, indent=2))
+    print(json.dumps({k: without_sweep(v) for k, v in metrics.items()}, indent=2))
 
     out = Path(out_dir); out.mkdir(parents=True, exist_ok=True)
     joblib.dump(model, out / "diabetes_clf.joblib")
@@ -84,5 +88,6 @@ if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--csv", required=True)
     ap.add_argument("--out_dir", default="models_screen")
+    ap.add_argument("--n_boot", type=int, default=2000, help="Bootstrap replicates for metric CIs.")
     args = ap.parse_args()
-    main(args.csv, args.out_dir)
+    main(args.csv, args.out_dir, args.n_boot)
@@ -9,6 +9,9 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.calibration import CalibratedClassifierCV
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, confusion_matrix
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "ml_common"))
+from bootstrap_ci import bootstrap_report, without_sweep
 
 SEED = 42
 FEATURES = [
@@ -27,7 +30,7 @@ def load_pima(p):
         df[c] = pd.to_numeric(df[c], errors="coerce")
     return df.dropna(subset=[TARGET])
 
-def block(y_true, proba, thr=0.5, split="val"):
+def block(y_true, proba, thr=0.5, split="val", n_boot=2000):
     y_pred = (proba >= thr).astype(int)
     tn, fp, fn, tp = confusion_matrix(y_true, y_pred, labels=[0,1]).ravel()
     return dict(split=split,
@@ -36,9 +39,10 @@ def block(y_true, proba, thr=0.5, split="val"):
                 recall=float(recall_score(y_true, y_pred, zero_division=0)),
                 f1=float(f1_score(y_true, y_pred)),
                 roc_auc=float(roc_auc_score(y_true, proba)),
-                tn=int(tn), fp=int(fp), fn=int(fn), tp=int(tp))
+                tn=int(tn), fp=int(fp), fn=int(fn), tp=int(tp),
+                bootstrap=bootstrap_report(y_true, proba, thr=thr, n_boot=n_boot, seed=SEED))
 
-def main(csv, out_dir):
+def main(csv, out_dir, n_boot=2000):
     out = Path(out_dir); out.mkdir(parents=True, exist_ok=True)
     df = load_pima(Path(csv))
     X, y = df[FEATURES].copy(), df[TARGET].astype(int).values
@@ -64,9 +68,9 @@ def main(csv, out_dir):
 
     val_proba  = model.predict_proba(X_va)[:,1]
     test_proba = model.predict_proba(X_te)[:,1]
-    metrics = {"val": block(y_va, val_proba, split="val"),
-               "test": block(y_te, test_proba, split="test")}
-    print(json.dumps(metrics, indent=2))
+    metrics = {"val": block(y_va, val_proba, split="val", n_boot=n_boot),
+               "test": block(y_te, test_proba, split="test", n_boot=n_boot)}
+    print(json.dumps({k: without_sweep(v) for k, v in metrics.items()}, indent=2))
 
     joblib.dump(model, out / "diabetes_clf.joblib")
     meta = {
@@ -86,5 +90,6 @@ if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--csv", default="data/pima_diabetes.csv")
     ap.add_argument("--out_dir", default="models_labs")
+    ap.add_argument("--n_boot", type=int, default=2000, help="Bootstrap replicates for metric CIs.")
     args = ap.parse_args()
-    main(args.csv, args.out_dir)
+    main(args.csv, args.out_dir, args.n_boot)
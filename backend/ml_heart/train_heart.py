@@ -15,6 +15,10 @@ from sklearn.pipeline import Pipeline
 from sklearn.calibration import CalibratedClassifierCV
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "ml_common"))
+from bootstrap_ci import bootstrap_report
+
 
 
 BASE = Path(__file__).parent
@@ -111,7 +115,7 @@ def build_preprocessor():
 
     
 
-def main(csv_path: str, test_size: float, random_state: int):
+def main(csv_path: str, test_size: float, random_state: int, n_boot: int = 2000):
     csv_path = Path(csv_path)
     df = load_csv(csv_path)
 
@@ -152,7 +156,9 @@ def main(csv_path: str, test_size: float, random_state: int):
 
     p_test = calib.predict_proba(Xt_test)[:, 1]
     auc = roc_auc_score(y_test, p_test)
-    print(f"[heart-train] ROC AUC (test): {auc:.3f} | n_train={len(X_train)} n_test={len(X_test)}")
+    boot = bootstrap_report(y_test.values, p_test, thr=0.5, n_boot=n_boot, seed=random_state)
+    lo, hi = boot["ci"]["roc_auc"]
+    print(f"[heart-train] ROC AUC (test): {auc:.3f} [95% CI {lo:.3f}-{hi:.3f}] | n_train={len(X_train)} n_test={len(X_test)}")
 
     n_bg = min(200, Xt_train.shape[0])
     bg_idx = np.random.RandomState(random_state).choice(Xt_train.shape[0], n_bg, replace=False)
@@ -170,6 +176,8 @@ def main(csv_path: str, test_size: float, random_state: int):
         "target": "target",
         "notes": "Cleveland-style features with string→numeric mapping; LogisticRegression + Platt calibration",
         "auc_test": float(auc),
+        "auc_test_ci": [float(lo), float(hi)],
+        "bootstrap_test": boot,
         "threshold": 0.5
     }
     META_PATH.write_text(json.dumps(meta, indent=2))
@@ -180,5 +188,6 @@ if __name__ == "__main__":
     parser.add_argument("--csv", required=True, help="Path to your Cleveland-style CSV.")
     parser.add_argument("--test_size", type=float, default=0.2)
     parser.add_argument("--random_state", type=int, default=42)
+    parser.add_argument("--n_boot", type=int, default=2000, help="Bootstrap replicates for metric CIs.")
     args = parser.parse_args()
-    main(args.csv, args.test_size, args.random_state)
+    main(args.csv, args.test_size, args.random_state, args.n_boot)
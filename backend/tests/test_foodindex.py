@@ -0,0 +1,77 @@
+# backend/tests/test_foodindex.py
+"""
+The local FoodData Central index built from the fixture extract
+(seeds/fdc_sample.json): import, search ranking, details, and
+/nutrition/food answering a local id with no FDC_API_KEY.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+from app import foodindex  # noqa: E402
+from app.aggregates import NUTRIENTS  # noqa: E402
+
+SAMPLE = ROOT / "seeds" / "fdc_sample.json"
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    out = tmp_path_factory.mktemp("fdc") / "fdc.jsonl.gz"
+    assert foodindex.build([str(SAMPLE)], str(out)) == 11
+    return foodindex.FoodIndex.load(str(out))
+
+
+def _ids(index, q, n=10):
+    return [it["fdcId"] for it in index.search(q, n)["items"]]
+
+
+def test_prefix_search_ranks_by_start_then_data_type(index):
+    # "egg" is a prefix of "eggs" and "egg": both start with it, Foundation before SR Legacy
+    assert _ids(index, "egg") == [748967, 171287]
+    # Foundation "Oats, ..." before Survey "Oatmeal, ..."
+    assert _ids(index, "oat") == [2346396, 2342988]
+    # SR Legacy before Survey (FNDDS); both start with the query
+    assert _ids(index, "banana") == [173944, 2344719]
+    page = index.search("banana", 1)
+    assert page["total"] == 2 and [it["fdcId"] for it in page["items"]] == [173944]
+
+
+def test_token_search_needs_every_word(index):
+    # only the last word may be partial; earlier words must be whole tokens
+    assert _ids(index, "greek yog") == [170903, 2341381]
+    assert _ids(index, "gree yogurt") == []
+    assert _ids(index, "yogurt whole") == [2341381]
+    assert index.search("  ", 5) == {"total": 0, "items": []}
+
+
+def test_detail_and_macros_shape(index):
+    body = index.detail(748967)
+    assert body["fdcId"] == 748967 and body["description"].startswith("Eggs")
+    assert body["serving"] == {"amount": 100, "unit": "g"}
+    macros = body["per_100g"]
+    assert list(macros) == NUTRIENTS
+    assert macros["kcal"] == 148          # the kcal row (1008), not the kJ row (1062, 619)
+    assert macros["protein_g"] == 12.4 and macros["sodium_mg"] == 129
+    assert body["macros_per_serving"] == macros
+    assert index.detail(1) is None
+    assert 748967 in index and 1 not in index
+
+
+def test_food_route_answers_local_ids_without_api_key(index, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app import routes_nutrition
+
+    monkeypatch.setattr(routes_nutrition, "get_index", lambda: index)
+    monkeypatch.setattr(routes_nutrition, "FDC_API_KEY", "")
+    app = FastAPI()
+    app.include_router(routes_nutrition.router)
+    c = TestClient(app)
+
+    res = c.get("/nutrition/food/173944")
+    assert res.status_code == 200 and res.json() == index.detail(173944)
+    assert c.get("/nutrition/food/1").status_code == 404
+    assert _ids(index, "rice") == [it["fdcId"] for it in c.get("/nutrition/search", params={"q": "rice"}).json()["items"]]
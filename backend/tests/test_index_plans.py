@@ -0,0 +1,71 @@
+# backend/tests/test_index_plans.py
+"""
+explain() every route query shape (app.indexes.queries) against a local
+mongod, in a throwaway database with the declared indexes and a little data.
+Skipped when no mongod answers at MONGO_URI.
+
+    MONGO_URI=mongodb://127.0.0.1:27017 python -m pytest tests/test_index_plans.py
+"""
+import asyncio, sys, uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.config import MONGO_URI  # noqa: E402
+
+
+def _mongod_up() -> bool:
+    try:
+        MongoClient(MONGO_URI, serverSelectionTimeoutMS=500).admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _mongod_up(), reason=f"no mongod at {MONGO_URI}")
+
+
+async def _plans(monkeypatch) -> list[dict]:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from app import indexes
+
+    client = AsyncIOMotorClient(MONGO_URI)
+    name = f"predictmedi_plans_{uuid.uuid4().hex[:8]}"
+    db = client[name]
+    colls = {c: db[c] for c in indexes.INDEXES}
+    monkeypatch.setattr(indexes, "_db", db)
+    monkeypatch.setattr(indexes, "_COLLS", colls)
+    for attr in ("users", "activity", "meals"):
+        monkeypatch.setattr(indexes, attr, db[getattr(indexes, attr).name])
+    try:
+        found = await indexes.ensure_indexes()
+        assert not any(d["errors"] for d in found.values()), found
+
+        today = date(2024, 6, 30)
+        uids = [f"{n:024x}" for n in range(1, 21)]
+        await db[indexes.users.name].insert_many(
+            [{"email": f"u{n}@example.com", "name": f"U{n}"} for n in range(20)])
+        for uid in uids:
+            days = [(today - timedelta(days=k)).isoformat() for k in range(40)]
+            await db[indexes.activity.name].insert_many(
+                [{"userId": uid, "dateISO": d, "type": t, "minutes": 20, "steps": 2000}
+                 for d in days for t in ("walk", "run")])
+            await db[indexes.meals.name].insert_many(
+                [{"userId": uid, "dateISO": d, "items": [], "count": 1} for d in days])
+            await db[indexes.rollups.name].insert_many(
+                [{"userId": uid, "dateISO": d, "updatedAt": "2024-07-01T00:00:00"} for d in days])
+        return await indexes.check_plans(uids[3])
+    finally:
+        await client.drop_database(name)
+        client.close()
+
+
+def test_route_queries_use_indexes(monkeypatch):
+    results = asyncio.run(_plans(monkeypatch))
+    assert results
+    bad = {r["query"]: r["problems"] for r in results if r["problems"]}
+    assert not bad, bad
@@ -0,0 +1,65 @@
+# backend/tests/test_reco_batch.py
+"""
+reco_batch.score_days must equal reco.plan + reco.adherence_score row for row
+(plan numbers, score, messages). Uses the generator and parity check from
+bench/bench_reco.py, plus hand-written edge rows.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+from app import reco_batch  # noqa: E402
+from bench_reco import make_rows, columns, check, scalar  # noqa: E402
+
+
+def _score(rows: dict) -> dict:
+    out = reco_batch.score_days(columns(rows))
+    assert check(rows, out) == len(rows["age"])
+    return out
+
+
+def _edge_rows() -> dict:
+    rows = {  # one column per row below
+        "sex_s":     ["male",   "female", None,     "other", "m",    None],
+        "goal_s":    ["lose",   "gain",   None,     None,    "lose", "maintain"],
+        "age":       [np.nan,   40,       30,       24.4,    0,      95],
+        "height_cm": [180,      165,      170,      16,      175,    20],
+        "weight_kg": [80,       60,       70,       10,      70,     2],
+        "minutes":   [45,       0,        30,       10,      90,     5],
+        "kcal":      [2000,     0,        2300,     0,       1800,   100],
+        "carb_g":    [200,      0,        260,      0,       180,    10],
+        "protein_g": [120,      0,        140,      0,       120,    5],
+        "fat_g":     [70,       0,        80,       0,       60,     3],
+        "sugar_g":   [40,       0,        60,       80,      20,     0],
+        "fiber_g":   [30,       0,        10,       0,       25,     0],
+    }
+    return {k: np.array(v, dtype=object if k.endswith("_s") else float) for k, v in rows.items()}
+
+
+def test_parity_on_generated_rows():
+    rows = make_rows(3000, seed=11)
+    out = _score(rows)
+    assert (~out["ok"]).any() and out["ok"].any()   # the generator covers incomplete profiles too
+
+
+def test_parity_on_edge_rows():
+    rows = _edge_rows()
+    out = _score(rows)
+
+    # incomplete profiles (missing or zero age): not scored
+    for i in (0, 4):
+        assert scalar(rows, i) is None
+        assert not out["ok"][i] and out["score"][i] == -1
+
+    # a zero kcal target (bmr 0 for "other" sex) and a negative one: both score kcal as "no target"
+    assert out["kcal_target"][3] == 0 and out["kcal_score"][3] == 0.5
+    assert out["kcal_target"][5] < 0 and out["kcal_score"][5] == 0.5
+
+    # None sex plans like "other", None goal like "maintain"
+    assert out["ok"][2] and out["bmr"][2] == scalar(rows, 2)[0]["bmr"]
+    assert reco_batch.sex_codes([None])[0] == reco_batch.OTHER
+    assert reco_batch.goal_codes([None])[0] == reco_batch.MAINTAIN
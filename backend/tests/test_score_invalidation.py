@@ -0,0 +1,123 @@
+# backend/tests/test_score_invalidation.py
+"""
+A memoised coach score (scores.py) must not outlive a change to its day: a
+meal log, a bulk activity sync and a write-behind flush each drop it. Runs the
+app against mongomock-motor; skipped when that is not installed.
+
+    python -m pytest tests/test_score_invalidation.py
+"""
+import asyncio, sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+TODAY = date.today().isoformat()
+PROFILE = {"age": 30, "sex": "male", "heightCm": 175, "weightKg": 70}
+COLLECTIONS = ("users", "activity", "meals", "rollups", "digests", "jobs")
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    """Every app module's collection handles pointed at one mongomock database."""
+    import mongomock.collection
+    import app.main  # noqa: F401  every module imported first, so each one's handles are swapped below
+    from app import db
+
+    # pymongo >= 4.11 passes sort= to the bulk builders, which mongomock 4.x does not take
+    for name in ("add_update", "add_replace"):
+        orig = getattr(mongomock.collection.BulkOperationBuilder, name)
+        monkeypatch.setattr(mongomock.collection.BulkOperationBuilder, name,
+                            lambda self, *a, _orig=orig, sort=None, **kw: _orig(self, *a, **kw))
+
+    client = mongomock_motor.AsyncMongoMockClient()
+    mock = client["predictmedi_test"]
+    swap = {id(getattr(db, c)): mock[getattr(db, c).name] for c in COLLECTIONS}
+    monkeypatch.setattr(db, "_client", client)
+    monkeypatch.setattr(db, "_db", mock)
+    for mod in [m for n, m in sys.modules.items() if n == "app" or n.startswith("app.")]:
+        for attr in COLLECTIONS:
+            if id(getattr(mod, attr, None)) in swap:
+                monkeypatch.setattr(mod, attr, swap[id(getattr(mod, attr))])
+    return mock
+
+
+@pytest.fixture
+def client(mock_db):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as c:
+        res = c.post("/auth/register", json={"name": "Al", "email": "al@example.com",
+                                             "password": "password1", **PROFILE})
+        assert res.status_code == 201, res.text
+        c.headers["Authorization"] = f"Bearer {res.json()['token']}"
+        c.user_id = res.json()["user"]["id"]
+        yield c
+
+
+def _score(client) -> dict:
+    res = client.get("/coach/motivate", params={"dateISO": TODAY})
+    assert res.status_code == 200, res.text
+    return res.json()
+
+
+def _stored(mock_db) -> dict:
+    async def read():
+        return await mock_db["daily_rollups"].find_one({"dateISO": TODAY})
+    return (asyncio.run(read()) or {}).get("scores") or {}
+
+
+def _memoise(client, mock_db):
+    client.post("/activity/log", json={"date": TODAY, "minutes": 10, "steps": 1000, "type": "walk"})
+    _score(client)
+    assert "maintain" in _stored(mock_db)
+
+
+def test_meal_log_drops_the_day_score(client, mock_db):
+    _memoise(client, mock_db)
+    before = _score(client)
+    assert client.post("/meals/log", json={"date": TODAY, "items": [{"name": "cake", "kcal": 900}]}).status_code == 201
+    assert _stored(mock_db) == {}
+    assert _score(client)["nutrition_totals"] != before["nutrition_totals"]
+
+
+def test_bulk_sync_drops_the_day_score(client, mock_db):
+    _memoise(client, mock_db)
+    res = client.post("/activity/log/bulk", json={"entries": [{"date": TODAY, "minutes": 50, "type": "run"}]})
+    assert res.status_code == 200 and res.json()["ok"] == 1
+    assert _stored(mock_db) == {}
+    assert _score(client)["minutes"] == 60
+
+
+def test_write_behind_flush_drops_the_day_score(client, mock_db):
+    from app import writebehind
+
+    _memoise(client, mock_db)
+    buffer = writebehind.ActivityBuffer("async", 60_000, 500)
+    uid = client.user_id
+
+    async def add_and_flush():
+        await buffer.add(uid, TODAY, "walk", 25, None)
+        await buffer.flush()
+        await buffer.close()
+
+    asyncio.run(add_and_flush())
+    assert _stored(mock_db) == {}
+    assert _score(client)["minutes"] == 35
+
+
+def test_score_from_another_profile_is_not_served(client, mock_db):
+    from app import scores
+
+    _memoise(client, mock_db)
+    stale = {"id": client.user_id, **PROFILE, "weightKg": 95}
+
+    async def as_stale_token():
+        return await scores.day_score(stale, TODAY, "maintain")
+
+    assert asyncio.run(as_stale_token())["plan"] != _score(client)["plan"]
+    assert scores.stats.other_profile >= 1
@@ -0,0 +1,96 @@
+# backend/tests/test_writebehind.py
+"""
+ActivityBuffer.read_day counts every increment exactly once while flushes
+land around the rollup read. The database is replaced by an in-memory day
+whose read can be made to wait, so a flush can be driven into that window.
+"""
+import asyncio, sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app import writebehind, rollups  # noqa: E402
+
+U, D = "u1", "2024-06-01"
+
+
+class FakeStore:
+    """One rollup day; read_day can be paused between taking its snapshot and returning it."""
+    def __init__(self):
+        self.minutes = 0
+        self.pause: asyncio.Event | None = None
+        self.reading = asyncio.Event()
+
+    async def bump_many(self, user_id, incs):
+        await asyncio.sleep(0)
+        self.minutes += incs[D]["activity.minutes"]
+
+    async def read_day(self, user_id, dateISO):
+        day = rollups.empty_day()
+        day["activity"]["minutes"] = self.minutes   # what the database returns, as of now
+        self.reading.set()
+        if self.pause is not None:
+            pause, self.pause = self.pause, None
+            await pause.wait()
+        return day
+
+
+@pytest.fixture
+def store(monkeypatch):
+    async def write_unordered(coll, ops):
+        await asyncio.sleep(0)
+        return set(), {}
+    s = FakeStore()
+    monkeypatch.setattr(writebehind, "write_unordered", write_unordered)
+    monkeypatch.setattr(rollups, "bump_many", s.bump_many)
+    monkeypatch.setattr(rollups, "read_day", s.read_day)
+    return s
+
+
+def test_flush_landing_during_the_read_is_counted_once(store):
+    async def run():
+        buf = writebehind.ActivityBuffer("async", 60_000, 500)
+        store.minutes = 10
+        await buf.add(U, D, "walk", 5, None)
+        store.pause = pause = asyncio.Event()
+        read = asyncio.create_task(buf.read_day(U, D))
+        await store.reading.wait()          # the read has its (old) snapshot: 10 stored
+        await buf.flush()                   # the 5 lands and leaves the overlay
+        pause.set()
+        day = await asyncio.wait_for(read, 1)
+        await buf.close()
+        return day["activity"]["minutes"]
+
+    # without the re-read this is 10: the old snapshot and no overlay
+    assert asyncio.run(run()) == 15
+
+
+def test_read_waits_for_a_flush_already_bumping(store):
+    async def run():
+        buf = writebehind.ActivityBuffer("async", 60_000, 500)
+        await buf.add(U, D, "walk", 7, None)
+        flush = asyncio.create_task(buf.flush())
+        await asyncio.sleep(0)              # the batch is in flight, its bump not landed
+        assert buf.inflight
+        day = await buf.read_day(U, D)
+        await flush
+        await buf.close()
+        return day["activity"]["minutes"]
+
+    assert asyncio.run(run()) == 7
+
+
+def test_pending_increments_are_overlaid(store):
+    async def run():
+        buf = writebehind.ActivityBuffer("async", 60_000, 500)
+        store.minutes = 3
+        await buf.add(U, D, "walk", 4, None)
+        await buf.add(U, D, "run", 2, None)
+        day = await buf.read_day(U, D)
+        buf.pending.clear()
+        await buf.close()
+        return day["activity"]
+
+    a = asyncio.run(run())
+    assert a["minutes"] == 9 and set(a["by_type"]) == {"walk", "run"}
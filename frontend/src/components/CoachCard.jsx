@@ -1,11 +1,16 @@
 import { useEffect, useState } from "react";
 import { api } from "../lib/api";
 
-export default function CoachCard({ token, dateISO }) {
+export default function CoachCard({ token, dateISO, goal = "maintain" }) {
   const [data, setData] = useState(null);
+  const [digest, setDigest] = useState(null);
   const [err, setErr] = useState("");
 
   useEffect(() => { load(); }, [dateISO]);
+  // yesterday's badge and the streak, precomputed overnight
+  useEffect(() => {
+    api(`/coach/digest?goal=${goal}`, { token }).then(setDigest).catch(() => setDigest(null));
+  }, [token, goal]);
 
   async function load() {
     try {
@@ -46,6 +51,13 @@ export default function CoachCard({ token, dateISO }) {
           {data.messages.map((m,i)=><li key={i}>{m}</li>)}
         </ul>
       </div>
+
+      {digest && (
+        <div className="mt-3 flex justify-between text-sm text-slate-600">
+          <span>{digest.yesterday ? `Yesterday: ${digest.yesterday.badge} (${digest.yesterday.score}/100)` : "Nothing logged yesterday"}</span>
+          <span>Streak: <b>{digest.streak.current}</b> day{digest.streak.current === 1 ? "" : "s"} (best {digest.streak.best})</span>
+        </div>
+      )}
     </div>
   );
 }
@@ -8,19 +8,25 @@ export default function FoodSearch({ onSelect }) {
   const [err, setErr] = useState("");
 
   useEffect(() => {
-    const h = setTimeout(() => {
-      if (q.trim().length >= 2) search();
-      else setItems([]);
-    }, 350);
-    return () => clearTimeout(h);
+    // set on cleanup: an answer (or retry) for an older query must not land after q changed
+    let cancelled = false, retry;
+    const live = () => !cancelled;
+    const h = setTimeout(async () => {
+      if (q.trim().length < 2) { setItems([]); return; }
+      // pending: the server is asking FDC for more foods under this prefix; look again once
+      if (await search(live) && !cancelled) retry = setTimeout(() => search(live), 800);
+    }, 150);
+    return () => { cancelled = true; clearTimeout(h); clearTimeout(retry); };
   }, [q]);
 
-  async function search() {
+  async function search(live) {
     try {
       setLoading(true); setErr("");
-      const r = await api(`/nutrition/search?q=${encodeURIComponent(q)}`);
+      const r = await api(`/nutrition/suggest?q=${encodeURIComponent(q)}&limit=15`);
+      if (!live()) return false;
       setItems(r.items || []);
-    } catch (e) { setErr(e.message || "Search failed"); }
+      return r.pending;
+    } catch (e) { if (live()) setErr(e.message || "Search failed"); }
     finally { setLoading(false); }
   }
 
@@ -31,7 +37,8 @@ export default function FoodSearch({ onSelect }) {
         fdcId,
         description: r.description,
         serving: r.serving,
-        macros: r.macros_per_serving
+        macros: r.macros_per_serving,
+        per_100g: r.per_100g || r.macros_per_serving
       });
     } catch (e) { setErr(e.message || "Load failed"); }
   }
@@ -32,9 +32,15 @@ export default function TodayProgress({ token, activity = "light", goal = "maint
   useEffect(() => {
     (async () => {
       try {
-        const p = await api(`/coach/plan?activity=${activity}&goal=${goal}`, { token });
-        setPlan(p);
-      } catch {}
+        // today's plan from the overnight digest (activity level inferred from the last week)
+        const d = await api(`/coach/digest?goal=${goal}`, { token });
+        setPlan(d.plan);
+      } catch {
+        try {
+          const p = await api(`/coach/plan?activity=${activity}&goal=${goal}`, { token });
+          setPlan(p);
+        } catch {}
+      }
       try {
         const s = await api(`/meals/summary?dateISO=${today}`, { token });
         setTotals(s?.totals || {});
@@ -22,25 +22,30 @@ export default function MealsLog({ token }) {
     } catch (e) { /* ignore for now */ }
   }
 
-  function addPicked() {
+  async function addPicked() {
     if (!picked) return;
     const g = Number(grams) || (picked.serving?.unit?.toLowerCase()==="g" ? picked.serving.amount : 100);
-    const scale = (() => {
-      const amt = Number(picked.serving?.amount || 100);
-      return (picked.serving?.unit?.toLowerCase() === "g" && amt > 0) ? (g / amt) : 1; // assume 1 serving otherwise
-    })();
-
-    const m = picked.macros || {};
+    let m = {};
+    try {
+      // the server scales FDC's per-gram nutrients to this portion
+      const r = await api("/nutrition/portion", { method: "POST", body: { items: [{ fdcId: picked.fdcId, grams: g }] } });
+      m = r.items?.[0] || {};
+      if ((r.missing || []).includes(picked.fdcId)) {
+        // the server holds no nutrients for it: scale the per-100 g values the search returned
+        m = Object.fromEntries(Object.entries(picked.per_100g || {}).map(([k, v]) => [k, v == null ? null : v * g / 100]));
+        if (!Object.values(m).some(v => v != null)) { setMsg("No nutrient data for this food; try another match"); return; }
+      }
+    } catch (e) { setMsg(e.message || "Portion lookup failed"); return; }
     const row = {
       desc: picked.description,
       grams: g,
-      kcal: roundSafe(m.kcal, scale),
-      protein_g: roundSafe(m.protein_g, scale),
-      carb_g: roundSafe(m.carb_g, scale),
-      fat_g: roundSafe(m.fat_g, scale),
-      fiber_g: roundSafe(m.fiber_g, scale),
-      sugar_g: roundSafe(m.sugar_g, scale),
-      sodium_mg: roundSafe(m.sodium_mg, scale),
+      kcal: roundSafe(m.kcal, 1),
+      protein_g: roundSafe(m.protein_g, 1),
+      carb_g: roundSafe(m.carb_g, 1),
+      fat_g: roundSafe(m.fat_g, 1),
+      fiber_g: roundSafe(m.fiber_g, 1),
+      sugar_g: roundSafe(m.sugar_g, 1),
+      sodium_mg: roundSafe(m.sodium_mg, 1),
       fdcId: picked.fdcId
     };
     setItems(prev => [...prev, row]);
@@ -1,7 +1,7 @@
 import { useState, useEffect } from "react";
 import { api } from "../lib/api";
 
-export default function Profile({ token, user, onUpdate }) {
+export default function Profile({ token, user, onUpdate, onToken }) {
   const [age, setAge] = useState(user?.age ?? "");
   const [sex, setSex] = useState(user?.sex ?? "other");
   const [heightCm, setHeightCm] = useState(user?.heightCm ?? "");
@@ -18,6 +18,8 @@ export default function Profile({ token, user, onUpdate }) {
     };
     const res = await api("/users/me", { method:"PUT", body, token });
     onUpdate(res.user);
+    // with profile claims on, the old token still carries the old weight/height
+    if (res.token) onToken?.(res.token);
     setMsg("Saved!");
   }
 